@@ -5,7 +5,8 @@ from decimal import Decimal
 from .models import Asset, Holdings, Price, WatchlistEntry, Watchlist
 from .model_views import PortfolioSummary
 from django.template.response import TemplateResponse
-from django.core.management import call_command
+from .apis.services.job_queue import enqueue
+from .apis.services.portfolio_refresh import get_portfolio_refresh
 
 class PriceInline(admin.TabularInline):
     model = Price
@@ -70,8 +71,8 @@ class AssetAdmin(admin.ModelAdmin):
 class HoldingsAdmin(admin.ModelAdmin):
 
     def changelist_view(self, request, extra_context=None):
-        # Bereinigung hier ausführen
-        call_command('clean_up')
+        # Bereinigung als Hintergrund-Job (run_worker), die Liste blockiert nicht
+        enqueue('clean_up', dedupe_key='clean_up')
         return super().changelist_view(request, extra_context)
     
     list_display = (
@@ -90,7 +91,7 @@ class HoldingsAdmin(admin.ModelAdmin):
 
     fieldsets = (
         (None, {'fields': ('asset', 'quantity', 'category')}),
-        ('Finanzen', {'fields': ('average_purchase_price', 'get_total_investment', 'get_current_value')}),
+        ('Finanzen', {'fields': ('average_purchase_price', 'average_purchase_price_eur', 'get_total_investment', 'get_current_value')}),
         ('Notizen', {'fields': ('notes',), 'classes': ('collapse',)}),
         ('Metadaten', {'fields': ('created_at', 'updated_at'), 'classes': ('collapse',)}),
     )
@@ -177,9 +178,9 @@ class PortfolioSummaryAdmin(admin.ModelAdmin):
         return False
 
     def changelist_view(self, request, extra_context=None):
-        
-        call_command('update_prices')  # Preise vor Anzeige aktualisieren
+        # Sofort mit gespeicherten Kursen rendern, Aktualisierung läuft im Hintergrund
         context = dict(extra_context or {})
+        context['refresh'] = get_portfolio_refresh().start()
         context['portfolio'] = list(PortfolioSummary.objects.portfolio())
         return TemplateResponse(
             request,
@@ -1,32 +1,83 @@
 """
-GET /fintech/securities/{isin}/price?type=Stock|ETF|Certificate
+GET /fintech/securities/{isin}/price?type=STOCK|ETF|ETC|CRYPTO|DERIVATIVE|FOND  (default STOCK)
+
+Prices of tracked assets are served from Asset.current_price (stale-while-revalidate,
+see services/price_service.py); only cold misses are scraped synchronously.
 
 Returns:
-    200  {"isin": "...", "price_eur": "12.34", "type": "Stock"}
+    200  {"isin": "...", "price_eur": "12.34", "type": "STOCK", "currency": "EUR",
+          "source": "db|stale|live", "as_of": "<ISO 8601>", "age_seconds": 12.3}
     400  {"error": "...", "detail": "..."}
     404  {"error": "Not Found", "detail": "Price could not be retrieved for ISIN ..."}
     500  {"error": "Internal Server Error", "detail": "..."}
 
+POST /fintech/securities/prices
+    Body: {"securities": [{"isin": "...", "type": "STOCK"}, ...]}
+
+    Resolves all ISINs concurrently (bounded by FINTECH_BATCH_CONCURRENCY).
+    Per-item failures are returned inline with their own "status"; the batch itself
+    only fails (400) when the body is malformed or too large.
+
+    Default: 200 {"results": [...in request order...], "count": n, "errors": k}
+    With "Accept: application/x-ndjson" or ?stream=1: one JSON line per ISIN, in
+    completion order, written as soon as each lookup finishes.
+
 Authentication: X-API-Key header (handled by ApiKeyMiddleware).
 """
 
+import json
 import logging
 import re
-from decimal import Decimal
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from ..models_helper.asset_class import AssetClass
 
-from django.http import JsonResponse
+from django.conf import settings
+from django.db import connection
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
 from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 
+from .services.price_service import PriceService, ServedPrice
 from .services.provider_manager import ProviderManager
 
 logger = logging.getLogger(__name__)
 
 ISIN_RE = re.compile(r"^[A-Z]{2}[A-Z0-9]{10}$")
 SUPPORTED_TYPES = list(AssetClass.values)
-
-# One shared instance per process — holds the in-memory SoupCache
-_provider_manager = ProviderManager()
+DEFAULT_TYPE = AssetClass.STOCK.value
+NDJSON = "application/x-ndjson"
+DEFAULT_BATCH_MAX_ITEMS = 100
+DEFAULT_BATCH_CONCURRENCY = 8
+
+# One shared instance per process — holds the bounded, thread-safe PageCache.
+# Built on first use, not at import: ProviderManager opens the shared cache and an
+# HTTP transport, which management commands like migrate must not pay for.
+_provider_manager: ProviderManager | None = None
+_price_service: PriceService | None = None
+_services_lock = threading.Lock()
+
+
+def get_provider_manager() -> ProviderManager:
+    """Return the process-wide ProviderManager, creating it on first use."""
+    global _provider_manager
+    if _provider_manager is None:
+        with _services_lock:
+            if _provider_manager is None:
+                _provider_manager = ProviderManager()
+    return _provider_manager
+
+
+def get_price_service() -> PriceService:
+    """Return the process-wide PriceService built on get_provider_manager()."""
+    global _price_service
+    if _price_service is None:
+        manager = get_provider_manager()
+        with _services_lock:
+            if _price_service is None:
+                _price_service = PriceService.from_settings(manager)
+    return _price_service
 
 
 class SecurityPriceView(View):
@@ -35,51 +86,129 @@ class SecurityPriceView(View):
     http_method_names = ["get"]
 
     def get(self, request, isin: str):
-        isin = isin.upper().strip()
-
-        # --- validate ISIN ---
-        if not ISIN_RE.match(isin):
-            return JsonResponse(
-                {"error": "Bad Request", "detail": f"'{isin}' is not a valid ISIN."},
-                status=400,
-            )
-
-        # --- validate type ---
-        security_type = request.GET.get("type", "Stock")
-        if security_type not in SUPPORTED_TYPES:
-            return JsonResponse(
-                {
-                    "error": "Bad Request",
-                    "detail": f"Query param 'type' must be one of {sorted(SUPPORTED_TYPES)}.",
-                },
-                status=400,
-            )
-
-        # --- fetch price ---
+        result = _lookup_price(isin, request.GET.get("type", DEFAULT_TYPE))
+        status = result.pop("status", 200)
+        return JsonResponse(result, status=status)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class SecurityPricesView(View):
+    """Return EUR prices for a batch of ISINs, resolved concurrently."""
+
+    http_method_names = ["post"]
+
+    def post(self, request):
         try:
-            price: Decimal | None = _provider_manager.isin2price(isin, security_type)
+            items = self._parse_items(request.body)
         except ValueError as exc:
             return JsonResponse({"error": "Bad Request", "detail": str(exc)}, status=400)
-        except Exception as exc:
-            logger.exception(f"Unexpected error fetching price for {isin}")
-            return JsonResponse(
-                {"error": "Internal Server Error", "detail": str(exc)}, status=500
-            )
-
-        if price is None:
-            return JsonResponse(
-                {
-                    "error": "Not Found",
-                    "detail": f"Price could not be retrieved for ISIN {isin}.",
-                },
-                status=404,
-            )
-
-        return JsonResponse(
-            {
-                "isin": isin,
-                "type": security_type,
-                "price_eur": str(round(price, 4)),
-                "currency": "EUR",
-            }
-        )
+
+        if self._wants_stream(request):
+            lines = (json.dumps(result) + "\n" for result in _iter_prices(items))
+            return StreamingHttpResponse(lines, content_type=NDJSON)
+
+        results = [None] * len(items)
+        for index, result in _iter_prices(items, with_index=True):
+            results[index] = result
+        errors = sum(1 for result in results if result["status"] != 200)
+        return JsonResponse({"results": results, "count": len(results), "errors": errors})
+
+    def _parse_items(self, body: bytes) -> list[tuple[str, str]]:
+        try:
+            payload = json.loads(body or b"null")
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"Body is not valid JSON: {exc}")
+
+        securities = payload.get("securities") if isinstance(payload, dict) else None
+        if not isinstance(securities, list) or not securities:
+            raise ValueError("Body must be {\"securities\": [{\"isin\": ..., \"type\": ...}, ...]}.")
+
+        max_items = getattr(settings, "FINTECH_BATCH_MAX_ITEMS", DEFAULT_BATCH_MAX_ITEMS)
+        if len(securities) > max_items:
+            raise ValueError(f"At most {max_items} securities per request ({len(securities)} given).")
+
+        items = []
+        for entry in securities:
+            if not isinstance(entry, dict) or not isinstance(entry.get("isin"), str):
+                raise ValueError(f"Invalid entry {entry!r}: expected {{\"isin\": ..., \"type\": ...}}.")
+            items.append((entry["isin"], entry.get("type", DEFAULT_TYPE)))
+        return items
+
+    def _wants_stream(self, request) -> bool:
+        return NDJSON in request.headers.get("Accept", "") or request.GET.get("stream") in ("1", "true")
+
+
+# ---------------------------------------------------------------------------
+# Internal helpers
+# ---------------------------------------------------------------------------
+
+def _lookup_price(isin: str, security_type: str) -> dict:
+    """Validate and resolve one ISIN; the response dict carries its HTTP "status"."""
+    isin = isin.upper().strip()
+
+    # --- validate ISIN ---
+    if not ISIN_RE.match(isin):
+        return {
+            "error": "Bad Request", "detail": f"'{isin}' is not a valid ISIN.", "status": 400,
+        }
+
+    # --- validate type ---
+    if security_type not in SUPPORTED_TYPES:
+        return {
+            "error": "Bad Request",
+            "detail": f"Query param 'type' must be one of {sorted(SUPPORTED_TYPES)}.",
+            "status": 400,
+        }
+
+    # --- fetch price ---
+    try:
+        served: ServedPrice | None = get_price_service().get_price(isin, security_type)
+    except ValueError as exc:
+        return {"error": "Bad Request", "detail": str(exc), "status": 400}
+    except Exception as exc:
+        logger.exception(f"Unexpected error fetching price for {isin}")
+        return {"error": "Internal Server Error", "detail": str(exc), "status": 500}
+
+    if served is None:
+        return {
+            "error": "Not Found",
+            "detail": f"Price could not be retrieved for ISIN {isin}.",
+            "status": 404,
+        }
+
+    return {
+        "isin": isin,
+        "type": security_type,
+        "price_eur": str(round(served.price, 4)),
+        "currency": "EUR",
+        "source": served.source,
+        "as_of": served.as_of.isoformat(),
+        "age_seconds": round(served.age_seconds, 1),
+        "status": 200,
+    }
+
+
+def _iter_prices(items: list[tuple[str, str]], with_index: bool = False):
+    """Yield one result per item as soon as it completes (bounded thread fan-out).
+
+    Errors stay inline: each result is tagged with its isin/type and status.
+    """
+    concurrency = getattr(settings, "FINTECH_BATCH_CONCURRENCY", DEFAULT_BATCH_CONCURRENCY)
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(items)))) as pool:
+        futures = {
+            pool.submit(_pooled_lookup_price, isin, security_type): (index, isin, security_type)
+            for index, (isin, security_type) in enumerate(items)
+        }
+        for future in as_completed(futures):
+            index, isin, security_type = futures[future]
+            result = {"isin": isin.upper().strip(), "type": security_type, **future.result()}
+            yield (index, result) if with_index else result
+
+
+def _pooled_lookup_price(isin: str, security_type: str) -> dict:
+    """_lookup_price for a pool thread of _iter_prices."""
+    try:
+        return _lookup_price(isin, security_type)
+    finally:
+        # Eigener Thread → eigene DB-Verbindung, nicht offen liegen lassen
+        connection.close()
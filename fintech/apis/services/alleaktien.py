@@ -1,40 +1,60 @@
+import html
 import re
 import logging
 
-from .request_lib import StockRequest, KeyNotFoundWarning
+from .request_lib import StockRequest, KeyNotFoundWarning, TEXT, extracts, meta_content
 
 logger = logging.getLogger(__name__)
 
+INFO_FIELDS = ("wkn", "price", "currency", "symbol")
+LIVE_QUOTE_PATTERN = re.compile(
+    r'class="whitespace-nowrap live-quote flex flex-row price text-black">\s*'
+    r"<div>\s*(?P<price>\d{1,3},\d{2})\s*(?P<currency>[A-Za-z]{3}|\$|€|&euro;|&#8364;)"
+)
+
 
 class AlleaktienRequest(StockRequest):
 
     def isin2wkn(self, isin: str) -> str:
         logger.info(f"Request isin2wkn {isin} from AlleAktien")
-        soup = self.fetch_soup(isin)
-        wkn, _, _, _ = self.extract_from_soup(soup)
-        return wkn
+        return self.lookup(isin, "wkn")
+
+    def isin2price(self, isin: str) -> tuple[str, str]:
+        logger.info(f"Request isin2price {isin} from AlleAktien")
+        return self.lookup(isin, "price", "currency")
 
     def get_infos(self, isin: str) -> tuple:
         """Return (wkn, current_price, currency, symbol) for *isin*."""
-        soup = self.fetch_soup(isin)
-        return self.extract_from_soup(soup)
-
-    def extract_from_soup(self, soup) -> tuple:
-        price_pattern = r"(?P<price>\d{1,3},\d{2})"
-        currency_pattern = r"(?P<currency>[A-Za-z]{3}|\$|€)"
-        full_pattern = (
-            r'class="whitespace-nowrap live-quote flex flex-row price text-black">'
-            rf"<div>({price_pattern})\s*({currency_pattern})"
-        )
-
-        match = re.search(full_pattern, str(soup))
+        return self.lookup(isin, *INFO_FIELDS)
+
+    async def aisin2wkn(self, isin: str) -> str:
+        logger.info(f"Request isin2wkn {isin} from AlleAktien (async)")
+        return await self.alookup(isin, "wkn")
+
+    async def aisin2price(self, isin: str) -> tuple[str, str]:
+        logger.info(f"Request isin2price {isin} from AlleAktien (async)")
+        return await self.alookup(isin, "price", "currency")
+
+    async def aget_infos(self, isin: str) -> tuple:
+        return await self.alookup(isin, *INFO_FIELDS)
+
+    @extracts(TEXT)
+    def _quote_fields(self, text: str, isin: str) -> dict:
+        try:
+            return dict(zip(INFO_FIELDS, self.extract_from_text(text)))
+        except KeyNotFoundWarning:
+            logger.warning(f"No quote found on AlleAktien for {isin}")
+            return dict.fromkeys(INFO_FIELDS)
+
+    def extract_from_text(self, text: str) -> tuple:
+        match = LIVE_QUOTE_PATTERN.search(text)
         if match:
-            price = match.group(2)
-            currency = match.group(3)
+            price = match.group("price")
+            currency = html.unescape(match.group("currency"))
 
-            title_match = re.search(r'<meta content="(.*?)" name="twitter:title"/>', str(soup))
-            if title_match:
-                parts = [p.strip() for p in title_match.group(1).split("|")]
+            title = meta_content(text, "name", "twitter:title")
+            if title:
+                parts = [p.strip() for p in title.split("|")]
                 if len(parts) >= 4:
                     symbol = parts[1].strip()
                     wkn = parts[3].strip()
@@ -3,69 +3,86 @@ import logging
 
 from django.http import Http404
 
-from .request_lib import StockRequest, KeyNotFoundWarning, KeyNotFoundError
+from .request_lib import StockRequest, KeyNotFoundError, HEAD_END_RE, TEXT, extracts, meta_content
 from ...models import Asset
 from ...models_helper.currency_class import CurrencyClass
 
 logger = logging.getLogger(__name__)
 
-WKN_PATTERN = r"WKN:\s*(?P<WKN>[A-Z0-9]{6}),\s*"
-NOT_FOUND_TEXT = "Die gewünschte Seite wurde nicht gefunden"
+WKN_PATTERN = re.compile(r"WKN:(?:\s|&nbsp;)*(?P<WKN>[A-Z0-9]{6}),\s*")
+PRICE_PATTERN = re.compile(
+    r"Kurs:\s*(?P<Kurs>\d{1,5},\d{1,4})\s*"
+    rf"(?P<Waehrung>{CurrencyClass.get_currency_pattern()}),?"
+)
+NOT_FOUND_PATTERN = re.compile(r"Die gew(?:ü|&uuml;|&#252;)nschte Seite wurde nicht gefunden")
 ERROR_CLASS = "error-page--headline headline headline--h1"
+ERROR_HEADLINE_PATTERN = re.compile(
+    rf"""<h1\b[^>]*\bclass\s*=\s*["']{re.escape(ERROR_CLASS)}["']""", re.IGNORECASE
+)
 
 
 class ComdirectRequest(StockRequest):
 
+    # Kurs und (meist) WKN stehen im <head> — der Body wird nur bei Bedarf geladen
+    QUOTE_UNTIL = HEAD_END_RE
+
     def isin2wkn(self, isin: str) -> str:
         logger.info(f"Request isin2wkn {isin} from Comdirect")
-        soup = self.fetch_soup(isin)
-        self._check_soup_ok(soup)
-        return self._extract_wkn(soup, isin)
+        return self.lookup(isin, "wkn")
 
     def isin2price(self, isin: str) -> tuple[str, str]:
         logger.info(f"Request isin2price {isin} from Comdirect")
-        soup = self.fetch_soup(isin)
-        self._check_soup_ok(soup)
-        return self._extract_price(soup, isin)
+        return self.lookup(isin, "price", "currency")
+
+    async def aisin2wkn(self, isin: str) -> str:
+        logger.info(f"Request isin2wkn {isin} from Comdirect (async)")
+        return await self.alookup(isin, "wkn")
+
+    async def aisin2price(self, isin: str) -> tuple[str, str]:
+        logger.info(f"Request isin2price {isin} from Comdirect (async)")
+        return await self.alookup(isin, "price", "currency")
 
     # ------------------------------------------------------------------
     # Internal helpers
     # ------------------------------------------------------------------
 
-    def _check_soup_ok(self, soup) -> None:
+    @extracts(TEXT)
+    def _quote_fields(self, text: str, isin: str) -> dict:
+        """One pass over the page (or its head): WKN, price and currency."""
+        self._check_page_ok(text)
+        price, currency = self._extract_price(text, isin)
+        return {"wkn": self._extract_wkn(text), "price": price, "currency": currency, "symbol": None}
+
+    def _check_page_ok(self, text: str) -> None:
         """Raise Http404 or KeyNotFoundError when the page is not usable."""
-        if soup.find(lambda tag: tag.name is not None and NOT_FOUND_TEXT in tag.text):
+        if NOT_FOUND_PATTERN.search(text):
             raise Http404(f"Comdirect returned 'page not found' page.")
-        if self.not_found_in_soup(soup, tag="h1", pattern=ERROR_CLASS):
+        if ERROR_HEADLINE_PATTERN.search(text):
             raise KeyNotFoundError("Unknown Soup Format on Comdirect")
 
-    def _extract_wkn(self, soup, isin: str) -> str:
-        match = re.search(WKN_PATTERN, str(soup))
+    def _extract_wkn(self, text: str):
+        match = WKN_PATTERN.search(text)
         if match:
             wkn = match.group("WKN")
             logger.info(f"WKN found on Comdirect: {wkn}")
             return wkn
-        raise KeyNotFoundWarning(f"WKN not found on Comdirect for {isin}")
-
-    def _extract_price(self, soup, isin: str) -> tuple[str, str]:
-        currency_pattern = CurrencyClass.get_currency_pattern()
-        price_pattern = (
-            r"Kurs:\s*(?P<Kurs>\d{1,5},\d{1,4})\s*"
-            rf"(?P<Waehrung>{currency_pattern}),?"
-        )
+        return None
 
-        meta_tag = soup.find("meta", {"itemprop": "description"})
-        if not meta_tag:
-            raise KeyNotFoundWarning(f"No meta description tag found for {isin}")
+    def _extract_price(self, text: str, isin: str) -> tuple:
+        # Der Kurs steht im <meta itemprop="description">
+        content = meta_content(text, "itemprop", "description")
+        if content is None:
+            logger.warning(f"No meta description tag found for {isin}")
+            return None, None
 
-        content = meta_tag.get("content", "")
         logger.info(f"Comdirect meta content: {content}")
 
-        match = re.search(price_pattern, content)
+        match = PRICE_PATTERN.search(content)
         if match:
             price = match.group("Kurs")
             currency = match.group("Waehrung")
             logger.info(f"Price found: {price} {currency}")
             return price, currency
 
-        raise KeyNotFoundWarning(f"Price not found in Comdirect meta for {isin}: '{content}'")
+        logger.warning(f"Price not found in Comdirect meta for {isin}: '{content}'")
+        return None, None
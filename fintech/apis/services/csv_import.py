@@ -7,12 +7,19 @@ Verarbeitete Transaktionstypen (assetType=Security, status=Executed):
   - Sell         → Verkauf, reduziert Bestand
 
 Ignoriert:  Deposit, Distribution, Fee, Cash Transfer Out, Cancelled
+
+Kurse in Fremdwährung werden zusätzlich zum EZB-Kurs ihres Handelstags in EUR
+umgerechnet (RateMatrix aus der Tabelle ExchangeRate, eine Matrix pro Datei) und als
+Holdings.average_purchase_price_eur fortgeschrieben. Fehlt ein Kurs, bleibt der
+EUR-Einstand der Position leer und das Ergebnis enthält einen Hinweis
+(→ backfill_fx_rates).
 """
 
 import csv
 import io
 import logging
 from dataclasses import dataclass
+from datetime import date
 from decimal import Decimal, InvalidOperation
 from typing import List, Optional, Tuple
 
@@ -20,6 +27,8 @@ from django.db import transaction
 
 from ...models import Asset, Holdings
 from ...models_helper.asset_class import AssetClass
+from .exchange_rate_proxy import normalize_currency
+from .fx_history import RateMatrix
 
 logger = logging.getLogger(__name__)
 
@@ -252,10 +261,11 @@ def import_transactions(file_content: str, dry_run: bool = False) -> ImportResul
 
     # Chronologisch sortieren (älteste zuerst) → korrekte Durchschnittspreise
     rows.sort(key=lambda r: r.date)
+    prices_eur = _prices_in_eur(rows, result)
 
-    for row in rows:
+    for row, price_eur in zip(rows, prices_eur):
         try:
-            _process_row(row, result)
+            _process_row(row, price_eur, result)
         except Exception as exc:
             result.errors.append(f"{row.isin} ({row.date}): {exc}")
             result.skipped += 1
@@ -267,7 +277,47 @@ def import_transactions(file_content: str, dry_run: bool = False) -> ImportResul
     return result
 
 
-def _process_row(row: ImportRow, result: ImportResult) -> None:
+# ------------------------------------------------------------------
+# Umrechnung zum Kurs des Handelstags
+# ------------------------------------------------------------------
+
+def _trade_date(value: str) -> Optional[date]:
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+
+def _prices_in_eur(rows: List[ImportRow], result: ImportResult) -> List[Optional[Decimal]]:
+    """Preis jeder Zeile in EUR zum EZB-Kurs ihres Handelstags (None = kein Kurs bekannt)."""
+    prices = [row.price if normalize_currency(row.currency) == "EUR" else None for row in rows]
+    foreign = [(index, _trade_date(row.date)) for index, row in enumerate(rows) if prices[index] is None]
+    days = [day for _, day in foreign if day is not None]
+    if not days:
+        return prices
+
+    # Eine Matrix für die ganze Datei → jede Zeile ist ein Listenzugriff, keine Query
+    matrix = RateMatrix.load({rows[index].currency for index, _ in foreign}, start=min(days), end=max(days))
+    missing: dict[str, list] = {}
+    for index, day in foreign:
+        row = rows[index]
+        if row.price is None:
+            continue
+        try:
+            if day is None:
+                raise LookupError(row.date)
+            prices[index] = matrix.convert(row.price, row.currency, day)
+        except (LookupError, ValueError):
+            missing.setdefault(row.currency, []).append(row.date[:10])
+    for currency, dates in missing.items():
+        result.errors.append(
+            f"Hinweis: kein Wechselkurs {currency}/EUR für {len(dates)} Transaktion(en) "
+            f"(z.B. {dates[0]}) — Einstand in EUR bleibt leer, backfill_fx_rates ausführen."
+        )
+    return prices
+
+
+def _process_row(row: ImportRow, price_eur: Optional[Decimal], result: ImportResult) -> None:
     # Asset holen oder anlegen
     asset, created = Asset.objects.get_or_create(
         isin=row.isin,
@@ -287,7 +337,7 @@ def _process_row(row: ImportRow, result: ImportResult) -> None:
     )
 
     if row.tx_type in BUY_TYPES and row.shares > 0:
-        _apply_buy(holding, row)
+        _apply_buy(holding, row, price_eur)
     elif row.tx_type in SELL_TYPES:
         if row.tx_type == "Security transfer" and row.shares < 0:
             row.shares = abs(row.shares)  # Betrag positiv machen
@@ -298,7 +348,17 @@ def _process_row(row: ImportRow, result: ImportResult) -> None:
     result.imported += 1
 
 
-def _apply_buy(holding: Holdings, row: ImportRow) -> None:
+def _apply_buy(holding: Holdings, row: ImportRow, price_eur: Optional[Decimal]) -> None:
+    if price_eur is None or (holding.quantity > 0 and holding.average_purchase_price_eur is None):
+        # Ein Kauf ohne EUR-Kurs macht den EUR-Durchschnitt der ganzen Position unbekannt
+        holding.average_purchase_price_eur = None
+    else:
+        holding.average_purchase_price_eur = _new_average_price(
+            old_qty   = holding.quantity,
+            old_avg   = holding.average_purchase_price_eur,
+            buy_qty   = row.shares,
+            buy_price = price_eur,
+        )
     holding.average_purchase_price = _new_average_price(
         old_qty   = holding.quantity,
         old_avg   = holding.average_purchase_price,
@@ -1,75 +1,333 @@
-import requests
+"""
+Process-wide FX rate service (EUR base, Frankfurter API).
+
+One CurrencyProxy per process (get_fx_service()) is shared by ProviderManager,
+update_prices and the portfolio valuation:
+
+    * refresh-ahead — once rates are older than REFRESH_AHEAD × TTL, the next
+      lookup still answers from memory and triggers one background refresh, so
+      requests normally never wait for the API
+    * last-known-good — if the API is down when rates expire, the previous rates
+      are served (up to MAX_STALE_HOURS) and the refresh is retried after
+      RETRY_SECONDS instead of on every lookup
+    * convert_many() — one freshness check and one rate lookup per distinct
+      currency for a whole batch of amounts
+    * sub-units and symbols — GBp/GBX (pence) convert via GBP / 100, "€", "$" and
+      "£" as scraped from provider pages map to their ISO codes
+
+Fetched rates also go to the shared provider cache (see shared_cache), so other
+processes on the host reuse them and can fall back to them.
+
+Optional settings (all have defaults):
+    FINTECH_FX_API_URL          = "https://api.frankfurter.dev/v1/latest"
+    FINTECH_FX_TTL_MINUTES      = 60
+    FINTECH_FX_REFRESH_AHEAD    = 0.8
+    FINTECH_FX_MAX_STALE_HOURS  = 72    # Wochenende/Feiertage: EZB veröffentlicht nicht
+    FINTECH_FX_RETRY_SECONDS    = 60
+"""
+
 import logging
+import threading
 from decimal import Decimal
 from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from asgiref.sync import sync_to_async
 
-from ...models import Asset
 from ...models_helper.currency_class import CurrencyClass
 from ...libs.general.converter import string2dec
+from .http_transport import HttpTransport, get_transport
+from .shared_cache import get_shared_backend
+from .single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_API_URL = "https://api.frankfurter.dev/v1/latest"
 RATE_TTL_MINUTES = 60   # Kurse nach 60 Minuten neu laden
+REFRESH_AHEAD = 0.8     # ab 80 % der TTL im Hintergrund neu laden
+MAX_STALE_HOURS = 72
+RETRY_SECONDS = 60
+
+# Untereinheiten: Code → (Basiswährung, Teiler)
+SUBUNITS = {"GBp": ("GBP", Decimal("100"))}
+# Schreibweisen von Provider-Seiten → ISO-Code aus CurrencyClass
+CURRENCY_ALIASES = {"€": "EUR", "$": "USD", "£": "GBP", "GBX": "GBp", "GBx": "GBp"}
+
+
+def normalize_currency(currency: str) -> str:
+    """Map provider spellings (symbols, GBX) to CurrencyClass codes; case is kept (GBp ≠ GBP)."""
+    currency = (currency or "").strip()
+    return CURRENCY_ALIASES.get(currency, currency)
+
 
 class CurrencyProxy:
+    """EUR-based FX rates with refresh-ahead and last-known-good fallback."""
 
     def __init__(
         self,
-        api_url: str = "https://api.frankfurter.dev/v1/latest",
+        api_url: str = DEFAULT_API_URL,
         ttl_minutes: int = RATE_TTL_MINUTES,
+        transport: HttpTransport = None,
+        shared_backend=None,
+        refresh_ahead: float = REFRESH_AHEAD,
+        max_stale_hours: float = MAX_STALE_HOURS,
+        retry_seconds: float = RETRY_SECONDS,
     ):
         self.api_url = api_url
+        # Kurse auch mit anderen Prozessen teilen (Worker, update_prices)
+        self.shared_backend = shared_backend if shared_backend is not None else get_shared_backend()
+        self.transport = transport or get_transport()
         self.ttl = timedelta(minutes=ttl_minutes)
+        self.refresh_after = self.ttl * refresh_ahead
+        self.max_stale = timedelta(hours=max_stale_hours)
+        self.retry_after = timedelta(seconds=retry_seconds)
         self.valid_currencies = set(CurrencyClass.values)
-        self._data: dict | None = None
+        self._rates: dict[str, Decimal] | None = None
         self._fetched_at: datetime | None = None
+        self._failed_at: datetime | None = None
+        self.fetch_count = 0
+        self.fallbacks = 0
+
+        # Eine Instanz wird von vielen Threads/Tasks geteilt → nur einer lädt neu
+        self._flight = SingleFlight()
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+
+    @classmethod
+    def from_settings(cls) -> "CurrencyProxy":
+        from django.conf import settings
+
+        return cls(
+            api_url=getattr(settings, "FINTECH_FX_API_URL", DEFAULT_API_URL),
+            ttl_minutes=getattr(settings, "FINTECH_FX_TTL_MINUTES", RATE_TTL_MINUTES),
+            refresh_ahead=getattr(settings, "FINTECH_FX_REFRESH_AHEAD", REFRESH_AHEAD),
+            max_stale_hours=getattr(settings, "FINTECH_FX_MAX_STALE_HOURS", MAX_STALE_HOURS),
+            retry_seconds=getattr(settings, "FINTECH_FX_RETRY_SECONDS", RETRY_SECONDS),
+        )
 
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
 
     def get_rate(self, currency: str) -> Decimal:
-        """Return the EUR-based exchange rate for *currency*.
+        """Return the EUR-based exchange rate for *currency* (units per 1 EUR).
 
         EUR itself is invalid (no conversion needed).
         Raises ValueError for unknown/unsupported currencies.
-        Raises Exception when the API is unreachable.
+        Raises Exception when the API is unreachable and no usable rates are known.
         """
-        if currency == "EUR":
+        currency = self._validate_currency(currency)
+        self.ensure_fresh()
+        return self._rate(currency)
+
+    async def aget_rate(self, currency: str) -> Decimal:
+        """Async variant of get_rate() — a blocking refresh runs in a worker thread."""
+        currency = self._validate_currency(currency)
+        await self.aensure_fresh()
+        return self._rate(currency)
+
+    def convert(self, amount, currency: str) -> Decimal:
+        """Convert *amount* (Decimal or German/English number string) from *currency* to EUR."""
+        return self.convert_many([amount], [currency])[0]
+
+    async def aconvert(self, amount, currency: str) -> Decimal:
+        return (await self.aconvert_many([amount], [currency]))[0]
+
+    def convert_many(self, amounts: Iterable, currencies: Iterable[str]) -> list[Optional[Decimal]]:
+        """Convert amounts[i] from currencies[i] to EUR; None amounts stay None.
+
+        One freshness check for the whole batch, one rate lookup per distinct currency.
+        """
+        amounts, codes = self._prepare_batch(amounts, currencies)
+        if any(code != "EUR" for code in codes):
+            self.ensure_fresh()
+        return self._convert_batch(amounts, codes)
+
+    async def aconvert_many(self, amounts: Iterable, currencies: Iterable[str]) -> list[Optional[Decimal]]:
+        amounts, codes = self._prepare_batch(amounts, currencies)
+        if any(code != "EUR" for code in codes):
+            await self.aensure_fresh()
+        return self._convert_batch(amounts, codes)
+
+    def rates_for(self, currencies: Iterable[str]) -> dict[str, Decimal]:
+        """Rates (units per 1 EUR) for the distinct *currencies*; EUR maps to 1."""
+        codes = {self._validate_currency(currency, allow_eur=True) for currency in currencies}
+        if codes - {"EUR"}:
+            self.ensure_fresh()
+        return {code: Decimal("1") if code == "EUR" else self._rate(code) for code in codes}
+
+    def ensure_fresh(self) -> None:
+        """Make rates usable: load them if expired, refresh ahead in the background if aging."""
+        if self._needs_refresh():
+            self._flight.do("rates", self._refresh)
+        elif self._refresh_due():
+            self._refresh_in_background()
+
+    async def aensure_fresh(self) -> None:
+        if self._needs_refresh():
+            await sync_to_async(self._flight.do, thread_sensitive=False)("rates", self._refresh)
+        elif self._refresh_due():
+            self._refresh_in_background()
+
+    def snapshot(self) -> dict:
+        age = self._age()
+        return {
+            "fetches": self.fetch_count,
+            "fallbacks": self.fallbacks,
+            "as_of": self._fetched_at.isoformat() if self._fetched_at else None,
+            "age_seconds": round(age.total_seconds()) if age is not None else None,
+        }
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _validate_currency(self, currency: str, allow_eur: bool = False) -> str:
+        currency = normalize_currency(currency)
+        if currency == "EUR" and not allow_eur:
             raise ValueError("EUR needs no conversion — handle before calling get_rate().")
         if currency not in self.valid_currencies:
             raise ValueError(f"Unsupported currency: '{currency}'.")
+        return currency
 
-        self._ensure_fresh()
+    def _prepare_batch(self, amounts: Iterable, currencies: Iterable[str]) -> tuple[list, list]:
+        amounts, currencies = list(amounts), list(currencies)
+        if len(amounts) != len(currencies):
+            raise ValueError(f"{len(amounts)} amounts but {len(currencies)} currencies.")
+        codes = [self._validate_currency(currency, allow_eur=True) for currency in currencies]
+        return amounts, codes
 
-        if currency == "GBp":
-            # GBp = pence; API returns GBP (pounds) → multiply by 100
-            rate = string2dec(self._data["rates"]["GBP"]) * Decimal("100")
-        else:
-            rate = string2dec(self._data["rates"][currency])
+    def _convert_batch(self, amounts: list, codes: list) -> list[Optional[Decimal]]:
+        rates = {code: self._rate(code) for code in set(codes) if code != "EUR"}
+        converted = []
+        for amount, code in zip(amounts, codes):
+            if amount is None:
+                converted.append(None)
+                continue
+            amount = amount if isinstance(amount, Decimal) else string2dec(amount)
+            converted.append(amount if code == "EUR" else amount / rates[code])
+        return converted
 
+    def _rate(self, currency: str) -> Decimal:
+        if self._rates is None:
+            raise RuntimeError("Exchange rates not loaded.")
+        if currency in SUBUNITS:
+            # z.B. GBp = Pence; API liefert GBP (Pfund) → 1 EUR = rate × 100 Pence
+            base, divisor = SUBUNITS[currency]
+            rate = self._rates[base] * divisor
+        else:
+            rate = self._rates[currency]
         logger.info(f"Exchange rate {currency}/EUR = {rate}")
         return rate
 
-    # ------------------------------------------------------------------
-    # Internal helpers
-    # ------------------------------------------------------------------
+    def _age(self) -> Optional[timedelta]:
+        if self._fetched_at is None:
+            return None
+        return datetime.now(timezone.utc) - self._fetched_at
 
-    def _is_stale(self) -> bool:
-        """True when data has never been fetched or TTL has expired."""
-        if self._data is None or self._fetched_at is None:
+    def _needs_refresh(self) -> bool:
+        """True when a caller has to wait: no rates, or expired and no recent failed attempt."""
+        age = self._age()
+        if self._rates is None or age is None:
             return True
-        return datetime.now(timezone.utc) - self._fetched_at > self.ttl  # war: nie erneuert
+        if age <= self.ttl:
+            return False
+        # Abgelaufen: API gerade erst gescheitert → Last-known-good weiterverwenden
+        return not self._recently_failed() or age > self.max_stale
+
+    def _refresh_due(self) -> bool:
+        age = self._age()
+        return age is not None and age > self.refresh_after and not self._recently_failed()
+
+    def _recently_failed(self) -> bool:
+        return self._failed_at is not None and datetime.now(timezone.utc) - self._failed_at < self.retry_after
 
-    def _ensure_fresh(self) -> None:
-        if self._is_stale():
-            self._fetch_rates()
+    def _refresh_in_background(self) -> None:
+        with self._refresh_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, name="fx-refresh", daemon=True).start()
 
-    def _fetch_rates(self) -> None:
+    def _background_refresh(self) -> None:
+        try:
+            self._flight.do("rates", self._refresh)
+        except Exception as exc:
+            logger.warning(f"Background FX refresh failed: {exc}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing = False
+
+    def _refresh(self) -> None:
+        """Load rates: shared cache if young enough, else the API; keep last-known-good on failure."""
+        age = self._age()
+        if age is not None and age <= self.refresh_after:
+            return  # ein anderer Aufrufer hat gerade erst geladen
+        if self._load_shared(max_age=self.refresh_after):
+            return
         logger.info(f"Fetching exchange rates from {self.api_url}")
-        response = requests.get(self.api_url, timeout=10)
-        response.raise_for_status()
+        try:
+            response = self.transport.get(self.api_url)
+            response.raise_for_status()
+            self._store_rates(response.json())
+        except Exception as exc:
+            self._failed_at = datetime.now(timezone.utc)
+            # Anderer Prozess hat evtl. neuere Kurse; sonst eigene, solange nicht zu alt
+            self._load_shared(max_age=self.max_stale)
+            age = self._age()
+            if self._rates is None or age is None or age > self.max_stale:
+                raise
+            self.fallbacks += 1
+            logger.warning(f"Exchange rates unavailable ({exc}); using rates from {self._fetched_at.isoformat()}")
 
-        self._data = response.json()
+    def _store_rates(self, data: dict) -> None:
+        self._rates = {code: string2dec(rate) for code, rate in data["rates"].items()}
         self._fetched_at = datetime.now(timezone.utc)
+        self._failed_at = None
+        self.fetch_count += 1
         logger.info(f"Exchange rates refreshed at {self._fetched_at.isoformat()}")
+        try:
+            # So lange aufbewahren, wie sie als Last-known-good taugen
+            shared = {
+                "rates": {code: str(rate) for code, rate in self._rates.items()},
+                "fetched_at": self._fetched_at.isoformat(),
+            }
+            self.shared_backend.set(self._shared_key(), shared, self.max_stale.total_seconds())
+        except Exception as exc:
+            logger.warning(f"Exchange rates not shared: {exc}")
+
+    def _load_shared(self, max_age: timedelta) -> bool:
+        """Take rates another process fetched within *max_age* if newer than ours; True on success."""
+        try:
+            shared = self.shared_backend.get(self._shared_key())
+        except Exception as exc:
+            logger.warning(f"Shared exchange rates unavailable: {exc}")
+            return False
+        if not shared:
+            return False
+        fetched_at = datetime.fromisoformat(shared["fetched_at"])
+        if datetime.now(timezone.utc) - fetched_at > max_age:
+            return False
+        if self._fetched_at is not None and fetched_at <= self._fetched_at:
+            return False
+        self._rates = {code: Decimal(rate) for code, rate in shared["rates"].items()}
+        self._fetched_at = fetched_at
+        logger.info(f"Exchange rates from shared cache ({fetched_at.isoformat()})")
+        return True
+
+    def _shared_key(self) -> str:
+        return f"fintech:fx:rates:{self.api_url}"
+
+
+_fx_service: Optional[CurrencyProxy] = None
+_fx_lock = threading.Lock()
+
+
+def get_fx_service() -> CurrencyProxy:
+    """Return the process-wide CurrencyProxy, creating it from settings on first use."""
+    global _fx_service
+    if _fx_service is None:
+        with _fx_lock:
+            if _fx_service is None:
+                _fx_service = CurrencyProxy.from_settings()
+    return _fx_service
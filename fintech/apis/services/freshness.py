@@ -0,0 +1,192 @@
+"""
+Freshness policy for update_prices: which assets are due, and in which order.
+
+Each asset class has its own price TTL (crypto trades around the clock, funds
+publish one NAV per day). Due assets are selected in SQL — only the columns the
+refresh needs — and ordered by priority:
+
+    1. held assets (Holdings with quantity > 0)
+    2. watchlist-only assets
+    3. everything else
+
+and within a tier the stalest first (never priced before any priced asset), so
+a limited refresh budget (--limit) goes where it matters. due_page() walks that
+order in keyset-paginated chunks, so large asset universes are never loaded at
+once; due_counts() gives the per-tier totals with one COUNT query.
+
+With a MarketCalendar (default, see market_calendar) the TTL only applies while
+the asset's market is open; a closed market gets one post-close fetch and is
+then left alone until the next session. Assets without any price are always due.
+
+Optional settings (all have defaults):
+    FINTECH_PRICE_TTL_MINUTES         = {"CRYPTO": 5, "FOND": 24 * 60}   # per asset class
+    FINTECH_PRICE_TTL_DEFAULT_MINUTES = 60
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+from django.db.models import Case, Count, Exists, F, IntegerField, OuterRef, Q, QuerySet, Value, When
+
+from ...models import Asset, Holdings, WatchlistEntry
+from ...models_helper.asset_class import AssetClass
+from .market_calendar import MarketCalendar
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_MINUTES = {
+    AssetClass.CRYPTO.value: 5,
+    AssetClass.FOND.value: 24 * 60,
+}
+DEFAULT_TTL_DEFAULT_MINUTES = 60
+
+TIER_HELD = 0
+TIER_WATCHED = 1
+TIER_OTHER = 2
+
+SELECT_FIELDS = ("isin", "asset_class", "current_price_timestamp")
+
+
+class FreshnessPolicy:
+    """Per-asset-class price TTLs plus the priority order of due assets."""
+
+    def __init__(
+        self,
+        ttl_minutes: dict = None,
+        default_ttl_minutes: float = DEFAULT_TTL_DEFAULT_MINUTES,
+        calendar: MarketCalendar = None,
+    ):
+        self.calendar = calendar
+        ttl_minutes = DEFAULT_TTL_MINUTES if ttl_minutes is None else ttl_minutes
+        self.default_ttl = timedelta(minutes=default_ttl_minutes)
+        self.ttls = {
+            asset_class: timedelta(minutes=ttl_minutes.get(asset_class, default_ttl_minutes))
+            for asset_class in AssetClass.values
+        }
+
+    @classmethod
+    def from_settings(cls) -> "FreshnessPolicy":
+        from django.conf import settings
+
+        return cls(
+            ttl_minutes={
+                **DEFAULT_TTL_MINUTES,
+                **getattr(settings, "FINTECH_PRICE_TTL_MINUTES", {}),
+            },
+            default_ttl_minutes=getattr(settings, "FINTECH_PRICE_TTL_DEFAULT_MINUTES", DEFAULT_TTL_DEFAULT_MINUTES),
+            calendar=MarketCalendar.from_settings(),
+        )
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def ttl(self, asset_class: str) -> timedelta:
+        return self.ttls.get(asset_class, self.default_ttl)
+
+    def is_due(self, asset: Asset, now: datetime) -> bool:
+        """Python-side check for a single asset (same rule as due_filter())."""
+        timestamp = asset.current_price_timestamp
+        if timestamp is None or asset.current_price is None:
+            return True
+        market = self.calendar.market_for(asset) if self.calendar else None
+        if market is None or market.is_open(now):
+            return timestamp < now - self.ttl(asset.asset_class)
+        cutoff = self.calendar.post_close_cutoff(market, now)
+        return cutoff is not None and timestamp < cutoff
+
+    def due_filter(self, now: datetime) -> Q:
+        """Q for assets of a known class whose price is missing or expired (see module doc)."""
+        missing = Q(current_price_timestamp__isnull=True) | Q(current_price__isnull=True)
+        expired = self._expired_q(now)
+        if self.calendar is not None:
+            scheduled = Q(pk__in=[])
+            for market, market_q in self.calendar.groups():
+                if market.is_open(now):
+                    scheduled |= market_q & expired
+                    continue
+                cutoff = self.calendar.post_close_cutoff(market, now)
+                if cutoff is not None:
+                    scheduled |= market_q & Q(current_price_timestamp__lt=cutoff)
+            expired = scheduled
+        return Q(asset_class__in=AssetClass.values) & (missing | expired)
+
+    def closed_markets(self, now: datetime) -> list[str]:
+        if self.calendar is None:
+            return []
+        return [market.name for market, _ in self.calendar.groups() if not market.is_open(now)]
+
+    def due_assets(self, now: datetime, isin: str = None) -> QuerySet:
+        """Due assets, narrow columns, ordered by tier and staleness."""
+        qs = Asset.objects.filter(self.due_filter(now))
+        if isin:
+            qs = qs.filter(isin=isin.upper())
+        held = Holdings.objects.filter(asset=OuterRef("pk"), quantity__gt=0)
+        watched = WatchlistEntry.objects.filter(asset=OuterRef("pk"))
+        return (
+            qs.annotate(
+                tier=Case(
+                    When(Exists(held), then=Value(TIER_HELD)),
+                    When(Exists(watched), then=Value(TIER_WATCHED)),
+                    default=Value(TIER_OTHER),
+                    output_field=IntegerField(),
+                )
+            )
+            .only(*SELECT_FIELDS)
+            .order_by("tier", F("current_price_timestamp").asc(nulls_first=True), "isin")
+        )
+
+    def due_page(self, now: datetime, after: tuple = None, size: int = 500, isin: str = None) -> list[Asset]:
+        """Next *size* due assets after the key (tier, current_price_timestamp, isin) of the previous page."""
+        qs = self.due_assets(now, isin=isin)
+        if after is not None:
+            qs = qs.filter(_after_key(*after))
+        return list(qs[:size])
+
+    def due_counts(self, now: datetime, isin: str = None) -> dict[int, int]:
+        """Number of due assets per tier (TIER_HELD, TIER_WATCHED, TIER_OTHER)."""
+        rows = self.due_assets(now, isin=isin).order_by().values("tier").annotate(n=Count("pk"))
+        counts = {TIER_HELD: 0, TIER_WATCHED: 0, TIER_OTHER: 0}
+        for row in rows:
+            counts[row["tier"]] = row["n"]
+        return counts
+
+    @staticmethod
+    def page_key(asset: Asset) -> tuple:
+        return asset.tier, asset.current_price_timestamp, asset.isin
+
+    def describe(self) -> str:
+        parts = [f"{asset_class} {_minutes(ttl)}" for asset_class, ttl in sorted(self.ttls.items())]
+        return ", ".join(parts)
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _expired_q(self, now: datetime) -> Q:
+        expired = Q()
+        # Klassen mit gleicher TTL zusammenfassen → wenige, indexfreundliche Bedingungen
+        by_ttl: dict = {}
+        for asset_class, ttl in self.ttls.items():
+            by_ttl.setdefault(ttl, []).append(asset_class)
+        for ttl, classes in by_ttl.items():
+            expired |= Q(asset_class__in=classes, current_price_timestamp__lt=now - ttl)
+        return expired
+
+
+def _after_key(tier: int, timestamp, isin: str) -> Q:
+    # Keyset hinter (tier, timestamp, isin) in der Sortierung von due_assets (NULL-Zeitstempel zuerst)
+    if timestamp is None:
+        same_tier = Q(current_price_timestamp__isnull=True, isin__gt=isin) | Q(current_price_timestamp__isnull=False)
+    else:
+        same_tier = Q(current_price_timestamp__gt=timestamp) | Q(current_price_timestamp=timestamp, isin__gt=isin)
+    return Q(tier__gt=tier) | (Q(tier=tier) & same_tier)
+
+
+def _minutes(ttl: timedelta) -> str:
+    minutes = int(ttl.total_seconds() // 60)
+    if minutes and minutes % (24 * 60) == 0:
+        return f"{minutes // (24 * 60)}d"
+    if minutes and minutes % 60 == 0:
+        return f"{minutes // 60}h"
+    return f"{minutes}min"
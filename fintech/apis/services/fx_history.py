@@ -0,0 +1,236 @@
+"""
+Historical FX rates: ExchangeRate table plus an in-memory date × currency matrix.
+
+fetch_history() loads ECB reference rates for a date range from the Frankfurter
+time-series endpoint in chunks; store_history() writes them to ExchangeRate in
+bulk (insert new rows, update changed ones). The backfill_fx_rates command
+combines both.
+
+RateMatrix holds one dense column per currency, indexed by day offset from its
+start date and forward-filled over weekends and holidays, so the rate of any day
+is a single list access. convert_many() converts whole price histories or
+transaction ledgers (amount, currency, day) without a query or HTTP call per row.
+The CSV transaction import (csv_import) converts foreign-currency trade prices
+with it at the rate of their trade day.
+
+Optional settings (all have defaults):
+    FINTECH_FX_HISTORY_URL = "https://api.frankfurter.dev/v1"
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from ...models import ExchangeRate
+from ...libs.general.converter import string2dec
+from .exchange_rate_proxy import SUBUNITS, normalize_currency
+from .http_transport import HttpTransport, get_transport
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_URL = "https://api.frankfurter.dev/v1"
+DEFAULT_CHUNK_DAYS = 90
+BULK_BATCH_SIZE = 500
+
+
+@dataclass
+class StoreResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+
+def fetch_history(
+    start: date,
+    end: date,
+    currencies: Iterable[str] = None,
+    chunk_days: int = DEFAULT_CHUNK_DAYS,
+    transport: HttpTransport = None,
+    base_url: str = None,
+) -> dict[date, dict[str, Decimal]]:
+    """EUR rates per publication day in [start, end], one request per *chunk_days*."""
+    from django.conf import settings
+
+    transport = transport or get_transport()
+    base_url = base_url or getattr(settings, "FINTECH_FX_HISTORY_URL", DEFAULT_HISTORY_URL)
+    params = {"symbols": ",".join(sorted(currencies))} if currencies else {}
+
+    history: dict[date, dict[str, Decimal]] = {}
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(end, chunk_start + timedelta(days=chunk_days - 1))
+        url = f"{base_url}/{chunk_start.isoformat()}..{chunk_end.isoformat()}"
+        logger.info(f"Fetching exchange rate history {url}")
+        response = transport.get(url, params=params)
+        response.raise_for_status()
+        for day, rates in response.json().get("rates", {}).items():
+            history[date.fromisoformat(day)] = {
+                currency: Decimal(str(rate)) for currency, rate in rates.items()
+            }
+        chunk_start = chunk_end + timedelta(days=1)
+    return history
+
+
+def store_history(history: dict[date, dict[str, Decimal]]) -> StoreResult:
+    """Write *history* to ExchangeRate: bulk insert new rows, bulk update changed ones."""
+    result = StoreResult()
+    if not history:
+        return result
+
+    existing = {
+        (row.date, row.currency): row
+        for row in ExchangeRate.objects.filter(date__gte=min(history), date__lte=max(history))
+    }
+    to_create, to_update = [], []
+    for day, rates in history.items():
+        for currency, rate in rates.items():
+            row = existing.get((day, currency))
+            if row is None:
+                to_create.append(ExchangeRate(date=day, currency=currency, rate=rate))
+            elif row.rate != rate:
+                row.rate = rate
+                to_update.append(row)
+            else:
+                result.unchanged += 1
+
+    with transaction.atomic():
+        ExchangeRate.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+        ExchangeRate.objects.bulk_update(to_update, ["rate"], batch_size=BULK_BATCH_SIZE)
+    result.created, result.updated = len(to_create), len(to_update)
+    return result
+
+
+class RateMatrix:
+    """Dense date × currency table of EUR rates (units per 1 EUR), forward-filled.
+
+    Days after the last stored day use the last known rate; days before a
+    currency's first rate raise LookupError. A matrix loaded from *start* begins
+    exactly there, seeded with each currency's last rate before *start*.
+    """
+
+    def __init__(self, start: date, columns: dict[str, list]):
+        self.start = start
+        self.columns = columns
+        self.days = max((len(column) for column in columns.values()), default=0)
+        self._start_ordinal = start.toordinal()
+
+    @classmethod
+    def load(cls, currencies: Iterable[str] = None, start: date = None, end: date = None) -> "RateMatrix":
+        """Build the matrix from the ExchangeRate table (optionally limited to *currencies*/range).
+
+        With *start*, the latest rate per currency before *start* is loaded too and
+        placed on *start*, so a range beginning on a weekend or holiday is covered.
+        """
+        base = ExchangeRate.objects.all()
+        if currencies:
+            base = base.filter(currency__in=cls._base_currencies(currencies))
+        qs = base
+        if start:
+            qs = qs.filter(date__gte=start)
+        if end:
+            qs = qs.filter(date__lte=end)
+        rows = list(qs.order_by("date").values_list("date", "currency", "rate"))
+        if start:
+            rows = [(start, currency, rate) for currency, rate in cls._rates_before(base, start)] + rows
+        if not rows:
+            return cls(start or timezone.localdate(), {})
+        return cls.from_rows(rows, start=start)
+
+    @classmethod
+    def from_rows(cls, rows: list, start: date = None) -> "RateMatrix":
+        """Build from (date, currency, rate) tuples; gaps are filled with the previous rate.
+
+        Later rows for the same day win. *start* anchors the matrix (rows before it are ignored).
+        """
+        if start:
+            rows = [row for row in rows if row[0] >= start]
+        first = start or min(row[0] for row in rows)
+        last = max((row[0] for row in rows), default=first)
+        size = (last - first).days + 1
+        columns: dict[str, list] = {}
+        for day, currency, rate in rows:
+            columns.setdefault(currency, [None] * size)[(day - first).days] = rate
+        for column in columns.values():
+            previous = None
+            for index, rate in enumerate(column):
+                if rate is None:
+                    column[index] = previous
+                else:
+                    previous = rate
+        return cls(first, columns)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    @property
+    def end(self) -> Optional[date]:
+        return self.start + timedelta(days=self.days - 1) if self.days else None
+
+    def rate(self, currency: str, day) -> Decimal:
+        """Rate of *currency* on *day* (date or datetime); EUR is 1."""
+        currency = normalize_currency(currency)
+        if currency == "EUR":
+            return Decimal("1")
+        base, factor = SUBUNITS.get(currency, (currency, Decimal("1")))
+        column = self.columns.get(base)
+        if column is None:
+            raise LookupError(f"No exchange rates for {currency}.")
+        offset = self._offset(day)
+        rate = column[min(offset, self.days - 1)] if offset >= 0 else None
+        if rate is None:
+            raise LookupError(f"No exchange rate for {currency} on {self._as_date(day)}.")
+        return rate * factor
+
+    def convert(self, amount, currency: str, day) -> Decimal:
+        """Convert *amount* from *currency* to EUR at the rate of *day*."""
+        return self.convert_many([amount], [currency], [day])[0]
+
+    def convert_many(self, amounts: Iterable, currencies: Iterable[str], days: Iterable) -> list[Optional[Decimal]]:
+        """Convert amounts[i] from currencies[i] at days[i] to EUR; None amounts stay None."""
+        amounts, currencies, days = list(amounts), list(currencies), list(days)
+        if not len(amounts) == len(currencies) == len(days):
+            raise ValueError(f"{len(amounts)} amounts, {len(currencies)} currencies, {len(days)} days.")
+        converted = []
+        for amount, currency, day in zip(amounts, currencies, days):
+            if amount is None:
+                converted.append(None)
+                continue
+            amount = amount if isinstance(amount, Decimal) else string2dec(amount)
+            converted.append(amount / self.rate(currency, day))
+        return converted
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _base_currencies(currencies: Iterable[str]) -> set[str]:
+        codes = {normalize_currency(currency) for currency in currencies}
+        return {SUBUNITS.get(code, (code,))[0] for code in codes} - {"EUR"}
+
+    @staticmethod
+    def _rates_before(qs, start: date) -> list[tuple[str, Decimal]]:
+        """(currency, rate) of the latest row before *start* for each currency in *qs*."""
+        latest = ExchangeRate.objects.filter(
+            currency=OuterRef("currency"), date__lt=start,
+        ).order_by("-date").values("date")[:1]
+        return list(
+            qs.filter(date__lt=start, date=Subquery(latest)).values_list("currency", "rate")
+        )
+
+    @staticmethod
+    def _as_date(day) -> date:
+        if isinstance(day, datetime):
+            # Zeitstempel in lokaler Zeit → Kalendertag des Kurses
+            return timezone.localtime(day).date() if timezone.is_aware(day) else day.date()
+        return day
+
+    def _offset(self, day) -> int:
+        return self._as_date(day).toordinal() - self._start_ordinal
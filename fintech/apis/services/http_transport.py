@@ -0,0 +1,294 @@
+"""
+Shared HTTP transport for all provider requests (Comdirect, AlleAktien, JustETF, Frankfurter).
+
+One requests.Session per process keeps TCP/TLS connections alive between lookups.
+urllib3 keeps a separate connection pool per host, so a full update_prices run
+only pays one handshake per host and pool slot instead of one per ISIN.
+
+AsyncHttpTransport is the asyncio counterpart (httpx.AsyncClient) used by the
+async provider path in update_prices. Every host gets an adaptive limiter (token
+bucket + AIMD concurrency, see rate_limit.py), so hundreds of lookups can run on
+one event loop without hammering a single provider: 429/5xx or rising latency
+make it back off, healthy responses let it ramp up again.
+
+Both transports offer get_prefix(): the body is streamed and the read stops as soon
+as a marker (e.g. </head>) or a byte budget is reached. The connection is then
+closed instead of downloading the rest of the page.
+
+Optional settings (all have defaults):
+    FINTECH_HTTP_POOL_CONNECTIONS = 10   # number of host pools kept alive
+    FINTECH_HTTP_POOL_MAXSIZE     = 10   # connections per host
+    FINTECH_HTTP_CONNECT_TIMEOUT  = 5    # seconds
+    FINTECH_HTTP_READ_TIMEOUT     = 10   # seconds
+    FINTECH_HTTP_ASYNC_MAX_CONNECTIONS = 100  # async: total connections
+    FINTECH_HTTP_ASYNC_PER_HOST        = 20   # async: max in-flight requests per host
+    FINTECH_HTTP_HOST_MIN_CONCURRENCY  = 1    # async: AIMD floor per host
+    FINTECH_HTTP_HOST_RATE             = 10   # async: start rate per host (req/s)
+    FINTECH_HTTP_HOST_MAX_RATE         = 50   # async: rate ceiling per host (req/s)
+    FINTECH_HTTP_PREFIX_MAX_BYTES      = 256 * 1024  # get_prefix(): default byte budget
+"""
+
+import logging
+import re
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from .rate_limit import (
+    DEFAULT_MAX_RATE, DEFAULT_MIN_CONCURRENCY, DEFAULT_RATE, AdaptiveHostLimiter, retry_after_seconds,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 10
+DEFAULT_ASYNC_MAX_CONNECTIONS = 100
+DEFAULT_ASYNC_PER_HOST = 20
+DEFAULT_PREFIX_MAX_BYTES = 256 * 1024
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# Fehler, die auf einen gestörten Provider deuten (Timeout, Verbindung, HTTP 429/5xx)
+TRANSPORT_ERRORS = (requests.RequestException, httpx.HTTPError)
+
+
+class PrefixResponse:
+    """Body prefix of a streamed response (see get_prefix()).
+
+    Offers the attributes StockRequest needs from a full response: status_code,
+    content and raise_for_status(). *complete* is False when the read stopped early.
+    """
+
+    def __init__(self, response, content: bytes, complete: bool):
+        self._response = response
+        self.status_code = response.status_code
+        self.content = content
+        self.complete = complete
+
+    def raise_for_status(self) -> None:
+        self._response.raise_for_status()
+
+
+class _PrefixBuffer:
+    """Collects chunks until *until* matches or *max_bytes* are read."""
+
+    def __init__(self, until: Optional[re.Pattern], max_bytes: int):
+        self.until = until
+        self.max_bytes = max_bytes
+        self.data = bytearray()
+        self.stopped_early = False
+
+    def feed(self, chunk: bytes) -> bool:
+        """Append *chunk*; True when reading can stop."""
+        # Marker kann über eine Chunk-Grenze laufen → etwas Überlappung mitsuchen
+        start = max(0, len(self.data) - 64)
+        self.data += chunk
+        if self.until is not None:
+            match = self.until.search(self.data, start)
+            if match:
+                del self.data[match.end():]
+                self.stopped_early = True
+                return True
+        if len(self.data) >= self.max_bytes:
+            del self.data[self.max_bytes:]
+            self.stopped_early = True
+            return True
+        return False
+
+
+class HttpTransport:
+    """Pooled, keep-alive HTTP client shared by StockRequest and CurrencyProxy."""
+
+    def __init__(
+        self,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        prefix_max_bytes: int = DEFAULT_PREFIX_MAX_BYTES,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_maxsize = pool_maxsize
+        self.prefix_max_bytes = prefix_max_bytes
+        self.session = requests.Session()
+
+        # pool_block=False: bei Überlauf wird eine Zusatzverbindung geöffnet statt zu warten
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=False,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GET *url* over a pooled connection; default timeout applies unless given."""
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def get_prefix(self, url: str, until: re.Pattern = None, max_bytes: int = None) -> PrefixResponse:
+        """Stream *url* and stop after the first match of *until* (bytes pattern) or *max_bytes*."""
+        response = self.get(url, stream=True)
+        buffer = _PrefixBuffer(until, max_bytes or self.prefix_max_bytes)
+        try:
+            if response.status_code >= 400:
+                return PrefixResponse(response, response.content, complete=True)
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                if buffer.feed(chunk):
+                    break
+        finally:
+            # Abbruch mitten im Body: Verbindung wird geschlossen statt in den Pool zurückgegeben
+            response.close()
+        logger.info(f"Read {len(buffer.data)} bytes of {url} (stopped early: {buffer.stopped_early})")
+        return PrefixResponse(response, bytes(buffer.data), complete=not buffer.stopped_early)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_shared_transport: Optional[HttpTransport] = None
+_shared_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """Return the process-wide HttpTransport, creating it from settings on first use."""
+    global _shared_transport
+    if _shared_transport is None:
+        with _shared_lock:
+            if _shared_transport is None:
+                _shared_transport = _transport_from_settings()
+    return _shared_transport
+
+
+class AsyncHttpTransport:
+    """Pooled asyncio HTTP client with adaptive per-host limits.
+
+    The underlying httpx.AsyncClient is created lazily and is bound to the event
+    loop of its first request — create one transport per run and aclose() it.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_ASYNC_MAX_CONNECTIONS,
+        per_host: int = DEFAULT_ASYNC_PER_HOST,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        prefix_max_bytes: int = DEFAULT_PREFIX_MAX_BYTES,
+        min_per_host: int = DEFAULT_MIN_CONCURRENCY,
+        host_rate: float = DEFAULT_RATE,
+        host_max_rate: float = DEFAULT_MAX_RATE,
+    ):
+        self.max_connections = max_connections
+        self.prefix_max_bytes = prefix_max_bytes
+        self.per_host = per_host
+        self.min_per_host = min_per_host
+        self.host_rate = host_rate
+        self.host_max_rate = host_max_rate
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, AdaptiveHostLimiter] = {}
+
+    @classmethod
+    def from_settings(cls) -> "AsyncHttpTransport":
+        from django.conf import settings
+
+        return cls(
+            max_connections=getattr(settings, "FINTECH_HTTP_ASYNC_MAX_CONNECTIONS", DEFAULT_ASYNC_MAX_CONNECTIONS),
+            per_host=getattr(settings, "FINTECH_HTTP_ASYNC_PER_HOST", DEFAULT_ASYNC_PER_HOST),
+            connect_timeout=getattr(settings, "FINTECH_HTTP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT),
+            read_timeout=getattr(settings, "FINTECH_HTTP_READ_TIMEOUT", DEFAULT_READ_TIMEOUT),
+            prefix_max_bytes=getattr(settings, "FINTECH_HTTP_PREFIX_MAX_BYTES", DEFAULT_PREFIX_MAX_BYTES),
+            min_per_host=getattr(settings, "FINTECH_HTTP_HOST_MIN_CONCURRENCY", DEFAULT_MIN_CONCURRENCY),
+            host_rate=getattr(settings, "FINTECH_HTTP_HOST_RATE", DEFAULT_RATE),
+            host_max_rate=getattr(settings, "FINTECH_HTTP_HOST_MAX_RATE", DEFAULT_MAX_RATE),
+        )
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        """GET *url*; waits for a slot and a token of the target host first."""
+        limiter = self._host_limit(urlsplit(url).netloc)
+        await limiter.acquire()
+        started = time.monotonic()
+        status, failed, retry_after = None, False, None
+        try:
+            response = await self._get_client().get(url, **kwargs)
+            status, retry_after = response.status_code, retry_after_seconds(response.headers)
+            return response
+        except httpx.TransportError:
+            failed = True
+            raise
+        finally:
+            limiter.release(status, time.monotonic() - started, failed, retry_after)
+
+    async def get_prefix(self, url: str, until: re.Pattern = None, max_bytes: int = None) -> PrefixResponse:
+        """Async variant of HttpTransport.get_prefix()."""
+        buffer = _PrefixBuffer(until, max_bytes or self.prefix_max_bytes)
+        limiter = self._host_limit(urlsplit(url).netloc)
+        await limiter.acquire()
+        started = time.monotonic()
+        status, failed, retry_after = None, False, None
+        try:
+            async with self._get_client().stream("GET", url) as response:
+                status, retry_after = response.status_code, retry_after_seconds(response.headers)
+                if response.status_code >= 400:
+                    await response.aread()
+                    return PrefixResponse(response, response.content, complete=True)
+                async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                    if buffer.feed(chunk):
+                        break
+        except httpx.TransportError:
+            failed = True
+            raise
+        finally:
+            limiter.release(status, time.monotonic() - started, failed, retry_after)
+        logger.info(f"Read {len(buffer.data)} bytes of {url} (stopped early: {buffer.stopped_early})")
+        return PrefixResponse(response, bytes(buffer.data), complete=not buffer.stopped_early)
+
+    def host_limits(self) -> dict:
+        """Current adaptive limits per host (limit, peak_limit, rate, throttled)."""
+        return {host: limiter.snapshot() for host, limiter in self._host_limits.items()}
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                follow_redirects=True,  # wie requests.get
+            )
+        return self._client
+
+    def _host_limit(self, host: str) -> AdaptiveHostLimiter:
+        if host not in self._host_limits:
+            self._host_limits[host] = AdaptiveHostLimiter(
+                host, self.per_host, self.min_per_host, self.host_rate, self.host_max_rate,
+            )
+        return self._host_limits[host]
+
+
+def _transport_from_settings() -> HttpTransport:
+    from django.conf import settings
+
+    transport = HttpTransport(
+        pool_connections=getattr(settings, "FINTECH_HTTP_POOL_CONNECTIONS", DEFAULT_POOL_CONNECTIONS),
+        pool_maxsize=getattr(settings, "FINTECH_HTTP_POOL_MAXSIZE", DEFAULT_POOL_MAXSIZE),
+        connect_timeout=getattr(settings, "FINTECH_HTTP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT),
+        read_timeout=getattr(settings, "FINTECH_HTTP_READ_TIMEOUT", DEFAULT_READ_TIMEOUT),
+        prefix_max_bytes=getattr(settings, "FINTECH_HTTP_PREFIX_MAX_BYTES", DEFAULT_PREFIX_MAX_BYTES),
+    )
+    logger.info(
+        f"HTTP transport ready (pool_maxsize={transport.pool_maxsize}, timeout={transport.timeout})"
+    )
+    return transport
@@ -0,0 +1,347 @@
+"""
+Local job queue: the Job table is the queue, run_worker executes it.
+
+Web requests enqueue() work and return immediately; one or more run_worker
+processes claim due jobs and run the registered handler:
+
+    job = enqueue("update_prices", dedupe_key="update_prices")
+    ...
+    Job.objects.get(pk=job.pk).status / .progress / .result
+
+Claiming locks the open jobs of one type (select_for_update) so the per-type
+concurrency limit holds across workers; other types are claimed in parallel.
+A failed attempt is re-queued with exponential backoff until max_attempts is
+reached. Running jobs carry a heartbeat; a job whose heartbeat is older than the
+lease (worker killed, container restarted) is re-queued or failed by the next
+worker.
+
+Job types are registered with @job_type(name, concurrency=..., max_attempts=...);
+the built-in types (update_prices, clean_up, import_transactions) are at the end
+of this module. Handlers get a JobContext for progress reports and return a
+JSON-serialisable result. Progress reaches the table with the worker's heartbeat.
+
+Optional settings (all have defaults):
+    FINTECH_JOB_LEASE_SECONDS        = 300
+    FINTECH_JOB_BACKOFF_SECONDS      = 30
+    FINTECH_JOB_MAX_BACKOFF_SECONDS  = 3600
+    FINTECH_JOB_RETENTION_DAYS       = 30
+"""
+
+import io
+import logging
+import threading
+import traceback
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from typing import Callable, Iterable, Optional
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from ...models import ImportUpload, Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_BACKOFF_SECONDS = 30
+DEFAULT_MAX_BACKOFF_SECONDS = 3600
+DEFAULT_RETENTION_DAYS = 30
+
+
+@dataclass
+class JobType:
+    name: str
+    handler: Callable
+    concurrency: int = 1
+    max_attempts: int = 3
+
+
+_registry: dict[str, JobType] = {}
+
+
+def job_type(name: str, concurrency: int = 1, max_attempts: int = 3):
+    """Register the decorated function as handler for *name*: handler(ctx, **payload) -> result."""
+    def register(handler: Callable) -> Callable:
+        _registry[name] = JobType(name, handler, concurrency, max_attempts)
+        return handler
+    return register
+
+
+def registered_types() -> dict[str, JobType]:
+    return dict(_registry)
+
+
+class JobContext:
+    """Handed to handlers. progress() only updates memory — it may be called from an event
+    loop; the worker persists it together with its heartbeat (see heartbeat())."""
+
+    def __init__(self, job: Job):
+        self.job = job
+        self._lock = threading.Lock()
+
+    def progress(self, **data) -> None:
+        with self._lock:
+            self.job.progress = {**(self.job.progress or {}), **data}
+
+    def snapshot(self) -> Optional[dict]:
+        with self._lock:
+            return dict(self.job.progress) if self.job.progress is not None else None
+
+
+# ----------------------------------------------------------------------
+# Public API
+# ----------------------------------------------------------------------
+
+def enqueue(name: str, payload: dict = None, dedupe_key: str = None, priority: int = 0,
+            delay_seconds: float = 0, max_attempts: int = None) -> Job:
+    """Queue a job; with *dedupe_key* an already open job with that key is returned instead."""
+    if name not in _registry:
+        raise ValueError(f"Unknown job type '{name}' ({', '.join(sorted(_registry))}).")
+    job = Job(
+        job_type=name,
+        payload=payload or {},
+        dedupe_key=dedupe_key,
+        priority=priority,
+        run_after=timezone.now() + timedelta(seconds=delay_seconds),
+        max_attempts=max_attempts or _registry[name].max_attempts,
+    )
+    if dedupe_key is None:
+        job.save()
+        logger.info(f"Job {job} queued")
+        return job
+    for attempt in range(2):
+        existing = Job.objects.filter(dedupe_key=dedupe_key, status__in=Job.OPEN_STATUSES).first()
+        if existing is not None:
+            return existing
+        try:
+            with transaction.atomic():
+                job.save()
+            logger.info(f"Job {job} queued")
+            return job
+        except IntegrityError:
+            # Gleichzeitig von einem anderen Request angelegt → dessen Job verwenden
+            job.pk = None
+            if attempt:
+                raise
+    return job
+
+
+def claim(worker_id: str, job_types: Iterable[str] = None) -> Optional[Job]:
+    """Mark the next due job as running for *worker_id*, respecting per-type concurrency."""
+    now = timezone.now()
+    allowed = set(job_types) if job_types else set(_registry)
+    candidates = (
+        Job.objects
+        .filter(status=Job.STATUS_QUEUED, run_after__lte=now, job_type__in=allowed)
+        .values_list("job_type", flat=True)
+        .distinct()
+    )
+    for name in _by_priority(set(candidates), now):
+        job = _claim_type(name, worker_id, now)
+        if job is not None:
+            return job
+    return None
+
+
+def execute(job: Job, context: JobContext = None) -> Job:
+    """Run the handler of a claimed job and store result or error (retry with backoff)."""
+    spec = _registry.get(job.job_type)
+    context = context or JobContext(job)
+    try:
+        if spec is None:
+            raise LookupError(f"No handler registered for job type '{job.job_type}'.")
+        result = spec.handler(context, **(job.payload or {}))
+    except Exception as exc:
+        _fail(job, exc)
+    else:
+        job.status = Job.STATUS_DONE
+        job.result = result
+        job.error = ""
+        job.finished_at = timezone.now()
+        _save_if_owner(job, ["status", "result", "error", "progress", "finished_at"])
+        logger.info(f"Job {job} done")
+    return job
+
+
+def heartbeat(contexts: Iterable[JobContext], worker_id: str) -> int:
+    """Renew the lease of the worker's running jobs and store their latest progress."""
+    now = timezone.now()
+    renewed = 0
+    for context in contexts:
+        renewed += Job.objects.filter(
+            pk=context.job.pk, status=Job.STATUS_RUNNING, locked_by=worker_id,
+        ).update(heartbeat_at=now, progress=context.snapshot())
+    return renewed
+
+
+def reclaim_expired(lease_seconds: float = None) -> int:
+    """Re-queue (or fail) running jobs whose worker stopped sending heartbeats."""
+    lease_seconds = lease_seconds or _setting("FINTECH_JOB_LEASE_SECONDS", DEFAULT_LEASE_SECONDS)
+    cutoff = timezone.now() - timedelta(seconds=lease_seconds)
+    reclaimed = 0
+    with transaction.atomic():
+        expired = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.STATUS_RUNNING, heartbeat_at__lt=cutoff)
+        )
+        for job in expired:
+            logger.warning(f"Job {job}: lease of worker {job.locked_by} expired")
+            _fail(job, TimeoutError(f"Worker {job.locked_by} antwortet nicht mehr (Lease abgelaufen)."))
+            reclaimed += 1
+    return reclaimed
+
+
+def purge_finished(days: float = None) -> int:
+    """Delete done/failed jobs finished more than *days* ago, and uploads left behind by then."""
+    days = days if days is not None else _setting("FINTECH_JOB_RETENTION_DAYS", DEFAULT_RETENTION_DAYS)
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Job.objects.filter(
+        status__in=[Job.STATUS_DONE, Job.STATUS_FAILED], finished_at__lt=cutoff,
+    ).delete()
+    # Normalerweise löscht der Import seine Datei selbst; das hier fängt abgebrochene Worker ab
+    ImportUpload.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+def latest(name: str) -> Optional[Job]:
+    return Job.objects.filter(job_type=name).order_by("-created_at", "-pk").first()
+
+
+# ----------------------------------------------------------------------
+# Internal helpers
+# ----------------------------------------------------------------------
+
+def _by_priority(names: set, now) -> list[str]:
+    # Typ mit dem dringendsten fälligen Job zuerst
+    ranked = []
+    for name in names:
+        head = (
+            Job.objects.filter(job_type=name, status=Job.STATUS_QUEUED, run_after__lte=now)
+            .order_by("priority", "run_after", "pk")
+            .values_list("priority", "run_after")
+            .first()
+        )
+        if head is not None:
+            ranked.append((head, name))
+    return [name for _, name in sorted(ranked)]
+
+
+def _claim_type(name: str, worker_id: str, now) -> Optional[Job]:
+    spec = _registry[name]
+    with transaction.atomic():
+        # Alle offenen Jobs des Typs sperren: parallele Claims desselben Typs warten hier,
+        # dadurch gilt das Concurrency-Limit auch über mehrere Worker
+        open_jobs = list(
+            Job.objects.select_for_update()
+            .filter(job_type=name, status__in=Job.OPEN_STATUSES)
+            .order_by("pk")
+            .only("pk", "status", "priority", "run_after")
+        )
+        running = sum(1 for job in open_jobs if job.status == Job.STATUS_RUNNING)
+        if running >= spec.concurrency:
+            return None
+        due = sorted(
+            (job for job in open_jobs if job.status == Job.STATUS_QUEUED and job.run_after <= now),
+            key=lambda job: (job.priority, job.run_after, job.pk),
+        )
+        if not due:
+            return None
+        job = Job.objects.get(pk=due[0].pk)
+        job.status = Job.STATUS_RUNNING
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.started_at = job.heartbeat_at = timezone.now()
+        job.save(update_fields=["status", "attempts", "locked_by", "started_at", "heartbeat_at"])
+    logger.info(f"Job {job} claimed by {worker_id} (attempt {job.attempts}/{job.max_attempts})")
+    return job
+
+
+def _fail(job: Job, exc: Exception) -> None:
+    job.error = "".join(traceback.format_exception_only(type(exc), exc)).strip()
+    if job.attempts < job.max_attempts:
+        job.status = Job.STATUS_QUEUED
+        job.run_after = timezone.now() + timedelta(seconds=_backoff(job.attempts))
+        logger.warning(f"Job {job} attempt {job.attempts} failed, retry at {job.run_after:%H:%M:%S}: {job.error}")
+    else:
+        job.status = Job.STATUS_FAILED
+        job.finished_at = timezone.now()
+        logger.error(f"Job {job} failed after {job.attempts} attempt(s): {job.error}")
+    _save_if_owner(job, ["status", "error", "run_after", "finished_at", "progress"])
+
+
+def _save_if_owner(job: Job, fields: list) -> bool:
+    # Nur solange der Job noch diesem Worker gehört (nicht zwischenzeitlich per Lease neu vergeben)
+    owner = job.locked_by
+    job.locked_by = ""
+    updated = Job.objects.filter(pk=job.pk, status=Job.STATUS_RUNNING, locked_by=owner).update(
+        locked_by="", **{field: getattr(job, field) for field in fields}
+    )
+    if not updated:
+        logger.warning(f"Job {job}: no longer owned by {owner}, result discarded")
+    return bool(updated)
+
+
+def _backoff(attempts: int) -> float:
+    base = _setting("FINTECH_JOB_BACKOFF_SECONDS", DEFAULT_BACKOFF_SECONDS)
+    cap = _setting("FINTECH_JOB_MAX_BACKOFF_SECONDS", DEFAULT_MAX_BACKOFF_SECONDS)
+    return min(cap, base * 2 ** (attempts - 1))
+
+
+def _setting(name: str, default):
+    from django.conf import settings
+
+    return getattr(settings, name, default)
+
+
+# ----------------------------------------------------------------------
+# Job-Typen
+# ----------------------------------------------------------------------
+
+@job_type("update_prices", concurrency=1, max_attempts=2)
+def run_update_prices(ctx: JobContext, **options) -> dict:
+    from django.core.management import call_command
+
+    output = io.StringIO()
+
+    def on_progress(done: int, total: int, counts: dict) -> None:
+        ctx.progress(done=done, total=total, **counts)
+
+    call_command("update_prices", stdout=output, progress=on_progress, **options)
+    return {"summary": _summary(output.getvalue())}
+
+
+@job_type("clean_up", concurrency=1)
+def run_clean_up(ctx: JobContext) -> dict:
+    from django.core.management import call_command
+
+    output = io.StringIO()
+    call_command("clean_up", stdout=output)
+    return {"summary": _summary(output.getvalue())}
+
+
+@job_type("import_transactions", concurrency=1, max_attempts=1)
+def run_import_transactions(ctx: JobContext, upload_id: int, dry_run: bool = False) -> dict:
+    # Kein automatischer Retry: der Import läuft in einer Transaktion, ein Fehlschlag
+    # soll angezeigt und nicht stillschweigend wiederholt werden
+    from .csv_import import import_transactions
+
+    upload = ImportUpload.objects.filter(pk=upload_id).first()
+    if upload is None:
+        raise ValueError(f"Import-Datei #{upload_id} nicht gefunden")
+    try:
+        result = import_transactions(upload.content, dry_run=dry_run)
+    finally:
+        upload.delete()   # Die CSV wird nur für diesen einen Versuch gebraucht
+    if result.imported and not dry_run:
+        # Neue Positionen brauchen Kurse
+        enqueue("update_prices", dedupe_key="update_prices")
+    return asdict(result)
+
+
+def _summary(output: str) -> str:
+    """The "Fertig: …" / "Alle Kurse sind aktuell" line of a command's output, else its last line."""
+    lines = [line.strip() for line in output.splitlines() if line.strip()]
+    for line in lines:
+        if line.startswith(("Fertig:", "Alle Kurse")):
+            return line
+    return lines[-1] if lines else ""
@@ -1,14 +1,14 @@
 import re
 import logging
 
-from .request_lib import StockRequest, KeyNotFoundWarning
+from .request_lib import StockRequest, KeyNotFoundWarning, TEXT, extracts
 
 logger = logging.getLogger(__name__)
 
-WKN_HTML_PATTERN = (
-    r'<span class="grey">WKN</span> '
-    r'<span class="val pointer" data-copy-click="etf-second-id" data-copy-message=".*?"> '
-    r'<span class="d-inline-block" id="etf-second-id">(.*?)</span> <span>'
+WKN_HTML_PATTERN = re.compile(
+    r'<span class="grey">WKN</span>\s*'
+    r'<span class="val pointer" data-copy-click="etf-second-id" data-copy-message=".*?">\s*'
+    r'<span class="d-inline-block" id="etf-second-id">(.*?)</span>\s*<span>'
 )
 
 
@@ -16,11 +16,22 @@ class JustEtfRequest(StockRequest):
 
     def isin2wkn(self, isin: str) -> str:
         logger.info(f"Request isin2wkn {isin} from JustETF")
-        soup = self.fetch_soup(isin)
-        return self.extract_wkn_from_soup(soup)
-
-    def extract_wkn_from_soup(self, soup) -> str:
-        match = re.search(WKN_HTML_PATTERN, str(soup))
+        return self.lookup(isin, "wkn")
+
+    async def aisin2wkn(self, isin: str) -> str:
+        logger.info(f"Request isin2wkn {isin} from JustETF (async)")
+        return await self.alookup(isin, "wkn")
+
+    @extracts(TEXT)
+    def _quote_fields(self, text: str, isin: str) -> dict:
+        try:
+            wkn = self.extract_wkn_from_text(text)
+        except KeyNotFoundWarning:
+            wkn = None
+        return {"wkn": wkn, "price": None, "currency": None, "symbol": None}
+
+    def extract_wkn_from_text(self, text: str) -> str:
+        match = WKN_HTML_PATTERN.search(text)
         if match:
             wkn = match.group(1)
             logger.info(f"WKN found in JustEtf: {wkn}")
@@ -0,0 +1,235 @@
+"""
+Cross-process exclusive lock with expiry, backed by the Lease table.
+
+Acquiring is a single conditional UPDATE ("take the row if it is free or its lease
+expired"), so it works on every database without row locks and across gunicorn
+workers, run_worker and cron. The holder renews the lease while it works
+(keep_alive); a crashed holder's lease simply expires after ttl seconds.
+
+A caller that finds the lock taken does not start a second run. It waits, and as
+soon as the holder releases the lock with a result it receives that result
+(piggybacking) — or takes the lock itself if the holder failed or vanished:
+
+    outcome = lock.acquire_or_wait(timeout=600)
+    if outcome.acquired:
+        try:
+            result = work()
+        except Exception:
+            lock.release()
+            raise
+        lock.release(result)
+    else:
+        result = outcome.result          # result of the run we waited for
+
+The holder renews the lease with keep_alive(), run as a task next to the work. If
+the lease is lost (renew() finds another holder) or cannot be renewed twice in a
+row, keep_alive() raises LeaseLost — the holder must then abort its work, since
+another process may already have taken over.
+
+Every contended call is counted on the Lease row together with its wait time
+(contentions, wait_seconds_total, wait_seconds_max); stats() returns them.
+Async callers use the a-prefixed variants.
+
+Optional settings (all have defaults):
+    FINTECH_LEASE_TTL_SECONDS  = 120
+    FINTECH_LEASE_POLL_SECONDS = 1.0
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ...models import Lease
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 120
+DEFAULT_POLL_SECONDS = 1.0
+
+
+class LeaseTimeout(Exception):
+    """The lock stayed taken for longer than the caller was willing to wait."""
+
+
+class LeaseLost(Exception):
+    """The holder's lease was taken over or could not be renewed in time."""
+
+
+@dataclass
+class LeaseOutcome:
+    acquired: bool                 # True: Aufrufer hält die Sperre und muss selbst arbeiten
+    waited: float = 0.0            # Sekunden bis Übernahme bzw. Ergebnis
+    holder: str = ""               # Inhaber, auf den gewartet wurde
+    result: Optional[dict] = None  # Ergebnis des abgewarteten Laufs (nur acquired=False)
+
+
+class LeaseLock:
+    """Named lease on the Lease table; one instance per attempt (holder id is unique)."""
+
+    def __init__(self, name: str, ttl_seconds: float = DEFAULT_TTL_SECONDS, poll_seconds: float = DEFAULT_POLL_SECONDS):
+        self.name = name
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.poll_seconds = poll_seconds
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.generation = None
+
+    @classmethod
+    def from_settings(cls, name: str) -> "LeaseLock":
+        from django.conf import settings
+
+        return cls(
+            name,
+            ttl_seconds=getattr(settings, "FINTECH_LEASE_TTL_SECONDS", DEFAULT_TTL_SECONDS),
+            poll_seconds=getattr(settings, "FINTECH_LEASE_POLL_SECONDS", DEFAULT_POLL_SECONDS),
+        )
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def try_acquire(self) -> bool:
+        """Take the lock if it is free or expired (one conditional UPDATE)."""
+        now = timezone.now()
+        Lease.objects.get_or_create(name=self.name)
+        taken = Lease.objects.filter(
+            Q(holder="") | Q(expires_at__lt=now), name=self.name,
+        ).update(
+            holder=self.holder,
+            generation=F("generation") + 1,
+            acquired_at=now,
+            expires_at=now + self.ttl,
+            released_at=None,
+            acquisitions=F("acquisitions") + 1,
+        )
+        if not taken:
+            return False
+        self.generation = Lease.objects.filter(name=self.name).values_list("generation", flat=True).get()
+        logger.info(f"Lease {self.name} acquired by {self.holder} (generation {self.generation})")
+        return True
+
+    def acquire_or_wait(self, timeout: float, piggyback: bool = True) -> LeaseOutcome:
+        """Acquire, or wait for the current holder and take over its result (see module doc)."""
+        if self.try_acquire():
+            return LeaseOutcome(acquired=True)
+        started = time.monotonic()
+        holder, awaited = self._current()
+        logger.info(f"Lease {self.name} held by {holder}, waiting (up to {timeout:.0f}s)")
+        while True:
+            time.sleep(self.poll_seconds)
+            outcome = self._poll(started, holder, awaited, piggyback)
+            if outcome is not None:
+                return outcome
+            if time.monotonic() - started >= timeout:
+                self._record_wait(time.monotonic() - started)
+                raise LeaseTimeout(f"Lease {self.name} still held by {holder} after {timeout:.0f}s.")
+
+    def renew(self) -> bool:
+        """Extend the lease; False means it was lost (expired and taken over)."""
+        renewed = Lease.objects.filter(name=self.name, holder=self.holder).update(
+            expires_at=timezone.now() + self.ttl,
+        )
+        if not renewed:
+            logger.warning(f"Lease {self.name} lost by {self.holder}")
+        return bool(renewed)
+
+    def release(self, result: dict = None) -> None:
+        """Free the lock; with *result* waiting callers take it over instead of running again."""
+        fields = {"holder": "", "expires_at": None, "released_at": timezone.now()}
+        if result is not None:
+            fields.update(last_result=result, finished_generation=self.generation)
+        Lease.objects.filter(name=self.name, holder=self.holder).update(**fields)
+        logger.info(f"Lease {self.name} released by {self.holder}")
+
+    def stats(self) -> dict:
+        lease = Lease.objects.filter(name=self.name).first()
+        if lease is None:
+            return {"name": self.name, "holder": "", "acquisitions": 0, "contentions": 0,
+                    "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+        return {
+            "name": lease.name,
+            "holder": lease.holder if lease.expires_at and lease.expires_at > timezone.now() else "",
+            "acquired_at": lease.acquired_at,
+            "released_at": lease.released_at,
+            "acquisitions": lease.acquisitions,
+            "contentions": lease.contentions,
+            "wait_seconds_total": round(lease.wait_seconds_total, 3),
+            "wait_seconds_max": round(lease.wait_seconds_max, 3),
+        }
+
+    async def aacquire_or_wait(self, timeout: float, piggyback: bool = True) -> LeaseOutcome:
+        # Wartet in einem eigenen Thread, die Event-Loop bleibt frei
+        return await sync_to_async(self._acquire_or_wait_closing, thread_sensitive=False)(timeout, piggyback)
+
+    async def arelease(self, result: dict = None) -> None:
+        await sync_to_async(self.release)(result)
+
+    async def keep_alive(self) -> None:
+        """Renew every ttl/3 until cancelled (run as a task while holding the lock).
+
+        Raises LeaseLost when the lease was taken over, or after two failed renewals
+        in a row (the lease would expire before a third attempt).
+        """
+        interval = self.ttl.total_seconds() / 3
+        failures = 0
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                renewed = await sync_to_async(self.renew)()
+            except Exception as exc:
+                failures += 1
+                logger.warning(f"Lease {self.name} renewal failed ({failures}x): {exc}")
+                if failures >= 2:
+                    raise LeaseLost(f"Lease {self.name} could not be renewed: {exc}") from exc
+                continue
+            if not renewed:
+                raise LeaseLost(f"Lease {self.name} was taken over by another holder.")
+            failures = 0
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _acquire_or_wait_closing(self, timeout: float, piggyback: bool) -> LeaseOutcome:
+        try:
+            return self.acquire_or_wait(timeout, piggyback)
+        finally:
+            # Eigener Executor-Thread → dessen DB-Verbindung nicht offen liegen lassen
+            connection.close()
+
+    def _current(self) -> tuple[str, int]:
+        holder, generation = Lease.objects.filter(name=self.name).values_list("holder", "generation").get()
+        return holder, generation
+
+    def _poll(self, started: float, holder: str, awaited: int, piggyback: bool) -> Optional[LeaseOutcome]:
+        finished, result = Lease.objects.filter(name=self.name).values_list(
+            "finished_generation", "last_result",
+        ).get()
+        if piggyback and finished >= awaited:
+            # Abgewarteter Lauf ist fertig → sein Ergebnis gilt auch für diesen Aufruf
+            waited = time.monotonic() - started
+            self._record_wait(waited)
+            return LeaseOutcome(acquired=False, waited=waited, holder=holder, result=result)
+        if self.try_acquire():
+            # Inhaber ohne Ergebnis beendet oder Lease abgelaufen → selbst arbeiten
+            waited = time.monotonic() - started
+            self._record_wait(waited)
+            return LeaseOutcome(acquired=True, waited=waited, holder=holder)
+        return None
+
+    def _record_wait(self, waited: float) -> None:
+        Lease.objects.filter(name=self.name).update(
+            contentions=F("contentions") + 1,
+            wait_seconds_total=F("wait_seconds_total") + waited,
+        )
+        Lease.objects.filter(name=self.name, wait_seconds_max__lt=waited).update(wait_seconds_max=waited)
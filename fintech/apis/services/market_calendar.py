@@ -0,0 +1,289 @@
+"""
+Trading calendar for the refresh scheduler.
+
+Every asset maps to one market — by Asset.exchange, by asset_class (crypto
+trades 24/7) and, when no exchange is stored, by ISIN country (US → NYSE,
+everything else → the default market, XETRA):
+
+    XETRA    Europe/Berlin      09:00–17:30   Mon–Fri, without XETRA holidays
+    NYSE     America/New_York   09:30–16:00   Mon–Fri, without NYSE holidays
+    NASDAQ   America/New_York   09:30–16:00   same holidays as NYSE
+    CRYPTO   always open
+
+While a market is closed its prices cannot change. FreshnessPolicy then only
+schedules one post-close fetch: assets whose last price is older than the last
+session close (+ a grace period for the closing auction) are due once, all others
+wait for the next open. Holidays are computed from their rules (Easter-based,
+n-th weekday, weekend observance); early closes are not modelled.
+
+Optional settings (all have defaults):
+    FINTECH_MARKET_HOURS_ENABLED        = True
+    FINTECH_MARKET_DEFAULT              = "XETRA"
+    FINTECH_MARKET_CLOSE_GRACE_MINUTES  = 15
+    FINTECH_MARKET_EXTRA_HOLIDAYS       = {"XETRA": ["2026-12-30"], ...}
+"""
+
+import functools
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Optional
+from zoneinfo import ZoneInfo
+
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce, Trim, Upper
+from django.db.models.lookups import In
+
+from ...models_helper.asset_class import AssetClass
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MARKET = "XETRA"
+DEFAULT_CLOSE_GRACE_MINUTES = 15
+MAX_LOOKBACK_DAYS = 14
+
+# Schreibweisen in Asset.exchange → Markt
+EXCHANGE_ALIASES = {
+    "XETRA": ("XETRA", "XETR", "XET", "FRA", "FRANKFURT"),
+    "NYSE": ("NYSE", "NYQ"),
+    "NASDAQ": ("NASDAQ", "NMS", "NGS", "NASDAQGS"),
+}
+# Asset.exchange wie in SQL normalisiert (siehe _exchange_q): NULL → "", Leerzeichen
+# am Rand weg, Großschreibung — market_for() und groups() müssen gleich zuordnen
+EXCHANGE_STRIP = " "
+# Ohne Börse: ISIN-Länderpräfix → Markt (sonst DEFAULT_MARKET)
+COUNTRY_MARKETS = {"US": "NYSE"}
+
+
+# ----------------------------------------------------------------------
+# Feiertagsregeln
+# ----------------------------------------------------------------------
+
+def easter_sunday(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return date(year, month, day)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th *weekday* (0 = Monday) of the month; n = -1 is the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day: date) -> date:
+    """US rule: Saturday holidays move to Friday, Sunday holidays to Monday."""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def xetra_holidays(year: int) -> set[date]:
+    easter = easter_sunday(year)
+    return {
+        date(year, 1, 1),
+        easter - timedelta(days=2),    # Karfreitag
+        easter + timedelta(days=1),    # Ostermontag
+        date(year, 5, 1),
+        date(year, 12, 24),
+        date(year, 12, 25),
+        date(year, 12, 26),
+        date(year, 12, 31),
+    }
+
+
+def nyse_holidays(year: int) -> set[date]:
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),              # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),              # Washington's Birthday
+        easter_sunday(year) - timedelta(days=2),  # Good Friday
+        _nth_weekday(year, 5, 0, -1),             # Memorial Day
+        _observed(date(year, 7, 4)),
+        _nth_weekday(year, 9, 0, 1),              # Labor Day
+        _nth_weekday(year, 11, 3, 4),             # Thanksgiving
+        _observed(date(year, 12, 25)),
+    }
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))   # Juneteenth
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:                       # Samstag: kein Ersatztag am 31.12.
+        holidays.add(_observed(new_year))
+    return holidays
+
+
+# ----------------------------------------------------------------------
+# Märkte
+# ----------------------------------------------------------------------
+
+class Market:
+    """Regular trading sessions of one market (Mon–Fri, minus holidays)."""
+
+    def __init__(
+        self,
+        name: str,
+        tz: str = "UTC",
+        opens: time = None,
+        closes: time = None,
+        holiday_rule: Callable[[int], set] = None,
+        extra_holidays: set = (),
+        always_open: bool = False,
+    ):
+        self.name = name
+        self.tz = ZoneInfo(tz)
+        self.opens = opens
+        self.closes = closes
+        self.holiday_rule = holiday_rule
+        self.extra_holidays = set(extra_holidays)
+        self.always_open = always_open
+
+    def is_trading_day(self, day: date) -> bool:
+        if self.always_open:
+            return True
+        if day.weekday() >= 5 or day in self.extra_holidays:
+            return False
+        return self.holiday_rule is None or day not in self._holidays(day.year)
+
+    def is_open(self, at: datetime) -> bool:
+        if self.always_open:
+            return True
+        local = at.astimezone(self.tz)
+        return self.is_trading_day(local.date()) and self.opens <= local.time() < self.closes
+
+    def last_close(self, at: datetime) -> Optional[datetime]:
+        """Most recent session close at or before *at* (None for always-open markets)."""
+        if self.always_open:
+            return None
+        day = at.astimezone(self.tz).date()
+        for _ in range(MAX_LOOKBACK_DAYS):
+            if self.is_trading_day(day):
+                close = datetime.combine(day, self.closes, tzinfo=self.tz)
+                if close <= at:
+                    return close
+            day -= timedelta(days=1)
+        return None
+
+    def _holidays(self, year: int) -> set:
+        return _cached_holidays(self.holiday_rule, year)
+
+    def __repr__(self) -> str:
+        return f"Market({self.name})"
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_holidays(rule, year: int) -> frozenset:
+    return frozenset(rule(year))
+
+
+class MarketCalendar:
+    """Maps assets to markets — in Python (market_for) and in SQL (groups)."""
+
+    def __init__(self, default_market: str = DEFAULT_MARKET, close_grace_minutes: float = DEFAULT_CLOSE_GRACE_MINUTES,
+                 extra_holidays: dict = None):
+        extra = {
+            name: {date.fromisoformat(str(day)) for day in days}
+            for name, days in (extra_holidays or {}).items()
+        }
+        self.markets = {
+            "XETRA": Market("XETRA", "Europe/Berlin", time(9, 0), time(17, 30), xetra_holidays,
+                            extra.get("XETRA", ())),
+            "NYSE": Market("NYSE", "America/New_York", time(9, 30), time(16, 0), nyse_holidays,
+                           extra.get("NYSE", ())),
+            "NASDAQ": Market("NASDAQ", "America/New_York", time(9, 30), time(16, 0), nyse_holidays,
+                             extra.get("NASDAQ", ())),
+            "CRYPTO": Market("CRYPTO", always_open=True),
+        }
+        if default_market not in EXCHANGE_ALIASES:
+            raise ValueError(f"Unknown default market '{default_market}' ({', '.join(EXCHANGE_ALIASES)}).")
+        self.default_market = default_market
+        self.close_grace = timedelta(minutes=close_grace_minutes)
+
+    @classmethod
+    def from_settings(cls) -> Optional["MarketCalendar"]:
+        """Configured calendar, or None when market hours are disabled."""
+        from django.conf import settings
+
+        if not getattr(settings, "FINTECH_MARKET_HOURS_ENABLED", True):
+            return None
+        return cls(
+            default_market=getattr(settings, "FINTECH_MARKET_DEFAULT", DEFAULT_MARKET),
+            close_grace_minutes=getattr(settings, "FINTECH_MARKET_CLOSE_GRACE_MINUTES", DEFAULT_CLOSE_GRACE_MINUTES),
+            extra_holidays=getattr(settings, "FINTECH_MARKET_EXTRA_HOLIDAYS", None),
+        )
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def market_for(self, asset) -> Market:
+        """Market of one asset (same rules as groups())."""
+        if asset.asset_class == AssetClass.CRYPTO.value:
+            return self.markets["CRYPTO"]
+        exchange = (asset.exchange or "").strip(EXCHANGE_STRIP).upper()
+        for name, aliases in EXCHANGE_ALIASES.items():
+            if exchange in aliases:
+                return self.markets[name]
+        return self.markets[COUNTRY_MARKETS.get(asset.isin[:2].upper(), self.default_market)]
+
+    def groups(self) -> list[tuple[Market, Q]]:
+        """(market, Q) pairs that partition all assets."""
+        crypto = Q(asset_class=AssetClass.CRYPTO.value)
+        known = Q()
+        for aliases in EXCHANGE_ALIASES.values():
+            known |= self._exchange_q(aliases)
+        country_prefixes = Q()
+        for prefix in COUNTRY_MARKETS:
+            country_prefixes |= Q(isin__startswith=prefix)
+
+        groups = [(self.markets["CRYPTO"], crypto)]
+        for name, aliases in EXCHANGE_ALIASES.items():
+            # Ohne bekannte Börse entscheidet das ISIN-Land
+            fallback = Q()
+            for prefix, market in COUNTRY_MARKETS.items():
+                if market == name:
+                    fallback |= Q(isin__startswith=prefix)
+            if name == self.default_market:
+                fallback |= ~country_prefixes
+            q = self._exchange_q(aliases)
+            if fallback:
+                q |= ~known & fallback
+            groups.append((self.markets[name], ~crypto & q))
+        return groups
+
+    def post_close_cutoff(self, market: Market, now: datetime) -> Optional[datetime]:
+        """While *market* is closed: prices older than this get their one post-close fetch.
+
+        None means "nothing due yet" (closing auction still within the grace period).
+        """
+        last_close = market.last_close(now)
+        if last_close is None:
+            return None
+        cutoff = last_close + self.close_grace
+        if cutoff > now:
+            # Direkt nach Schluss: Schlusskurs abwarten, bis dahin gilt der vorige Schluss
+            previous = market.last_close(last_close - timedelta(seconds=1))
+            return previous + self.close_grace if previous else None
+        return cutoff
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _exchange_q(aliases) -> Q:
+        # TRIM entfernt wie strip(EXCHANGE_STRIP) nur Leerzeichen; Coalesce hält NULL aus
+        # der Negation in groups() heraus (NOT NULL wäre weder wahr noch falsch)
+        exchange = Upper(Trim(Coalesce("exchange", Value(""))))
+        return Q(In(exchange, list(aliases)))
@@ -0,0 +1,162 @@
+"""
+Negative-result cache: remembers ISINs a provider does not know.
+
+Keyed by (provider id, lookup, ISIN) — lookup is the queried field (PRICE, WKN),
+so a page without a price does not block the WKN lookup and vice versa. Two TTLs:
+    absent    — provider answered 404/400 or KeyNotFoundError   (long TTL)
+    transient — page loaded but the field was missing           (short TTL)
+
+Entries live in memory for the hot path and are written through to the
+ProviderMiss table, so they survive restarts and are shared by all processes.
+The in-memory view is reloaded from the table every reload_seconds.
+
+Lookups (is_miss) are memory-only. DB work happens in refresh()/record()/forget();
+async callers use the a-prefixed variants, which run the DB part in a thread.
+
+Optional settings (all have defaults):
+    FINTECH_NEGATIVE_TTL_ABSENT_HOURS    = 7 * 24
+    FINTECH_NEGATIVE_TTL_TRANSIENT_HOURS = 1
+    FINTECH_NEGATIVE_RELOAD_SECONDS      = 60
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import DatabaseError
+from django.utils import timezone
+
+from ...models import ProviderMiss
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_ABSENT_HOURS = 7 * 24
+DEFAULT_TTL_TRANSIENT_HOURS = 1
+DEFAULT_RELOAD_SECONDS = 60
+
+ABSENT = ProviderMiss.KIND_ABSENT
+TRANSIENT = ProviderMiss.KIND_TRANSIENT
+PRICE = ProviderMiss.LOOKUP_PRICE
+WKN = ProviderMiss.LOOKUP_WKN
+
+
+class NegativeCache:
+    """(provider, lookup, isin) → known miss, with TTL per kind and DB persistence."""
+
+    def __init__(
+        self,
+        absent_ttl_hours: float = DEFAULT_TTL_ABSENT_HOURS,
+        transient_ttl_hours: float = DEFAULT_TTL_TRANSIENT_HOURS,
+        reload_seconds: float = DEFAULT_RELOAD_SECONDS,
+    ):
+        self.ttl = {
+            ABSENT: timedelta(hours=absent_ttl_hours),
+            TRANSIENT: timedelta(hours=transient_ttl_hours),
+        }
+        self.reload_seconds = reload_seconds
+        self.hits = 0
+        self._lock = threading.Lock()
+        self._entries: dict = {}      # (provider, lookup, isin) -> expires_at
+        self._loaded_at = None        # monotonic
+
+    @classmethod
+    def from_settings(cls) -> "NegativeCache":
+        from django.conf import settings
+
+        return cls(
+            absent_ttl_hours=getattr(settings, "FINTECH_NEGATIVE_TTL_ABSENT_HOURS", DEFAULT_TTL_ABSENT_HOURS),
+            transient_ttl_hours=getattr(settings, "FINTECH_NEGATIVE_TTL_TRANSIENT_HOURS", DEFAULT_TTL_TRANSIENT_HOURS),
+            reload_seconds=getattr(settings, "FINTECH_NEGATIVE_RELOAD_SECONDS", DEFAULT_RELOAD_SECONDS),
+        )
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def is_miss(self, provider: str, lookup: str, isin: str) -> bool:
+        """True if *provider* is known not to have *lookup* for *isin* (memory only)."""
+        with self._lock:
+            expires_at = self._entries.get((provider, lookup, isin))
+            if expires_at is None:
+                return False
+            if expires_at <= timezone.now():
+                del self._entries[(provider, lookup, isin)]
+                return False
+            self.hits += 1
+        logger.info(f"Negative cache hit [{provider}/{lookup}] {isin}")
+        return True
+
+    def refresh(self) -> None:
+        """Reload entries from the DB if the last load is older than reload_seconds."""
+        if self._reload_due():
+            self._load()
+
+    async def arefresh(self) -> None:
+        if self._reload_due():
+            await sync_to_async(self._load)()
+
+    def record(self, provider: str, lookup: str, isin: str, kind: str, reason: str = "") -> None:
+        expires_at = self._remember(provider, lookup, isin, kind)
+        self._store(provider, lookup, isin, kind, reason, expires_at)
+
+    async def arecord(self, provider: str, lookup: str, isin: str, kind: str, reason: str = "") -> None:
+        expires_at = self._remember(provider, lookup, isin, kind)
+        await sync_to_async(self._store)(provider, lookup, isin, kind, reason, expires_at)
+
+    def forget(self, provider: str, lookup: str, isin: str) -> None:
+        """Drop an entry after the provider answered after all."""
+        if self._pop(provider, lookup, isin):
+            self._delete(provider, lookup, isin)
+
+    async def aforget(self, provider: str, lookup: str, isin: str) -> None:
+        if self._pop(provider, lookup, isin):
+            await sync_to_async(self._delete)(provider, lookup, isin)
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _reload_due(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.reload_seconds
+
+    def _load(self) -> None:
+        try:
+            rows = ProviderMiss.objects.filter(expires_at__gt=timezone.now()).values_list(
+                "provider", "lookup", "isin", "expires_at"
+            )
+            entries = {(provider, lookup, isin): expires_at for provider, lookup, isin, expires_at in rows}
+        except DatabaseError as exc:
+            logger.warning(f"Negative cache could not be loaded: {exc}")
+            entries = None
+        with self._lock:
+            if entries is not None:
+                self._entries = entries
+            self._loaded_at = time.monotonic()
+
+    def _remember(self, provider: str, lookup: str, isin: str, kind: str):
+        expires_at = timezone.now() + self.ttl[kind]
+        with self._lock:
+            self._entries[(provider, lookup, isin)] = expires_at
+        logger.info(f"Negative cache put [{provider}/{lookup}] {isin} ({kind} until {expires_at:%Y-%m-%d %H:%M})")
+        return expires_at
+
+    def _pop(self, provider: str, lookup: str, isin: str) -> bool:
+        with self._lock:
+            return self._entries.pop((provider, lookup, isin), None) is not None
+
+    def _store(self, provider: str, lookup: str, isin: str, kind: str, reason: str, expires_at) -> None:
+        try:
+            ProviderMiss.objects.update_or_create(
+                provider=provider, lookup=lookup, isin=isin,
+                defaults={"kind": kind, "reason": reason[:200], "expires_at": expires_at},
+            )
+        except DatabaseError as exc:
+            logger.warning(f"Negative cache entry [{provider}/{lookup}] {isin} not persisted: {exc}")
+
+    def _delete(self, provider: str, lookup: str, isin: str) -> None:
+        try:
+            ProviderMiss.objects.filter(provider=provider, lookup=lookup, isin=isin).delete()
+        except DatabaseError as exc:
+            logger.warning(f"Negative cache entry [{provider}/{lookup}] {isin} not deleted: {exc}")
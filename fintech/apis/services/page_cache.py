@@ -0,0 +1,205 @@
+"""
+Bounded, thread-safe LRU cache for provider pages.
+
+Replaces the former SoupCache (an unbounded dict that only evicted an entry when it
+was read again after expiry). Entries are spread over independently locked shards,
+so gunicorn threads rarely contend; each shard is an LRU with its own share of the
+entry and byte budget. Expired entries are swept proactively every
+sweep_interval_seconds instead of lingering until the next read.
+
+Optional settings (all have defaults):
+    FINTECH_PAGE_CACHE_TTL_MINUTES = 10
+    FINTECH_PAGE_CACHE_MAX_ENTRIES = 500
+    FINTECH_PAGE_CACHE_MAX_BYTES   = 32 * 1024 * 1024
+    FINTECH_QUOTE_CACHE_TTL_MINUTES = 5      # QuoteCache: extracted fields per page
+    FINTECH_QUOTE_CACHE_MAX_ENTRIES = 5000
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_MINUTES = 10
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_SHARDS = 8
+DEFAULT_SWEEP_INTERVAL_SECONDS = 60
+DEFAULT_QUOTE_TTL_MINUTES = 5
+DEFAULT_QUOTE_MAX_ENTRIES = 5000
+
+
+class _Shard:
+    """One LRU segment; all fields are guarded by *lock*."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.lock = threading.Lock()
+        self.entries: OrderedDict = OrderedDict()   # key -> (value, nbytes, stored_at)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def remove(self, key) -> None:
+        _, nbytes, _ = self.entries.pop(key)
+        self.bytes -= nbytes
+
+
+class PageCache:
+    """Sharded LRU with entry and byte limits, TTL and hit/miss/eviction stats.
+
+    Keys are hashable tuples, e.g. (isin, requester_id, base_url). The caller
+    passes the size of each value in bytes; it is what the byte budget counts.
+    """
+
+    def __init__(
+        self,
+        max_age_minutes: float = DEFAULT_TTL_MINUTES,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        shards: int = DEFAULT_SHARDS,
+        sweep_interval_seconds: float = DEFAULT_SWEEP_INTERVAL_SECONDS,
+    ):
+        self.max_age = max_age_minutes * 60
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval_seconds
+        self._shards = [
+            _Shard(max(1, max_entries // shards), max(1, max_bytes // shards))
+            for _ in range(shards)
+        ]
+        self._last_sweep = time.monotonic()
+
+    @classmethod
+    def from_settings(cls) -> "PageCache":
+        from django.conf import settings
+
+        return cls(
+            max_age_minutes=getattr(settings, "FINTECH_PAGE_CACHE_TTL_MINUTES", DEFAULT_TTL_MINUTES),
+            max_entries=getattr(settings, "FINTECH_PAGE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES),
+            max_bytes=getattr(settings, "FINTECH_PAGE_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES),
+        )
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get(self, key):
+        """Return the cached value if it exists and is not expired, else None."""
+        shard = self._shard(key)
+        now = time.monotonic()
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is None:
+                shard.misses += 1
+                logger.info(f"Cache miss [{key[1]}] {key[0]}")
+                return None
+
+            value, _, stored_at = entry
+            if now - stored_at > self.max_age:
+                shard.remove(key)
+                shard.expirations += 1
+                shard.misses += 1
+                logger.info(f"Cache expired [{key[1]}] {key[0]}")
+                return None
+
+            shard.entries.move_to_end(key)
+            shard.hits += 1
+
+        logger.info(f"Cache hit  [{key[1]}] {key[0]}")
+        return value
+
+    def put(self, key, value, nbytes: int, age: float = 0.0) -> None:
+        """Store *value*, evicting least recently used entries beyond the limits.
+
+        *age* (seconds) marks the value as already that old, e.g. when it was copied
+        from another cache tier; it expires after max_age minus age.
+        """
+        shard = self._shard(key)
+        if nbytes > shard.max_bytes:
+            logger.warning(f"Cache skip [{key[1]}] {key[0]}: {nbytes} bytes exceed shard budget")
+            return
+
+        now = time.monotonic()
+        with shard.lock:
+            if key in shard.entries:
+                shard.remove(key)
+            shard.entries[key] = (value, nbytes, now - age)
+            shard.bytes += nbytes
+
+            while len(shard.entries) > shard.max_entries or shard.bytes > shard.max_bytes:
+                oldest = next(iter(shard.entries))
+                shard.remove(oldest)
+                shard.evictions += 1
+
+        logger.info(f"Cache put  [{key[1]}] {key[0]} ({nbytes} bytes)")
+        self._maybe_sweep(now)
+
+    def sweep(self) -> int:
+        """Drop all expired entries; returns how many were removed."""
+        now = time.monotonic()
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                expired = [
+                    key for key, (_, _, stored_at) in shard.entries.items()
+                    if now - stored_at > self.max_age
+                ]
+                for key in expired:
+                    shard.remove(key)
+                shard.expirations += len(expired)
+            removed += len(expired)
+        if removed:
+            logger.info(f"Cache sweep removed {removed} expired entries")
+        return removed
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+                shard.bytes = 0
+
+    def stats(self) -> dict:
+        totals = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "entries": 0, "bytes": 0}
+        for shard in self._shards:
+            with shard.lock:
+                totals["hits"] += shard.hits
+                totals["misses"] += shard.misses
+                totals["evictions"] += shard.evictions
+                totals["expirations"] += shard.expirations
+                totals["entries"] += len(shard.entries)
+                totals["bytes"] += shard.bytes
+        return totals
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _shard(self, key) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _maybe_sweep(self, now: float) -> None:
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        self.sweep()
+
+
+class QuoteCache(PageCache):
+    """PageCache for extracted Quote records — tiny entries, own TTL and entry limit."""
+
+    @classmethod
+    def from_settings(cls) -> "QuoteCache":
+        from django.conf import settings
+
+        max_entries = getattr(settings, "FINTECH_QUOTE_CACHE_MAX_ENTRIES", DEFAULT_QUOTE_MAX_ENTRIES)
+        return cls(
+            max_age_minutes=getattr(settings, "FINTECH_QUOTE_CACHE_TTL_MINUTES", DEFAULT_QUOTE_TTL_MINUTES),
+            max_entries=max_entries,
+            max_bytes=max_entries * 1024,
+        )
@@ -0,0 +1,124 @@
+"""
+Background price refresh for the portfolio pages.
+
+The admin portfolio view and the CSV import used to run update_prices inside the
+request, blocking a gunicorn thread for the whole scrape. The portfolio view now
+renders from the stored prices right away and calls start(), which queues an
+update_prices job for run_worker (see job_queue) and returns the run's status
+(the CSV import needs no call: its job queues update_prices once it has imported):
+
+    {"run": 17, "state": "running", "done": 12, "total": 40, "ok": 11, "skip": 1, "error": 0, …}
+
+start() is deduplicated: while an update_prices job is queued or running it returns
+that job instead of queueing a second one, and within min_interval seconds after a
+finished run nothing new is queued. The status comes from the Job table, so the
+polling request may land on any worker; it also carries the contention figures of
+the update_prices lock (see lease_lock).
+
+Optional settings (all have defaults):
+    FINTECH_PORTFOLIO_REFRESH_MIN_INTERVAL_SECONDS = 60
+"""
+
+import logging
+import threading
+
+from django.utils import timezone
+
+from ...models import Job
+from .job_queue import enqueue, latest
+from .lease_lock import LeaseLock
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_INTERVAL_SECONDS = 60
+JOB_TYPE = "update_prices"
+DEDUPE_KEY = "update_prices"
+LOCK_NAME = "update_prices"    # Sperre des update_prices-Commands
+
+STATE_IDLE = "idle"
+STATE_QUEUED = Job.STATUS_QUEUED
+STATE_RUNNING = Job.STATUS_RUNNING
+STATE_DONE = Job.STATUS_DONE
+STATE_FAILED = Job.STATUS_FAILED
+
+
+class PortfolioRefresh:
+    """Deduplicated update_prices job with a pollable status."""
+
+    def __init__(self, min_interval_seconds: float = DEFAULT_MIN_INTERVAL_SECONDS):
+        self.min_interval = min_interval_seconds
+
+    @classmethod
+    def from_settings(cls) -> "PortfolioRefresh":
+        from django.conf import settings
+
+        return cls(
+            min_interval_seconds=getattr(
+                settings, "FINTECH_PORTFOLIO_REFRESH_MIN_INTERVAL_SECONDS", DEFAULT_MIN_INTERVAL_SECONDS
+            ),
+        )
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def start(self) -> dict:
+        """Queue a refresh unless one is open or has just finished; return the current status."""
+        job = latest(JOB_TYPE)
+        if job is not None and (job.status in Job.OPEN_STATUSES or self._is_recent(job)):
+            return self.describe(job)
+        job = enqueue(JOB_TYPE, dedupe_key=DEDUPE_KEY)
+        return self.describe(job)
+
+    def status(self) -> dict:
+        """Status of the latest refresh plus contention figures of the update_prices lock."""
+        status = self.describe(latest(JOB_TYPE))
+        status["lock"] = LeaseLock.from_settings(LOCK_NAME).stats()
+        return status
+
+    @staticmethod
+    def describe(job: Job) -> dict:
+        if job is None:
+            return {"run": None, "state": STATE_IDLE}
+        progress = job.progress or {}
+        if job.status == Job.STATUS_DONE:
+            message = (job.result or {}).get("summary", "")
+        else:
+            message = job.error
+        return {
+            "run": job.pk,
+            "state": job.status,
+            "done": progress.get("done", 0),
+            "total": progress.get("total"),
+            "ok": progress.get("ok", 0),
+            "skip": progress.get("skip", 0),
+            "error": progress.get("error", 0),
+            "attempts": job.attempts,
+            "message": message,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at,
+        }
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _is_recent(self, job: Job) -> bool:
+        if job.finished_at is None:
+            return False
+        return (timezone.now() - job.finished_at).total_seconds() < self.min_interval
+
+
+_refresh = None
+_refresh_lock = threading.Lock()
+
+
+def get_portfolio_refresh() -> PortfolioRefresh:
+    """Return the process-wide PortfolioRefresh configured in settings."""
+    global _refresh
+    if _refresh is None:
+        with _refresh_lock:
+            if _refresh is None:
+                _refresh = PortfolioRefresh.from_settings()
+    return _refresh
@@ -0,0 +1,155 @@
+"""
+Stale-while-revalidate price lookups for the REST API.
+
+Asset.current_price / current_price_timestamp already hold the latest EUR price of
+every tracked ISIN (kept up to date by update_prices). PriceService answers from
+there and only scrapes when it has to:
+
+    age <= fresh_seconds      → served from the DB                  (source "db")
+    age <= max_stale_seconds  → served from the DB, background
+                                refresh scheduled                   (source "stale")
+    older / no price / not
+    tracked (cold miss)       → scraped synchronously               (source "live")
+
+Background refreshes run on a small thread pool; one refresh per ISIN at a time.
+
+Optional settings (all have defaults):
+    FINTECH_PRICE_FRESH_SECONDS     = 300        # 5 min
+    FINTECH_PRICE_MAX_STALE_SECONDS = 24 * 3600  # beyond that: synchronous scrape
+    FINTECH_PRICE_REFRESH_WORKERS   = 2
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+
+from django.db import connection
+from django.utils import timezone
+
+from ...models import Asset, Price
+from .provider_manager import ProviderManager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FRESH_SECONDS = 300
+DEFAULT_MAX_STALE_SECONDS = 24 * 3600
+DEFAULT_REFRESH_WORKERS = 2
+
+SOURCE_DB = "db"
+SOURCE_STALE = "stale"
+SOURCE_LIVE = "live"
+
+
+@dataclass
+class ServedPrice:
+    price:  Decimal
+    as_of:  datetime
+    source: str
+
+    @property
+    def age_seconds(self) -> float:
+        return max(0.0, (timezone.now() - self.as_of).total_seconds())
+
+
+class PriceService:
+    """Serve EUR prices from Asset.current_price with a freshness policy."""
+
+    def __init__(
+        self,
+        provider_manager: ProviderManager,
+        fresh_seconds: float = DEFAULT_FRESH_SECONDS,
+        max_stale_seconds: float = DEFAULT_MAX_STALE_SECONDS,
+        refresh_workers: int = DEFAULT_REFRESH_WORKERS,
+    ):
+        self.provider_manager = provider_manager
+        self.fresh_seconds = fresh_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self._refresh_pool = ThreadPoolExecutor(
+            max_workers=refresh_workers, thread_name_prefix="price-refresh"
+        )
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, provider_manager: ProviderManager) -> "PriceService":
+        from django.conf import settings
+
+        return cls(
+            provider_manager,
+            fresh_seconds=getattr(settings, "FINTECH_PRICE_FRESH_SECONDS", DEFAULT_FRESH_SECONDS),
+            max_stale_seconds=getattr(settings, "FINTECH_PRICE_MAX_STALE_SECONDS", DEFAULT_MAX_STALE_SECONDS),
+            refresh_workers=getattr(settings, "FINTECH_PRICE_REFRESH_WORKERS", DEFAULT_REFRESH_WORKERS),
+        )
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get_price(self, isin: str, type_: str) -> Optional[ServedPrice]:
+        """Return the EUR price for *isin* or None if no provider knows it.
+
+        Raises ValueError for an unsupported *type_* (like ProviderManager).
+        """
+        asset = self._tracked_asset(isin)
+        if asset is not None and asset.current_price is not None and asset.current_price_timestamp:
+            age = (timezone.now() - asset.current_price_timestamp).total_seconds()
+            if age <= self.fresh_seconds:
+                return ServedPrice(asset.current_price, asset.current_price_timestamp, SOURCE_DB)
+            if age <= self.max_stale_seconds:
+                self._schedule_refresh(asset)
+                return ServedPrice(asset.current_price, asset.current_price_timestamp, SOURCE_STALE)
+
+        # Cold miss: synchron scrapen
+        type_ = asset.asset_class if asset is not None else type_
+        price = self.provider_manager.isin2price(isin, type_)
+        if price is None:
+            return None
+        now = timezone.now()
+        if asset is not None:
+            self._store(asset, price, now)
+        return ServedPrice(price, now, SOURCE_LIVE)
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _tracked_asset(self, isin: str) -> Optional[Asset]:
+        return (
+            Asset.objects
+            .only("isin", "asset_class", "current_price", "current_price_timestamp")
+            .filter(isin=isin)
+            .first()
+        )
+
+    def _schedule_refresh(self, asset: Asset) -> None:
+        with self._lock:
+            if asset.isin in self._refreshing:
+                return
+            self._refreshing.add(asset.isin)
+        logger.info(f"Serving stale price for {asset.isin}, refresh scheduled")
+        self._refresh_pool.submit(self._refresh, asset)
+
+    def _refresh(self, asset: Asset) -> None:
+        try:
+            price = self.provider_manager.isin2price(asset.isin, asset.asset_class)
+            if price is None:
+                logger.warning(f"Background refresh found no price for {asset.isin}")
+                return
+            self._store(asset, price, timezone.now())
+        except Exception:
+            logger.exception(f"Background refresh failed for {asset.isin}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(asset.isin)
+            # Eigener Thread → eigene DB-Verbindung, nicht offen liegen lassen
+            connection.close()
+
+    def _store(self, asset: Asset, price: Decimal, timestamp: datetime) -> None:
+        """Record the price; ingest() also moves it into Asset.current_price."""
+        result = Price.objects.ingest([Price(asset=asset, current_price=price, timestamp=timestamp)])
+        if result.duplicates:
+            logger.info(f"Price for {asset.isin} at {timestamp} already stored")
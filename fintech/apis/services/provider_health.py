@@ -0,0 +1,193 @@
+"""
+Per-provider health tracking and circuit breaking for ProviderManager.
+
+Every provider call records its latency and outcome per (provider id, asset class).
+A transport failure (timeout, connection error, HTTP 429/5xx) counts as failure;
+a "not found" answer is a healthy response.
+
+Circuit breaker:
+    closed    → calls pass; after failure_threshold consecutive failures → open
+    open      → calls are skipped for open_seconds, then → half-open
+    half-open → exactly one probe call passes; success closes, failure re-opens
+
+ProviderManager ranks its provider chain by expected cost (mean latency divided by
+success rate over the rolling window), so a slow or flaky Comdirect is no longer
+always tried first.
+
+Optional settings (all have defaults):
+    FINTECH_HEALTH_WINDOW           = 50   # samples per provider and asset class
+    FINTECH_BREAKER_FAILURES        = 5    # consecutive failures until open
+    FINTECH_BREAKER_OPEN_SECONDS    = 30
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = 50
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_OPEN_SECONDS = 30
+MIN_SAMPLES_FOR_RANKING = 5
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class ProviderHealth:
+    """Rolling latency/success window plus circuit breaker for one provider."""
+
+    def __init__(
+        self,
+        name: str,
+        window: int = DEFAULT_WINDOW,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        open_seconds: float = DEFAULT_OPEN_SECONDS,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self._lock = threading.Lock()
+        self._samples: deque = deque(maxlen=window)   # (latency_seconds, ok)
+        self._consecutive_failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """True if a call may go to this provider now."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    return False
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+                logger.info(f"Circuit {self.name} half-open, probing")
+            # HALF_OPEN: nur ein Probe-Aufruf gleichzeitig
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self._samples.append((latency, True))
+            self._consecutive_failures = 0
+            if self._state != CLOSED:
+                logger.info(f"Circuit {self.name} closed again")
+            self._state = CLOSED
+            self._probe_in_flight = False
+
+    def record_failure(self, latency: float) -> None:
+        with self._lock:
+            self._samples.append((latency, False))
+            self._consecutive_failures += 1
+            if self._state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    logger.warning(
+                        f"Circuit {self.name} open for {self.open_seconds}s "
+                        f"after {self._consecutive_failures} failure(s)"
+                    )
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def release(self) -> None:
+        """Forget an allowed call without a result (e.g. cancelled); frees the probe slot."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def score(self):
+        """Expected cost of a call (lower is better) or None without enough samples."""
+        with self._lock:
+            if len(self._samples) < MIN_SAMPLES_FOR_RANKING:
+                return None
+            latency = sum(sample[0] for sample in self._samples) / len(self._samples)
+            success_rate = sum(1 for sample in self._samples if sample[1]) / len(self._samples)
+        return latency / max(success_rate, 0.05)
+
+    def latency_quantile(self, q: float):
+        """Latency (seconds) at quantile *q* of successful calls, None without enough samples."""
+        with self._lock:
+            latencies = sorted(sample[0] for sample in self._samples if sample[1])
+        if len(latencies) < MIN_SAMPLES_FOR_RANKING:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = list(self._samples)
+            state = self._state
+        latencies = sorted(sample[0] for sample in samples)
+        return {
+            "state": state,
+            "samples": len(samples),
+            "error_rate": (sum(1 for sample in samples if not sample[1]) / len(samples)) if samples else 0.0,
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+        }
+
+
+class HealthRegistry:
+    """ProviderHealth per (provider id, asset class), created on first use."""
+
+    def __init__(
+        self,
+        window: int = DEFAULT_WINDOW,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        open_seconds: float = DEFAULT_OPEN_SECONDS,
+    ):
+        self.window = window
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self._lock = threading.Lock()
+        self._health: dict = {}
+
+    @classmethod
+    def from_settings(cls) -> "HealthRegistry":
+        from django.conf import settings
+
+        return cls(
+            window=getattr(settings, "FINTECH_HEALTH_WINDOW", DEFAULT_WINDOW),
+            failure_threshold=getattr(settings, "FINTECH_BREAKER_FAILURES", DEFAULT_FAILURE_THRESHOLD),
+            open_seconds=getattr(settings, "FINTECH_BREAKER_OPEN_SECONDS", DEFAULT_OPEN_SECONDS),
+        )
+
+    def get(self, provider_id: str, type_: str) -> ProviderHealth:
+        key = (provider_id, type_)
+        with self._lock:
+            health = self._health.get(key)
+            if health is None:
+                health = self._health[key] = ProviderHealth(
+                    f"{provider_id}/{type_}", self.window, self.failure_threshold, self.open_seconds
+                )
+            return health
+
+    def rank(self, chain: list, type_: str) -> list:
+        """Order *chain* by expected cost; keeps the static order until all are measured."""
+        scores = [self.get(requester.id, type_).score() for requester in chain]
+        if any(score is None for score in scores):
+            return chain
+        ranked = [requester for _, _, requester in sorted(
+            zip(scores, range(len(chain)), chain), key=lambda item: item[:2]
+        )]
+        if ranked != chain:
+            logger.info(f"Provider order for {type_}: {[requester.id for requester in ranked]}")
+        return ranked
+
+    def open_circuits(self) -> list[str]:
+        with self._lock:
+            return [health.name for health in self._health.values() if health.state == OPEN]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            items = list(self._health.values())
+        return {health.name: health.snapshot() for health in items}
@@ -1,41 +1,93 @@
+import asyncio
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from decimal import Decimal
 
+from django.db import connection
+from django.http import Http404
+
 from .comdirect import ComdirectRequest
 from .alleaktien import AlleaktienRequest
 from .justetf import JustEtfRequest
-from .request_lib import KeyNotFoundWarning, KeyNotFoundError
-from .soup_cache import SoupCache
-from .exchange_rate_proxy import CurrencyProxy
+from .request_lib import KeyNotFoundWarning, KeyNotFoundError, Page, ProviderNotFound, Quote, StockRequest
+from .page_cache import PageCache, QuoteCache
+from .shared_cache import shared
+from .exchange_rate_proxy import get_fx_service
+from .http_transport import TRANSPORT_ERRORS, AsyncHttpTransport, HttpTransport, get_transport
+from .provider_health import HealthRegistry
+from .negative_cache import ABSENT, PRICE, TRANSIENT, WKN, NegativeCache
+from .single_flight import AsyncSingleFlight, SingleFlight
 from ...models_helper.asset_class import AssetClass
 
 logger = logging.getLogger(__name__)
 
 MAX_WKN_RETRIES = 2
 MAX_PRICE_RETRIES = 2
+DEFAULT_HEDGE_PERCENTILE = 0.95
+DEFAULT_HEDGE_MIN_DELAY_SECONDS = 0.5
+DEFAULT_HEDGE_WORKERS = 8
 
 
 class ProviderManager:
+    """Provider chains for WKN and price lookups (sync and async).
+
+    Optional hedging for price chains with a fallback (stocks): if the primary has
+    not answered after its observed latency percentile, the secondary is started
+    in parallel and the first price wins. Settings:
+        FINTECH_HEDGE_ENABLED           = False
+        FINTECH_HEDGE_PERCENTILE        = 0.95
+        FINTECH_HEDGE_MIN_DELAY_SECONDS = 0.5   # also used until enough samples exist
+    """
+
+    def __init__(self, transport: HttpTransport = None, async_transport: AsyncHttpTransport = None):
+        from django.conf import settings
+
+        # Ein gemeinsamer Transport: Keep-Alive-Verbindungen pro Host für alle Requester
+        self.transport = transport or get_transport()
+        self.async_transport = async_transport or AsyncHttpTransport.from_settings()
+        # Lokaler LRU pro Prozess, dahinter der prozessübergreifende Cache (siehe shared_cache)
+        self.page_cache = shared(PageCache.from_settings(), "page", Page.from_shared)
+        self.quote_cache = shared(QuoteCache.from_settings(), "quote", Quote.from_shared)
+        self.health = HealthRegistry.from_settings()
+        self.negative = NegativeCache.from_settings()
+        # Prozessweiter FX-Dienst (refresh-ahead, Last-known-good)
+        self.ex_proxy = get_fx_service()
+        # Gleichzeitige Preisabfragen derselben ISIN teilen sich eine Provider-Kette
+        self.price_flight = SingleFlight()
+        self.async_price_flight = AsyncSingleFlight()
 
-    def __init__(self):
-        self.soup_cache = SoupCache()
-        self.ex_proxy = CurrencyProxy()
+        self.hedging = getattr(settings, "FINTECH_HEDGE_ENABLED", False)
+        self.hedge_percentile = getattr(settings, "FINTECH_HEDGE_PERCENTILE", DEFAULT_HEDGE_PERCENTILE)
+        self.hedge_min_delay = getattr(settings, "FINTECH_HEDGE_MIN_DELAY_SECONDS", DEFAULT_HEDGE_MIN_DELAY_SECONDS)
+        self.hedge_workers = DEFAULT_HEDGE_WORKERS
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._hedge_executor = None
+        self._hedge_lock = threading.Lock()
+        self._counter_lock = threading.Lock()   # hedges/hedge_wins: Instanz wird von Threads geteilt
 
         # Comdirect-Requester dynamisch aus AssetClass-Konfiguration aufbauen
         self.com_requester = {
             value: ComdirectRequest(
-                base_url = url_template,
-                cache    = self.soup_cache,
-                id       = req_id,
+                base_url        = url_template,
+                cache           = self.page_cache,
+                id              = req_id,
+                transport       = self.transport,
+                async_transport = self.async_transport,
+                quotes          = self.quote_cache,
             )
             for value, (url_template, req_id) in AssetClass.get_comdirect_config().items()
         }
-        
+
         self.alle_aktien_request = AlleaktienRequest(
-            "https://www.alleaktien.com/data/{isin}", cache=self.soup_cache, id="alle"
+            "https://www.alleaktien.com/data/{isin}", cache=self.page_cache, id="alle",
+            transport=self.transport, async_transport=self.async_transport, quotes=self.quote_cache,
         )
         self.just_etf_request = JustEtfRequest(
-            "https://www.justetf.com/de/etf-profile.html?isin={isin}", cache=self.soup_cache, id="just_etf"
+            "https://www.justetf.com/de/etf-profile.html?isin={isin}", cache=self.page_cache, id="just_etf",
+            transport=self.transport, async_transport=self.async_transport, quotes=self.quote_cache,
         )
 
     # ------------------------------------------------------------------
@@ -45,14 +97,14 @@ class ProviderManager:
     def isin2wkn(self, isin: str, type_: str) -> str:
         """Return WKN for *isin* or None if all providers fail."""
         self._validate_type(type_)
-        for attempt in range(MAX_WKN_RETRIES):
+        self.negative.refresh()
+        for attempt, requester in enumerate(self._available(self._wkn_chain(type_), type_, WKN, isin)):
             try:
-                if attempt == 0:
-                    return self.com_requester[type_].isin2wkn(isin)
-                if AssetClass.is_etf(type_):  # FIX: is_etf() statt Index-Magic
-                    logger.info(f"Trying JustETF as WKN fallback for {isin}/{type_}")
-                    return self.just_etf_request.isin2wkn(isin)
-                return self.alle_aktien_request.isin2wkn(isin)
+                if attempt:
+                    logger.info(f"Trying {requester.id} as WKN fallback for {isin}/{type_}")
+                return self._call(requester, type_, WKN, requester.isin2wkn, isin)
+            except TRANSPORT_ERRORS as exc:
+                logger.warning(f"{requester.id} failed for WKN {isin}/{type_}: {exc!r}")
             except KeyNotFoundWarning:
                 logger.warning(f"WKN not found for {isin}/{type_} attempt {attempt}")
             except KeyNotFoundError:
@@ -67,31 +119,324 @@ class ProviderManager:
 
         Provider chain:
           1. Comdirect  (alle Typen)
-          2. AlleAktien (Fallback für Stock/ETF)
+          2. AlleAktien (Fallback für Stock)
+
+        Concurrent calls for the same (isin, type_) share one lookup.
         """
         self._validate_type(type_)
-        for attempt in range(MAX_PRICE_RETRIES):
+        return self.price_flight.do((isin, type_), self._isin2price, isin, type_)
+
+    async def aisin2wkn(self, isin: str, type_: str) -> str:
+        """Async variant of isin2wkn() — same provider chain, non-blocking I/O."""
+        self._validate_type(type_)
+        await self.negative.arefresh()
+        for attempt, requester in enumerate(self._available(self._wkn_chain(type_), type_, WKN, isin)):
             try:
-                if attempt == 0:
-                    price, currency = self.com_requester[type_].isin2price(isin)
-                else:
-                    if AssetClass.is_stock(type_):  # FIX: is_stock() statt Index-Magic
-                        logger.info(f"Trying AlleAktien as price fallback for {isin}/{type_}")
-                        _, price, currency, _ = self.alle_aktien_request.get_infos(isin)
-                return self._convert_to_euro(price, currency)
+                if attempt:
+                    logger.info(f"Trying {requester.id} as WKN fallback for {isin}/{type_}")
+                return await self._acall(requester, type_, WKN, requester.aisin2wkn, isin)
+            except TRANSPORT_ERRORS as exc:
+                logger.warning(f"{requester.id} failed for WKN {isin}/{type_}: {exc!r}")
             except KeyNotFoundWarning:
-                logger.warning(f"Price not found for {isin}/{type_} attempt {attempt}")
+                logger.warning(f"WKN not found for {isin}/{type_} attempt {attempt}")
             except KeyNotFoundError:
-                logger.error(f"Price definitively not found for {isin}/{type_}")
+                logger.error(f"WKN definitively not found for {isin}/{type_}")
                 return None
 
-        logger.warning(f"Price exhausted all providers for {isin}/{type_}")
+        logger.warning(f"WKN exhausted all providers for {isin}/{type_}")
         return None
 
+    async def aisin2price(self, isin: str, type_: str) -> Decimal:
+        """Async variant of isin2price() — same provider chain, non-blocking I/O."""
+        self._validate_type(type_)
+        return await self.async_price_flight.do((isin, type_), self._aisin2price, isin, type_)
+
+    def stats(self) -> dict:
+        """Page-cache and FX counters for this manager (e.g. for a run summary)."""
+        cache = self.page_cache.stats()
+        quotes = self.quote_cache.stats()
+        return {
+            "cache_hits": cache["hits"],
+            "cache_misses": cache["misses"],
+            "cache_evictions": cache["evictions"],
+            "cache_bytes": cache["bytes"],
+            "quote_hits": quotes["hits"],
+            "shared_hits": cache.get("shared_hits", 0) + quotes.get("shared_hits", 0),
+            "fx_fetches": self.ex_proxy.fetch_count,
+            "coalesced": self._coalesced(),
+            "open_circuits": self.health.open_circuits(),
+            "negative_hits": self.negative.hits,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
+
+    async def aclose(self) -> None:
+        """Close the async connection pool (call once at the end of an async run)."""
+        await self.async_transport.aclose()
+
+    async def __aenter__(self) -> "ProviderManager":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
     # ------------------------------------------------------------------
     # Internal helpers
     # ------------------------------------------------------------------
 
+    def _isin2price(self, isin: str, type_: str) -> Decimal:
+        self.negative.refresh()
+        hedge = self._hedge_pair(type_, isin)
+        if hedge:
+            return self._hedged_isin2price(isin, type_, *hedge)
+        for attempt, requester in enumerate(self._available(self._price_chain(type_), type_, PRICE, isin)):
+            if attempt:
+                logger.info(f"Trying {requester.id} as price fallback for {isin}/{type_}")
+            price, final = self._try_price(requester, isin, type_, attempt)
+            if final:
+                return price
+
+        logger.warning(f"Price exhausted all providers for {isin}/{type_}")
+        return None
+
+    async def _aisin2price(self, isin: str, type_: str) -> Decimal:
+        await self.negative.arefresh()
+        hedge = self._hedge_pair(type_, isin)
+        if hedge:
+            return await self._ahedged_isin2price(isin, type_, *hedge)
+        for attempt, requester in enumerate(self._available(self._price_chain(type_), type_, PRICE, isin)):
+            if attempt:
+                logger.info(f"Trying {requester.id} as price fallback for {isin}/{type_}")
+            price, final = await self._atry_price(requester, isin, type_, attempt)
+            if final:
+                return price
+
+        logger.warning(f"Price exhausted all providers for {isin}/{type_}")
+        return None
+
+    def _try_price(self, requester: StockRequest, isin: str, type_: str, attempt: int = 0):
+        """One provider attempt → (EUR price or None, final); final=False means try the next one."""
+        try:
+            price, currency = self._call(requester, type_, PRICE, requester.isin2price, isin)
+            return self._convert_to_euro(price, currency), True
+        except TRANSPORT_ERRORS as exc:
+            logger.warning(f"{requester.id} failed for price {isin}/{type_}: {exc!r}")
+        except KeyNotFoundWarning:
+            logger.warning(f"Price not found for {isin}/{type_} attempt {attempt}")
+        except KeyNotFoundError:
+            logger.error(f"Price definitively not found for {isin}/{type_}")
+            return None, True
+        return None, False
+
+    async def _atry_price(self, requester: StockRequest, isin: str, type_: str, attempt: int = 0):
+        try:
+            price, currency = await self._acall(requester, type_, PRICE, requester.aisin2price, isin)
+            return await self._aconvert_to_euro(price, currency), True
+        except TRANSPORT_ERRORS as exc:
+            logger.warning(f"{requester.id} failed for price {isin}/{type_}: {exc!r}")
+        except KeyNotFoundWarning:
+            logger.warning(f"Price not found for {isin}/{type_} attempt {attempt}")
+        except KeyNotFoundError:
+            logger.error(f"Price definitively not found for {isin}/{type_}")
+            return None, True
+        return None, False
+
+    # --- Hedging ---------------------------------------------------------
+
+    def _hedge_pair(self, type_: str, isin: str):
+        """(primary, secondary) when hedging applies to *type_*, else None."""
+        if not self.hedging:
+            return None
+        chain = [
+            requester for requester in self.health.rank(self._price_chain(type_), type_)
+            if not self.negative.is_miss(requester.id, PRICE, isin)
+        ]
+        if len(chain) < 2:
+            return None
+        return chain[0], chain[1]
+
+    def _hedge_delay(self, primary: StockRequest, type_: str) -> float:
+        """Wait this long for the primary before starting the secondary."""
+        observed = self.health.get(primary.id, type_).latency_quantile(self.hedge_percentile)
+        return max(observed or 0.0, self.hedge_min_delay)
+
+    def _hedged_isin2price(self, isin: str, type_: str, primary: StockRequest, secondary: StockRequest) -> Decimal:
+        """Thread variant: a running loser cannot be interrupted — it runs to completion
+        in the background and only fills the page cache; its result is discarded."""
+        if not self.health.get(primary.id, type_).allow():
+            return self._fallback_price(isin, type_, secondary)
+
+        first = self._hedge_pool().submit(self._pooled_try_price, primary, isin, type_)
+        done, _ = wait([first], timeout=self._hedge_delay(primary, type_))
+        if done:
+            price, final = first.result()
+            return price if final else self._fallback_price(isin, type_, secondary)
+
+        if not self.health.get(secondary.id, type_).allow():
+            price, _ = first.result()
+            return price
+
+        self._count_hedge()
+        logger.info(f"Hedging {isin}/{type_}: {primary.id} slow, starting {secondary.id}")
+        second = self._hedge_pool().submit(self._pooled_try_price, secondary, isin, type_, 1)
+        for future in as_completed([first, second]):
+            price, _ = future.result()
+            if price is not None:
+                if future is second:
+                    self._count_hedge(won=True)
+                return price
+        return None
+
+    async def _ahedged_isin2price(
+        self, isin: str, type_: str, primary: StockRequest, secondary: StockRequest
+    ) -> Decimal:
+        if not self.health.get(primary.id, type_).allow():
+            return await self._afallback_price(isin, type_, secondary)
+
+        first = asyncio.ensure_future(self._atry_price(primary, isin, type_))
+        done, _ = await asyncio.wait({first}, timeout=self._hedge_delay(primary, type_))
+        if done:
+            price, final = first.result()
+            return price if final else await self._afallback_price(isin, type_, secondary)
+
+        if not self.health.get(secondary.id, type_).allow():
+            price, _ = await first
+            return price
+
+        self._count_hedge()
+        logger.info(f"Hedging {isin}/{type_}: {primary.id} slow, starting {secondary.id}")
+        second = asyncio.ensure_future(self._atry_price(secondary, isin, type_, 1))
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    price, _ = task.result()
+                    if price is not None:
+                        if task is second:
+                            self._count_hedge(won=True)
+                        return price
+            return None
+        finally:
+            for task in pending:
+                # Verlierer abbrechen — AsyncSingleFlight bricht dann auch den Seitenabruf ab,
+                # sofern kein anderer Aufrufer auf dieselbe Seite wartet
+                task.cancel()
+
+    def _fallback_price(self, isin: str, type_: str, secondary: StockRequest) -> Decimal:
+        if not self.health.get(secondary.id, type_).allow():
+            return None
+        logger.info(f"Trying {secondary.id} as price fallback for {isin}/{type_}")
+        price, _ = self._try_price(secondary, isin, type_, 1)
+        return price
+
+    async def _afallback_price(self, isin: str, type_: str, secondary: StockRequest) -> Decimal:
+        if not self.health.get(secondary.id, type_).allow():
+            return None
+        logger.info(f"Trying {secondary.id} as price fallback for {isin}/{type_}")
+        price, _ = await self._atry_price(secondary, isin, type_, 1)
+        return price
+
+    def _pooled_try_price(self, requester: StockRequest, isin: str, type_: str, attempt: int = 0):
+        """_try_price for a hedge pool thread."""
+        try:
+            return self._try_price(requester, isin, type_, attempt)
+        finally:
+            # Eigener Thread → eigene DB-Verbindung (Negativ-Cache), nicht offen liegen lassen
+            connection.close()
+
+    def _count_hedge(self, won: bool = False) -> None:
+        with self._counter_lock:
+            if won:
+                self.hedge_wins += 1
+            else:
+                self.hedges += 1
+
+    def _hedge_pool(self) -> ThreadPoolExecutor:
+        if self._hedge_executor is None:
+            with self._hedge_lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(
+                        max_workers=self.hedge_workers, thread_name_prefix="price-hedge"
+                    )
+        return self._hedge_executor
+
+    # ---------------------------------------------------------------------
+
+    def _available(self, chain: list[StockRequest], type_: str, lookup: str, isin: str):
+        """Chain ranked by measured cost, skipping providers whose circuit is open
+        and providers known not to have *lookup* (PRICE/WKN) for *isin* (negative cache).
+
+        Lazy on purpose: allow() is only asked right before a provider is called,
+        so an unused fallback does not take the half-open probe slot.
+        """
+        for requester in self.health.rank(chain, type_):
+            if self.negative.is_miss(requester.id, lookup, isin):
+                continue
+            if self.health.get(requester.id, type_).allow():
+                yield requester
+            else:
+                logger.info(f"Skipping {requester.id} for {type_}: circuit open")
+
+    def _call(self, requester: StockRequest, type_: str, lookup: str, fn, isin: str):
+        """Call *fn* and record latency/outcome; only transport errors count as failure.
+
+        "Not found" answers go into the negative cache under *lookup* (the field *fn*
+        reads, PRICE or WKN), a hit clears that entry.
+        """
+        health = self.health.get(requester.id, type_)
+        started = time.perf_counter()
+        try:
+            result = fn(isin)
+        except TRANSPORT_ERRORS:
+            health.record_failure(time.perf_counter() - started)
+            raise
+        except (KeyNotFoundWarning, KeyNotFoundError, Http404) as exc:
+            health.record_success(time.perf_counter() - started)
+            self.negative.record(requester.id, lookup, isin, self._miss_kind(exc), str(exc))
+            raise
+        except Exception:
+            health.record_success(time.perf_counter() - started)   # Provider hat geantwortet
+            raise
+        health.record_success(time.perf_counter() - started)
+        self.negative.forget(requester.id, lookup, isin)
+        return result
+
+    async def _acall(self, requester: StockRequest, type_: str, lookup: str, fn, isin: str):
+        health = self.health.get(requester.id, type_)
+        started = time.perf_counter()
+        try:
+            result = await fn(isin)
+        except asyncio.CancelledError:
+            health.release()
+            raise
+        except TRANSPORT_ERRORS:
+            health.record_failure(time.perf_counter() - started)
+            raise
+        except (KeyNotFoundWarning, KeyNotFoundError, Http404) as exc:
+            health.record_success(time.perf_counter() - started)
+            await self.negative.arecord(requester.id, lookup, isin, self._miss_kind(exc), str(exc))
+            raise
+        except Exception:
+            health.record_success(time.perf_counter() - started)
+            raise
+        health.record_success(time.perf_counter() - started)
+        await self.negative.aforget(requester.id, lookup, isin)
+        return result
+
+    def _miss_kind(self, exc: Exception) -> str:
+        """404/400, "page not found" or KeyNotFoundError → absent; a field missing on a loaded page → transient."""
+        if isinstance(exc, (ProviderNotFound, KeyNotFoundError, Http404)):
+            return ABSENT
+        return TRANSIENT
+
+    def _coalesced(self) -> int:
+        """Lookups and page fetches that joined an in-flight call instead of starting one."""
+        flights = [self.price_flight, self.async_price_flight]
+        for requester in [*self.com_requester.values(), self.alle_aktien_request, self.just_etf_request]:
+            flights += [requester.flight, requester.async_flight]
+        return sum(flight.shared for flight in flights)
+
     def _validate_type(self, type_: str) -> None:
         if not AssetClass.is_valid(type_):  # FIX: Flexibler mit is_valid()
             raise ValueError(
@@ -100,10 +445,23 @@ class ProviderManager:
                 f"Valid labels: {list(AssetClass.labels)}."
             )
 
+    def _wkn_chain(self, type_: str) -> list[StockRequest]:
+        """Comdirect first, then JustETF (ETF) or AlleAktien (alle anderen)."""
+        if AssetClass.is_etf(type_):
+            fallback = self.just_etf_request
+        else:
+            fallback = self.alle_aktien_request
+        return [self.com_requester[type_], fallback][:MAX_WKN_RETRIES]
+
+    def _price_chain(self, type_: str) -> list[StockRequest]:
+        """Comdirect first; AlleAktien only knows stocks."""
+        chain = [self.com_requester[type_]]
+        if AssetClass.is_stock(type_):
+            chain.append(self.alle_aktien_request)
+        return chain[:MAX_PRICE_RETRIES]
+
     def _convert_to_euro(self, price: str, currency: str) -> Decimal:
-        from ...libs.general.converter import string2dec
-        dec_price = string2dec(price)
-        if currency == "EUR":
-            return dec_price
-        rate = self.ex_proxy.get_rate(currency)
-        return dec_price / rate
+        return self.ex_proxy.convert(price, currency)
+
+    async def _aconvert_to_euro(self, price: str, currency: str) -> Decimal:
+        return await self.ex_proxy.aconvert(price, currency)
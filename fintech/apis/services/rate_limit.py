@@ -0,0 +1,190 @@
+"""
+Adaptive per-host limits for AsyncHttpTransport.
+
+Each host gets an AdaptiveHostLimiter that combines
+  * a token bucket (requests per second, with a small burst) and
+  * an AIMD concurrency limit (additive increase, multiplicative decrease).
+
+Healthy responses raise the concurrency limit by ~1 per round trip of the whole
+window and nudge the rate up. HTTP 429, 5xx, transport errors or latency rising
+well above its long-term average halve the limit (429 also halves the rate and
+honours Retry-After). At most one decrease per latency period, so one burst of
+failures from requests already in flight does not collapse the limit to the floor.
+
+All state lives on one event loop — no locks needed.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_CONCURRENCY = 1
+DEFAULT_RATE = 10.0        # requests/s at start
+DEFAULT_MAX_RATE = 50.0
+FAST_ALPHA = 0.3           # EWMA der aktuellen Latenz
+SLOW_ALPHA = 0.02          # EWMA der Grundlatenz
+LATENCY_FACTOR = 2.0       # "steigende Latenz": schnell > 2 × langsam
+MIN_LATENCY_SAMPLES = 10
+
+
+class AdaptiveHostLimiter:
+    """Token bucket + AIMD concurrency limit for one host (single event loop)."""
+
+    def __init__(
+        self,
+        host: str,
+        max_concurrency: int,
+        min_concurrency: int = DEFAULT_MIN_CONCURRENCY,
+        rate: float = DEFAULT_RATE,
+        max_rate: float = DEFAULT_MAX_RATE,
+    ):
+        self.host = host
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        # Vorsichtig starten, bei gesunden Antworten hochfahren
+        self.limit = float(max(self.min_concurrency, self.max_concurrency // 4))
+        self.rate = min(rate, max_rate)
+        self.min_rate = min(1.0, self.rate)
+        self.max_rate = max_rate
+        self.burst = max(1.0, self.rate)
+        self.tokens = self.burst
+        self.in_flight = 0
+        self.throttled = 0
+        self.peak_limit = self.limit
+        self._updated = time.monotonic()
+        self._pause_until = 0.0
+        self._last_decrease = 0.0
+        self._fast_latency = None
+        self._slow_latency = None
+        self._samples = 0
+        self._waiters: deque = deque()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def acquire(self) -> None:
+        """Wait for a concurrency slot, then for a token."""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._release_slot()   # Slot war schon übergeben
+                elif waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                raise
+        try:
+            await self._take_token()
+        except asyncio.CancelledError:
+            self._release_slot()
+            raise
+
+    def release(self, status: int = None, latency: float = 0.0, failed: bool = False,
+                retry_after: float = None) -> None:
+        """Return the slot and adapt limits to the outcome of the request.
+
+        status=None and failed=False means "no verdict" (e.g. cancelled).
+        """
+        if failed or (status is not None and (status == 429 or status >= 500)):
+            self._decrease(throttle_rate=(status == 429), retry_after=retry_after)
+        elif status is not None:
+            self._observe_latency(latency)
+            if self._latency_rising():
+                self._decrease(throttle_rate=False)
+            else:
+                self._increase()
+        self._release_slot()
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "peak_limit": int(self.peak_limit),
+            "rate": round(self.rate, 1),
+            "throttled": self.throttled,
+        }
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    async def _take_token(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self._pause_until:
+                await asyncio.sleep(self._pause_until - now)
+                continue
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _increase(self) -> None:
+        # Additiv: +1 pro vollem Fenster gesunder Antworten
+        self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+        self.rate = min(self.max_rate, self.rate + 1 / max(self.limit, 1))
+        self.burst = max(1.0, self.rate)
+        self.peak_limit = max(self.peak_limit, self.limit)
+        self._wake_waiters()
+
+    def _decrease(self, throttle_rate: bool, retry_after: float = None) -> None:
+        now = time.monotonic()
+        if retry_after:
+            self._pause_until = max(self._pause_until, now + retry_after)
+        # Höchstens eine Senkung pro Latenzperiode (Antworten der alten Welle ignorieren)
+        if now - self._last_decrease < max(self._fast_latency or 0.0, 0.5):
+            return
+        self._last_decrease = now
+        self.throttled += 1
+        self.limit = max(self.min_concurrency, self.limit / 2)
+        if throttle_rate:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.burst = max(1.0, self.rate)
+            self.tokens = min(self.tokens, self.burst)
+        logger.warning(
+            f"Backing off {self.host}: limit {int(self.limit)}, {self.rate:.1f} req/s"
+            + (f", paused {retry_after:.0f}s" if retry_after else "")
+        )
+
+    def _observe_latency(self, latency: float) -> None:
+        self._samples += 1
+        if self._fast_latency is None:
+            self._fast_latency = self._slow_latency = latency
+            return
+        self._fast_latency += FAST_ALPHA * (latency - self._fast_latency)
+        self._slow_latency += SLOW_ALPHA * (latency - self._slow_latency)
+
+    def _latency_rising(self) -> bool:
+        return (
+            self._samples >= MIN_LATENCY_SAMPLES
+            and self._fast_latency > LATENCY_FACTOR * self._slow_latency
+        )
+
+
+def retry_after_seconds(headers) -> float:
+    """Retry-After header in seconds (numeric form only), else None."""
+    value = headers.get("Retry-After") if headers is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
@@ -1,9 +1,32 @@
-import requests
+from abc import ABC, abstractmethod
 from bs4 import BeautifulSoup
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+import base64
+import functools
+import html
 import logging
+import re
+import zlib
+
+from django.utils import timezone
+
+from .http_transport import AsyncHttpTransport, HttpTransport, get_transport
+from .page_cache import QuoteCache
+from .single_flight import AsyncSingleFlight, SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# Was ein Extractor als Eingabe braucht (siehe extracts())
+DOM = "dom"     # BeautifulSoup-Baum — teuer, nur wenn wirklich nötig
+TEXT = "text"   # dekodiertes HTML
+HEAD = "head"   # dekodiertes HTML bis </head>
+
+HEAD_END_RE = re.compile(rb"</head\s*>", re.IGNORECASE)
+QUOTE_FIELDS = ("wkn", "price", "currency", "symbol")
+QUOTE_NBYTES = 256   # Richtgröße eines Quote-Eintrags für das Byte-Budget
+META_CONTENT_RE = re.compile(r"""\bcontent\s*=\s*(["'])(.*?)\1""", re.DOTALL)
+
 
 class KeyNotFoundWarning(Exception):
     """Raised when a key is not found but a fallback provider may succeed."""
@@ -14,6 +37,10 @@ class KeyNotFoundWarning(Exception):
         super().__init__(self.message)
 
 
+class ProviderNotFound(KeyNotFoundWarning):
+    """Raised when the provider answers 404/400: it does not know the ISIN at all."""
+
+
 class KeyNotFoundError(Exception):
     """Raised when a key is definitively not found (no fallback useful)."""
 
@@ -23,30 +50,280 @@ class KeyNotFoundError(Exception):
         super().__init__(self.message)
 
 
-class StockRequest:
-    def __init__(self, base_url: str, cache, id: str):
+def extracts(source: str):
+    """Declare the input of a Page.extract() extractor: DOM, TEXT or HEAD.
+
+    Regex-only extractors declare TEXT or HEAD and never trigger HTML tree
+    construction; undeclared extractors get the DOM.
+    """
+    def mark(func):
+        func.source = source
+        return func
+    return mark
+
+
+def meta_content(text: str, attr: str, value: str):
+    """Return the unescaped content of the first <meta attr="value" ...> in *text*, or None.
+
+    Attribute order and quoting are free, as in the DOM lookup soup.find("meta", {attr: value}).
+    """
+    tag = _meta_tag_re(attr, value).search(text)
+    if not tag:
+        return None
+    content = META_CONTENT_RE.search(tag.group(0))
+    return html.unescape(content.group(2)) if content else None
+
+
+@functools.lru_cache(maxsize=None)
+def _meta_tag_re(attr: str, value: str) -> re.Pattern:
+    return re.compile(rf"""<meta\b[^>]*\b{attr}\s*=\s*["']{re.escape(value)}["'][^>]*>""", re.IGNORECASE)
+
+
+class Page:
+    """Cached provider response: zlib-compressed HTML.
+
+    The BeautifulSoup tree is built on demand by soup() and never cached — it is many
+    times larger than the source. Extracted fields are cached once, as a Quote in the
+    QuoteCache (see StockRequest.quote()), not on the page.
+    """
+
+    def __init__(self, content: bytes, complete: bool = True):
+        self._compressed = zlib.compress(content)
+        self.raw_size = len(content)
+        self.complete = complete   # False: nur ein Präfix (z.B. bis </head>) wurde geladen
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._compressed)
+
+    def to_shared(self) -> dict:
+        """JSON form for the shared cache: compressed HTML as base64."""
+        return {
+            "zlib": base64.b64encode(self._compressed).decode("ascii"),
+            "raw_size": self.raw_size,
+            "complete": self.complete,
+        }
+
+    @classmethod
+    def from_shared(cls, data: dict) -> "Page":
+        page = cls.__new__(cls)
+        page._compressed = base64.b64decode(data["zlib"])
+        page.raw_size = data["raw_size"]
+        page.complete = data["complete"]
+        return page
+
+    @property
+    def content(self) -> bytes:
+        return zlib.decompress(self._compressed)
+
+    def soup(self) -> BeautifulSoup:
+        return BeautifulSoup(self.content, "html.parser")
+
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def head(self) -> str:
+        """Decoded document head only (whole text if there is no </head>)."""
+        content = self.content
+        end = HEAD_END_RE.search(content)
+        return (content[:end.end()] if end else content).decode("utf-8", errors="replace")
+
+    def extract(self, extractor, **kwargs) -> dict:
+        """Return extractor(source, **kwargs) for the input it declared with extracts(): soup, text or head."""
+        return extractor(self._source(getattr(extractor, "source", DOM)), **kwargs)
+
+    def _source(self, source: str):
+        if source == TEXT:
+            return self.text()
+        if source == HEAD:
+            return self.head()
+        return self.soup()
+
+
+@dataclass
+class Quote:
+    """All fields one extraction pass found on a provider page (None = not on the page)."""
+    isin:       str
+    provider:   str
+    wkn:        str = None
+    price:      str = None
+    currency:   str = None
+    symbol:     str = None
+    complete:   bool = True   # False: aus einem Seitenpräfix extrahiert
+    fetched_at: datetime = field(default_factory=timezone.now)
+
+    def missing(self, *fields) -> bool:
+        return any(getattr(self, name) is None for name in fields)
+
+    def to_shared(self) -> dict:
+        """JSON form for the shared cache."""
+        return {**asdict(self), "fetched_at": self.fetched_at.isoformat()}
+
+    @classmethod
+    def from_shared(cls, data: dict) -> "Quote":
+        return cls(**{**data, "fetched_at": datetime.fromisoformat(data["fetched_at"])})
+
+    def require(self, *fields):
+        """Return the values of *fields*; KeyNotFoundWarning if one is missing."""
+        for name in fields:
+            if getattr(self, name) is None:
+                raise KeyNotFoundWarning(self.isin, f"{name} not found on {self.provider}")
+        values = tuple(getattr(self, name) for name in fields)
+        return values[0] if len(fields) == 1 else values
+
+
+class StockRequest(ABC):
+    """Base class of all page providers.
+
+    Subclasses implement _quote_fields(); QUOTE_UNTIL limits the download for the
+    first quote attempt (e.g. HEAD_END_RE when the head carries the data).
+    """
+
+    QUOTE_UNTIL: re.Pattern = None
+
+    def __init__(
+        self,
+        base_url: str,
+        cache,
+        id: str,
+        transport: HttpTransport = None,
+        async_transport: AsyncHttpTransport = None,
+        quotes: QuoteCache = None,
+    ):
         self.base_url = base_url
         self.cache = cache
         self.id = id
+        self.quotes = quotes if quotes is not None else QuoteCache.from_settings()
+        self.transport = transport or get_transport()
+        self.async_transport = async_transport or AsyncHttpTransport.from_settings()
+        # Gleichzeitige Abrufe derselben Seite → ein Upstream-Request für alle
+        self.flight = SingleFlight()
+        self.async_flight = AsyncSingleFlight()
 
-    def fetch_soup(self, isin: str) -> BeautifulSoup:
-        """Fetch (or return cached) BeautifulSoup for *isin*."""
-        cached = self.cache.get(isin=isin, requester_id=self.id, base_url=self.base_url)
+    def fetch_page(self, isin: str, until: re.Pattern = None) -> Page:
+        """Fetch (or return cached) Page for *isin*.
+
+        With *until* (a bytes pattern such as HEAD_END_RE) the body is streamed and
+        only the prefix up to the first match is read — enough for head-only data.
+        Concurrent fetches of the same page share one upstream request.
+        """
+        cached = self._cached_page(isin, until)
         if cached:
             return cached
+        return self.flight.do(self._flight_key(isin, until), self._fetch_page, isin, until)
+
+    async def afetch_page(self, isin: str, until: re.Pattern = None) -> Page:
+        """Async variant of fetch_page() — same cache, non-blocking I/O."""
+        cached = self._cached_page(isin, until)
+        if cached:
+            return cached
+        return await self.async_flight.do(self._flight_key(isin, until), self._afetch_page, isin, until)
+
+    def quote(self, isin: str, full: bool = False) -> Quote:
+        """Return the (cached) Quote for *isin*: one extraction pass per page.
+
+        Unless *full*, only QUOTE_UNTIL of the page is downloaded; a partial quote
+        never satisfies a *full* request.
+        """
+        cached = self._cached_quote(isin, full)
+        if cached:
+            return cached
+        page = self.fetch_page(isin, until=None if full else self.QUOTE_UNTIL)
+        return self._store_quote(isin, page)
+
+    async def aquote(self, isin: str, full: bool = False) -> Quote:
+        """Async variant of quote()."""
+        cached = self._cached_quote(isin, full)
+        if cached:
+            return cached
+        page = await self.afetch_page(isin, until=None if full else self.QUOTE_UNTIL)
+        return self._store_quote(isin, page)
+
+    def lookup(self, isin: str, *fields):
+        """Values of *fields* from the quote; loads the full page if a partial quote lacks one."""
+        quote = self.quote(isin)
+        if quote.missing(*fields) and not quote.complete:
+            quote = self.quote(isin, full=True)
+        return quote.require(*fields)
+
+    async def alookup(self, isin: str, *fields):
+        quote = await self.aquote(isin)
+        if quote.missing(*fields) and not quote.complete:
+            quote = await self.aquote(isin, full=True)
+        return quote.require(*fields)
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
 
-        url = self.base_url.replace("{isin}", isin)
-        logger.info(f"Fetching {url}")
-        response = requests.get(url, timeout=10)
-        response.encoding = "utf-8"
+    def _url(self, isin: str) -> str:
+        return self.base_url.replace("{isin}", isin)
 
+    def _cache_key(self, isin: str) -> tuple:
+        return (isin, self.id, self.base_url)
+
+    def _flight_key(self, isin: str, until: re.Pattern) -> tuple:
+        return (isin, until is None)
+
+    def _fetch_page(self, isin: str, until: re.Pattern) -> Page:
+        # Ein gerade beendeter Flight kann die Seite schon in den Cache gelegt haben
+        cached = self._cached_page(isin, until)
+        if cached:
+            return cached
+        url = self._url(isin)
+        if until is None:
+            logger.info(f"Fetching {url}")
+            response = self.transport.get(url)
+        else:
+            logger.info(f"Fetching prefix of {url}")
+            response = self.transport.get_prefix(url, until=until)
+        return self._page_from_response(isin, response)
+
+    async def _afetch_page(self, isin: str, until: re.Pattern) -> Page:
+        cached = self._cached_page(isin, until)
+        if cached:
+            return cached
+        url = self._url(isin)
+        if until is None:
+            logger.info(f"Fetching (async) {url}")
+            response = await self.async_transport.get(url)
+        else:
+            logger.info(f"Fetching (async) prefix of {url}")
+            response = await self.async_transport.get_prefix(url, until=until)
+        return self._page_from_response(isin, response)
+
+    def _cached_quote(self, isin: str, full: bool):
+        cached = self.quotes.get(self._cache_key(isin))
+        if cached and (cached.complete or not full):
+            return cached
+        return None
+
+    def _store_quote(self, isin: str, page: Page) -> Quote:
+        fields = page.extract(self._quote_fields, isin=isin)
+        quote = Quote(isin, self.id, *(fields[key] for key in QUOTE_FIELDS), complete=page.complete)
+        self.quotes.put(self._cache_key(isin), quote, nbytes=QUOTE_NBYTES)
+        return quote
+
+    @abstractmethod
+    def _quote_fields(self, source, isin: str) -> dict:
+        """Return a dict with all QUOTE_FIELDS found in *source* (None when absent).
+
+        Decorate with extracts() to declare the input: DOM (default), TEXT or HEAD.
+        """
+
+    def _cached_page(self, isin: str, until: re.Pattern):
+        """Cached page usable for this fetch mode — a prefix never satisfies a full fetch."""
+        cached = self.cache.get(self._cache_key(isin))
+        if cached and (cached.complete or until is not None):
+            return cached
+        return None
+
+    def _page_from_response(self, isin: str, response) -> Page:
+        """Check status and wrap the body; works for requests and httpx responses."""
         if response.status_code == 404 or response.status_code == 400:
-            raise KeyNotFoundWarning(f"Provider returned {response.status_code} for ISIN {isin}")
+            raise ProviderNotFound(f"Provider returned {response.status_code} for ISIN {isin}")
         response.raise_for_status()  # 5xx und sonstige Fehler → echte Exception
 
-        soup = BeautifulSoup(response.content, "html.parser")
-        self.cache.put(isin=isin, soup=soup, requester_id=self.id, base_url=self.base_url)
-        return soup
-
-    def not_found_in_soup(self, soup: BeautifulSoup, tag: str, pattern: str):
-        return soup.find(tag, class_=pattern)
+        page = Page(response.content, complete=getattr(response, "complete", True))
+        self.cache.put(self._cache_key(isin), page, nbytes=page.nbytes)
+        return page
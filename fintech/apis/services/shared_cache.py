@@ -0,0 +1,217 @@
+"""
+Provider cache shared across processes (gunicorn workers, management commands).
+
+SharedCache puts a second tier behind the per-process PageCache/QuoteCache:
+
+    get: local LRU → shared backend (hit is copied into the local LRU) → miss
+    put: local LRU + shared backend (same TTL)
+
+The backend entry carries the time it was first stored, and a shared hit enters the
+local LRU with that age — a value never outlives the TTL of its first fetch.
+
+so a page or quote fetched by one worker is a cache hit for every other process on
+the host. Values are stored as JSON, never pickled: cached types convert themselves
+with to_shared()/from_shared() (pages as base64 of the compressed HTML, quotes as
+dicts), so a tampered cache file cannot execute code. Backends:
+
+    "sqlite"  one SQLite file per host (WAL mode, safe for many processes) — default;
+              directory and file are created readable by the owner only
+    "django"  a Django cache alias, e.g. django-redis for sharing across hosts
+              (the locmem default is per process and therefore not shared)
+    "none"    per-process caching only
+
+Backend errors are logged and treated as misses; they never fail a lookup.
+
+Optional settings (all have defaults):
+    FINTECH_SHARED_CACHE       = "sqlite"
+    FINTECH_SHARED_CACHE_PATH  = <BASE_DIR>/var/fintech_provider_cache.sqlite3
+    FINTECH_SHARED_CACHE_ALIAS = "default"
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = "sqlite"
+DEFAULT_SQLITE_DIR = "var"   # relativ zu BASE_DIR
+DEFAULT_SQLITE_NAME = "fintech_provider_cache.sqlite3"
+DEFAULT_ALIAS = "default"
+PURGE_EVERY_PUTS = 500
+
+
+class NullBackend:
+    """No sharing: every get() is a miss."""
+
+    def get(self, key: str):
+        return None
+
+    def set(self, key: str, value, ttl_seconds: float) -> None:
+        pass
+
+
+class SQLiteBackend:
+    """JSON values in one owner-only SQLite file; one connection per thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._puts = 0
+
+    def get(self, key: str):
+        row = self._conn().execute(
+            "SELECT value FROM shared_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value, ttl_seconds: float) -> None:
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO shared_cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, separators=(",", ":")), time.time() + ttl_seconds),
+        )
+        self._puts += 1
+        if self._puts % PURGE_EVERY_PUTS == 0:
+            conn.execute("DELETE FROM shared_cache WHERE expires_at <= ?", (time.time(),))
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            _create_private(self.path)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS shared_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+
+class DjangoCacheBackend:
+    """Any configured Django cache alias (django-redis, memcached, database, ...)."""
+
+    def __init__(self, alias: str = DEFAULT_ALIAS):
+        self.alias = alias
+
+    def get(self, key: str):
+        from django.core.cache import caches
+
+        return caches[self.alias].get(key)
+
+    def set(self, key: str, value, ttl_seconds: float) -> None:
+        from django.core.cache import caches
+
+        caches[self.alias].set(key, value, timeout=ttl_seconds)
+
+
+class SharedCache:
+    """Two-tier cache with the PageCache interface (get/put/stats).
+
+    Values go to the backend as value.to_shared() and come back through *load*
+    (e.g. Page.from_shared).
+    """
+
+    def __init__(self, local, backend, namespace: str, load):
+        self.local = local
+        self.backend = backend
+        self.namespace = namespace
+        self.load = load
+        self.max_age = local.max_age
+        self.shared_hits = 0
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        try:
+            entry = self.backend.get(self._key(key))
+            if not entry or "stored_at" not in entry:   # Miss oder Eintrag im alten Format
+                return None
+            age = max(0.0, time.time() - entry["stored_at"])
+            if age >= self.max_age:
+                return None
+            value = self.load(entry["value"])
+        except Exception as exc:
+            logger.warning(f"Shared cache read failed ({self.namespace}): {exc}")
+            return None
+        self.shared_hits += 1
+        logger.info(f"Shared cache hit [{key[1]}] {key[0]} (age {age:.0f}s)")
+        self.local.put(key, value, nbytes=getattr(value, "nbytes", 256), age=age)
+        return value
+
+    def put(self, key, value, nbytes: int) -> None:
+        self.local.put(key, value, nbytes=nbytes)
+        try:
+            entry = {"value": value.to_shared(), "stored_at": time.time()}
+            self.backend.set(self._key(key), entry, self.max_age)
+        except Exception as exc:
+            logger.warning(f"Shared cache write failed ({self.namespace}): {exc}")
+
+    def sweep(self) -> int:
+        return self.local.sweep()
+
+    def clear(self) -> None:
+        self.local.clear()
+
+    def stats(self) -> dict:
+        return {**self.local.stats(), "shared_hits": self.shared_hits}
+
+    def _key(self, key) -> str:
+        return "fintech:" + self.namespace + ":" + "|".join(str(part) for part in key)
+
+
+_shared_backend = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_backend():
+    """Return the process-wide shared backend configured in settings."""
+    global _shared_backend
+    if _shared_backend is None:
+        with _shared_lock:
+            if _shared_backend is None:
+                _shared_backend = _backend_from_settings()
+    return _shared_backend
+
+
+def shared(local, namespace: str, load, backend=None):
+    """Wrap *local* in a SharedCache, or return it unchanged if sharing is off.
+
+    *load* rebuilds a cached value from its to_shared() dict.
+    """
+    backend = backend if backend is not None else get_shared_backend()
+    if isinstance(backend, NullBackend):
+        return local
+    return SharedCache(local, backend, namespace, load)
+
+
+def _backend_from_settings():
+    from django.conf import settings
+
+    kind = getattr(settings, "FINTECH_SHARED_CACHE", DEFAULT_BACKEND)
+    if kind == "sqlite":
+        default_path = os.path.join(settings.BASE_DIR, DEFAULT_SQLITE_DIR, DEFAULT_SQLITE_NAME)
+        backend = SQLiteBackend(getattr(settings, "FINTECH_SHARED_CACHE_PATH", default_path))
+    elif kind == "django":
+        backend = DjangoCacheBackend(getattr(settings, "FINTECH_SHARED_CACHE_ALIAS", DEFAULT_ALIAS))
+    elif kind in (None, "none"):
+        backend = NullBackend()
+    else:
+        raise ValueError(f"Unknown FINTECH_SHARED_CACHE backend '{kind}' (sqlite, django or none).")
+    logger.info(f"Shared provider cache: {kind}")
+    return backend
+
+
+def _create_private(path: str) -> None:
+    """Create *path* and its directory for the owner only (0700/0600); refuses a symlink."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600)
+    os.close(fd)
@@ -0,0 +1,112 @@
+"""
+Single-flight request coalescing.
+
+When several callers ask for the same key at the same time, only the first one (the
+leader) runs the function; the others wait and receive the leader's result or
+exception. As soon as the call finishes the key is released — this is not a cache,
+it only collapses concurrent identical work (e.g. gunicorn threads requesting the
+same ISIN, or every thread refreshing FX rates the moment the TTL expires).
+
+SingleFlight is for threads, AsyncSingleFlight for tasks on one event loop. In
+AsyncSingleFlight a waiter that is cancelled leaves the shared call running for the
+others; when the last waiter is cancelled the call itself is cancelled, so e.g. the
+losing request of a hedge does not keep its connection and host slot.
+"""
+
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Thread-based single-flight group."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) once per concurrent *key* and share its outcome."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            logger.info(f"Single-flight: waiting for in-flight call {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        return {"executed": self.executed, "shared": self.shared}
+
+
+class AsyncSingleFlight:
+    """asyncio single-flight group; bound to the event loop it is first used on."""
+
+    def __init__(self):
+        self._tasks: dict = {}
+        self._waiters: dict = {}   # task -> Anzahl Wartender
+        self.executed = 0
+        self.shared = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        """Await fn(*args, **kwargs) once per concurrent *key* and share its outcome."""
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._release(key, t))
+            self.executed += 1
+        else:
+            self.shared += 1
+            logger.info(f"Single-flight: waiting for in-flight call {key}")
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            # shield: bricht ein Wartender ab, läuft der gemeinsame Aufruf für die anderen weiter
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1 and not task.done():
+                task.cancel()   # letzter Wartender → niemand braucht das Ergebnis mehr
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    def stats(self) -> dict:
+        return {"executed": self.executed, "shared": self.shared}
+
+    def _release(self, key, task: asyncio.Future) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # als abgerufen markieren, falls alle Wartenden abgebrochen haben
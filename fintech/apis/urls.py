@@ -1,11 +1,13 @@
 # fintech/apis/urls.py
 
 from django.urls import path
-from fintech.apis.securities import SecurityPriceView
+from fintech.apis.securities import SecurityPriceView, SecurityPricesView
 
 app_name = "fintech"
 
 urlpatterns = [
-    # GET /fintech/securities/{isin}/price?type=Stock
+    # GET /fintech/securities/{isin}/price?type=STOCK
     path("securities/<str:isin>/price", SecurityPriceView.as_view(), name="security-price"),
+    # POST /fintech/securities/prices  {"securities": [{"isin": ..., "type": ...}, ...]}
+    path("securities/prices", SecurityPricesView.as_view(), name="security-prices"),
 ]
@@ -0,0 +1,106 @@
+"""
+Django Management Command: backfill_fx_rates
+
+Lädt historische EZB-Wechselkurse (Frankfurter) für einen Zeitraum in die
+Tabelle ExchangeRate. Bereits vorhandene Tage werden nur aktualisiert, wenn
+sich der Kurs geändert hat.
+
+Aufruf:
+python manage.py backfill_fx_rates
+python manage.py backfill_fx_rates --start 2020-01-01 --end 2024-12-31
+python manage.py backfill_fx_rates --currencies USD,CHF,GBP
+python manage.py backfill_fx_rates --dry-run
+"""
+
+from datetime import date, timedelta
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from fintech.models import ExchangeRate, Price
+from fintech.models_helper.currency_class import CurrencyClass
+from fintech.apis.services.exchange_rate_proxy import SUBUNITS
+from fintech.apis.services.fx_history import DEFAULT_CHUNK_DAYS, fetch_history, store_history
+
+
+def default_currencies() -> list[str]:
+    """All CurrencyClass codes the API publishes (EUR is the base, GBp derives from GBP)."""
+    return sorted({SUBUNITS.get(code, (code,))[0] for code in CurrencyClass.values} - {"EUR"})
+
+
+class Command(BaseCommand):
+    help = "Lädt historische Wechselkurse (EZB/Frankfurter) in die Tabelle ExchangeRate."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--start",
+            type=date.fromisoformat,
+            help="Erster Tag (YYYY-MM-DD). Default: Tag nach dem letzten gespeicherten Kurs, "
+                 "sonst ältester Preis.",
+        )
+        parser.add_argument(
+            "--end",
+            type=date.fromisoformat,
+            help="Letzter Tag (YYYY-MM-DD). Default: heute.",
+        )
+        parser.add_argument(
+            "--currencies",
+            type=str,
+            help="Kommagetrennte ISO-Codes. Default: alle Währungen aus CurrencyClass.",
+        )
+        parser.add_argument(
+            "--chunk-days",
+            type=int,
+            default=DEFAULT_CHUNK_DAYS,
+            help=f"Tage pro API-Abruf (Default {DEFAULT_CHUNK_DAYS}).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Nur abrufen und zählen, nichts speichern.",
+        )
+
+    def handle(self, *args, **options):
+        async_to_sync(self.handle_async)(*args, **options)
+
+    async def handle_async(self, *args, **options):
+        currencies = (
+            [code.strip() for code in options["currencies"].split(",") if code.strip()]
+            if options.get("currencies") else default_currencies()
+        )
+        end = options.get("end") or timezone.localdate()
+        start = options.get("start") or await self._default_start(end)
+        if start > end:
+            self.stdout.write(self.style.SUCCESS(f"Kurse bis {end} bereits vorhanden — nichts zu tun."))
+            return
+
+        self.stdout.write(f"Lade Kurse {start} bis {end} für {', '.join(currencies)}...")
+        try:
+            history = await sync_to_async(fetch_history, thread_sensitive=False)(
+                start, end, currencies, chunk_days=options["chunk_days"],
+            )
+        except Exception as exc:
+            raise CommandError(f"Abruf fehlgeschlagen: {exc}")
+
+        rows = sum(len(rates) for rates in history.values())
+        if options["dry_run"]:
+            self.stdout.write(f"DRY {len(history)} Handelstag(e), {rows} Kurs(e) — nichts gespeichert.")
+            return
+
+        result = await sync_to_async(store_history)(history)
+        self.stdout.write(self.style.SUCCESS(
+            f"Fertig: {len(history)} Handelstag(e), {result.created} neu, "
+            f"{result.updated} aktualisiert, {result.unchanged} unverändert."
+        ))
+
+    @sync_to_async
+    def _default_start(self, end: date) -> date:
+        last = ExchangeRate.objects.aggregate(last=Max("date"))["last"]
+        if last:
+            return last + timedelta(days=1)
+        first_price = Price.objects.aggregate(first=Min("timestamp"))["first"]
+        if first_price:
+            return timezone.localtime(first_price).date()
+        return end - timedelta(days=365)
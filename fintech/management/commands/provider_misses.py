@@ -0,0 +1,75 @@
+"""
+Django Management Command: provider_misses
+
+Zeigt oder löscht Einträge des Negativ-Caches (ISINs, die ein Provider nicht kennt).
+
+Aufruf:
+python manage.py provider_misses
+python manage.py provider_misses --provider com_stock
+python manage.py provider_misses --lookup wkn
+python manage.py provider_misses --isin DE0007164600 --clear
+python manage.py provider_misses --expired --clear
+python manage.py provider_misses --clear
+"""
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from fintech.models import ProviderMiss
+
+
+class Command(BaseCommand):
+    help = "Listet oder löscht Negativ-Cache-Einträge (Provider kennt ISIN nicht)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--provider", type=str, help="Nur Einträge dieses Providers.")
+        parser.add_argument("--isin", type=str, help="Nur Einträge dieser ISIN.")
+        parser.add_argument(
+            "--lookup",
+            choices=[value for value, _ in ProviderMiss.LOOKUP_CHOICES],
+            help="Nur Einträge dieses Feldes (price, wkn).",
+        )
+        parser.add_argument("--expired", action="store_true", help="Nur abgelaufene Einträge.")
+        parser.add_argument("--clear", action="store_true", help="Ausgewählte Einträge löschen.")
+
+    def handle(self, *args, **options):
+        async_to_sync(self.handle_async)(*args, **options)
+
+    async def handle_async(self, *args, **options):
+        if options["clear"]:
+            deleted = await self._clear(options)
+            self.stdout.write(self.style.SUCCESS(f"{deleted} Eintrag/Einträge gelöscht."))
+            return
+
+        entries = await self._list(options)
+        if not entries:
+            self.stdout.write(self.style.SUCCESS("Keine Einträge."))
+            return
+
+        now = timezone.now()
+        for entry in entries:
+            state = "abgelaufen" if entry.expires_at <= now else f"bis {entry.expires_at:%d.%m.%Y %H:%M}"
+            self.stdout.write(f"{entry.provider:<10} {entry.lookup:<5} {entry.isin} {entry.kind:<9} {state}  {entry.reason}")
+        self.stdout.write(f"\n{len(entries)} Eintrag/Einträge.")
+
+    def _queryset(self, options):
+        qs = ProviderMiss.objects.all()
+        if options.get("provider"):
+            qs = qs.filter(provider=options["provider"])
+        if options.get("lookup"):
+            qs = qs.filter(lookup=options["lookup"])
+        if options.get("isin"):
+            qs = qs.filter(isin=options["isin"].upper())
+        if options.get("expired"):
+            qs = qs.filter(expires_at__lte=timezone.now())
+        return qs
+
+    @sync_to_async
+    def _list(self, options):
+        return list(self._queryset(options))
+
+    @sync_to_async
+    def _clear(self, options):
+        deleted, _ = self._queryset(options).delete()
+        return deleted
@@ -0,0 +1,186 @@
+"""
+Django Management Command: run_worker
+
+Führt Hintergrund-Jobs aus der Tabelle Job aus (siehe job_queue): Preis-Updates,
+CSV-Importe, Bereinigung. Web-Requests legen Jobs nur an und kehren sofort zurück,
+dieser Prozess arbeitet sie ab — bis zu --concurrency Jobs gleichzeitig, pro
+Job-Typ begrenzt durch dessen eigenes Limit (auch über mehrere Worker hinweg).
+
+Laufende Jobs senden alle --heartbeat-seconds ein Lebenszeichen samt Fortschritt.
+Jobs eines abgestürzten Workers werden nach Ablauf der Lease neu eingeplant.
+SIGTERM/SIGINT: keine neuen Jobs mehr annehmen, laufende zu Ende bringen.
+
+Aufruf:
+python manage.py run_worker
+python manage.py run_worker --concurrency 4
+python manage.py run_worker --types update_prices,clean_up
+python manage.py run_worker --once          # nur fällige Jobs abarbeiten, dann beenden
+"""
+
+import asyncio
+import os
+import signal
+import socket
+import time
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+
+from fintech.models import Job
+from fintech.apis.services.job_queue import (
+    JobContext, claim, execute, heartbeat, purge_finished, reclaim_expired, registered_types,
+)
+
+CONCURRENCY = 2          # gleichzeitige Jobs dieses Workers
+POLL_SECONDS = 2.0       # Abstand der Abfragen bei leerer Queue
+HEARTBEAT_SECONDS = 10.0 # Lebenszeichen + Fortschritt laufender Jobs, Lease-Prüfung
+PURGE_EVERY_SECONDS = 3600
+
+
+class Command(BaseCommand):
+    help = "Führt Hintergrund-Jobs aus der Tabelle Job aus (Preis-Updates, CSV-Importe, Bereinigung)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=CONCURRENCY,
+            help=f"Maximale Anzahl gleichzeitig laufender Jobs (Default {CONCURRENCY}).",
+        )
+        parser.add_argument(
+            "--types",
+            type=str,
+            help="Kommagetrennte Job-Typen, die dieser Worker annimmt. Default: alle.",
+        )
+        parser.add_argument(
+            "--poll-seconds",
+            type=float,
+            default=POLL_SECONDS,
+            help=f"Wartezeit zwischen Abfragen bei leerer Queue (Default {POLL_SECONDS}).",
+        )
+        parser.add_argument(
+            "--heartbeat-seconds",
+            type=float,
+            default=HEARTBEAT_SECONDS,
+            help=f"Intervall für Lebenszeichen laufender Jobs (Default {HEARTBEAT_SECONDS}).",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Beenden, sobald keine fälligen Jobs mehr da sind.",
+        )
+
+    def handle(self, *args, **options):
+        # handle_async läuft nicht im Hauptthread → Signale hier abfangen und an die Loop weiterreichen
+        self._loop = None
+        previous = {signum: signal.signal(signum, self._on_signal) for signum in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            async_to_sync(self.handle_async)(*args, **options)
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+    async def handle_async(self, *args, **options):
+        types = None
+        if options.get("types"):
+            types = [name.strip() for name in options["types"].split(",") if name.strip()]
+            unknown = set(types) - set(registered_types())
+            if unknown:
+                raise CommandError(f"Unbekannte Job-Typen: {', '.join(sorted(unknown))}")
+
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        concurrency = max(1, options["concurrency"])
+        self.stopping = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self.stdout.write(
+            f"Worker {self.worker_id} gestartet ({concurrency} parallel, Typen: "
+            f"{', '.join(types or sorted(registered_types()))})."
+        )
+
+        running: dict[asyncio.Task, JobContext] = {}
+        next_maintenance = 0.0
+        next_purge = 0.0
+        stats = {"done": 0, "retry": 0, "failed": 0}
+        while True:
+            now = time.monotonic()
+            if now >= next_maintenance:
+                await self._maintenance(list(running.values()))
+                next_maintenance = now + options["heartbeat_seconds"]
+            if now >= next_purge:
+                purged = await sync_to_async(purge_finished)()
+                if purged:
+                    self.stdout.write(f"{purged} alte Job(s) gelöscht.")
+                next_purge = now + PURGE_EVERY_SECONDS
+
+            claimed = False
+            while not self.stopping.is_set() and len(running) < concurrency:
+                job = await sync_to_async(claim)(self.worker_id, types)
+                if job is None:
+                    break
+                claimed = True
+                context = JobContext(job)
+                self.stdout.write(f"START {job} (Versuch {job.attempts}/{job.max_attempts})")
+                task = asyncio.create_task(sync_to_async(execute, thread_sensitive=False)(job, context))
+                running[task] = context
+
+            if not running and (self.stopping.is_set() or (options["once"] and not claimed)):
+                break
+
+            timeout = min(options["poll_seconds"], options["heartbeat_seconds"])
+            if not running:
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            finished, _ = await asyncio.wait(set(running), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                running.pop(task)
+                self._report(task, stats)
+
+        self.stdout.write(
+            f"Worker {self.worker_id} beendet: {stats['done']} erledigt, "
+            f"{stats['retry']} neu eingeplant, {stats['failed']} fehlgeschlagen."
+        )
+
+    # ------------------------------------------------------------------
+    # Hilfsfunktionen
+    # ------------------------------------------------------------------
+
+    async def _maintenance(self, contexts: list) -> None:
+        if contexts:
+            await sync_to_async(heartbeat)(contexts, self.worker_id)
+        reclaimed = await sync_to_async(reclaim_expired)()
+        if reclaimed:
+            self.stdout.write(self.style.WARNING(f"{reclaimed} Job(s) mit abgelaufener Lease neu eingeplant."))
+
+    def _report(self, task: asyncio.Task, stats: dict) -> None:
+        try:
+            job = task.result()
+        except Exception as exc:
+            # Fehler beim Speichern des Ergebnisses — Job läuft über die Lease erneut
+            stats["failed"] += 1
+            self.stdout.write(self.style.ERROR(f"ERR Worker-Fehler: {exc}"))
+            return
+        if job.status == Job.STATUS_DONE:
+            stats["done"] += 1
+            summary = (job.result or {}).get("summary", "") if isinstance(job.result, dict) else ""
+            self.stdout.write(self.style.SUCCESS(f"OK {job} {summary}".rstrip()))
+        elif job.status == Job.STATUS_QUEUED:
+            stats["retry"] += 1
+            self.stdout.write(self.style.WARNING(
+                f"RETRY {job} ab {job.run_after:%H:%M:%S} — {job.error}"
+            ))
+        else:
+            stats["failed"] += 1
+            self.stdout.write(self.style.ERROR(f"ERR {job} — {job.error}"))
+
+    def _on_signal(self, signum, frame) -> None:
+        if self._loop is None:
+            raise KeyboardInterrupt
+        self._loop.call_soon_threadsafe(self._stop, signum)
+
+    def _stop(self, signum) -> None:
+        if not self.stopping.is_set():
+            self.stdout.write(f"Signal {signum}: keine neuen Jobs, laufende werden beendet...")
+            self.stopping.set()
@@ -1,33 +1,87 @@
 """
 Django Management Command: update_prices
 
-Aktualisiert den Kurs aller Assets deren Preis fehlt oder älter als 1h ist.
+Aktualisiert den Kurs aller Assets deren Preis fehlt oder älter als die TTL ihrer
+Asset-Klasse ist (siehe FreshnessPolicy: z.B. Krypto 5 min, Fonds 1 Tag, sonst 1h).
+Gehaltene Assets zuerst, dann Watchlist, jeweils die ältesten Kurse zuerst.
+Geschlossene Börsen (Nacht, Wochenende, Feiertag) bekommen nur einen Abruf nach
+Handelsschluss (siehe MarketCalendar).
+
+Ablauf als Pipeline aus drei Stufen, verbunden durch begrenzte Warteschlangen:
+
+    Auswahl ──► [fetch_queue] ──► Abruf (N Worker) ──► [write_queue] ──► Speichern (1 Writer)
+
+Die Auswahl liest die fälligen Assets seitenweise per SQL (Keyset, SELECT_CHUNK pro
+Query) direkt in die Warteschlange — es wird nie die ganze Menge geladen. Die
+Abruf-Worker holen die Kurse parallel, ein einzelner Writer speichert sie gebündelt
+per Price.objects.ingest()
+(Batch voll oder Flush-Intervall abgelaufen). Volle Warteschlangen bremsen die
+vorige Stufe (Backpressure). Am Ende werden Laufzeiten und Warteschlangen-
+Füllstände pro Stufe ausgegeben.
 
 Aufruf:
 python manage.py update_prices
 python manage.py update_prices --dry-run
 python manage.py update_prices --isin DE0007164600
+python manage.py update_prices --concurrency 200
+python manage.py update_prices --batch-size 200 --flush-seconds 1
+python manage.py update_prices --limit 50
+python manage.py update_prices --lock-wait 0    # nicht warten, falls schon ein Lauf aktiv ist
+
+Es läuft immer nur ein Lauf gleichzeitig (DB-Sperre, siehe lease_lock): ein zweiter
+Aufruf — anderer gunicorn-Worker, run_worker, Cron — wartet auf den laufenden und
+übernimmt dessen Ergebnis, statt dieselben ISINs ein zweites Mal abzurufen.
+Geht die Sperre während des Laufs verloren, bricht der Lauf mit CommandError ab
+(als Job: Status "failed" mit dieser Meldung).
+
+Aufrufer per call_command() können mit progress=callable(done, total, counts) den
+Fortschritt verfolgen (siehe portfolio_refresh).
 """
 
 import asyncio
-from datetime import timedelta
+import time
+from dataclasses import dataclass
 from typing import Optional
 from decimal import Decimal
 
 from asgiref.sync import async_to_sync, sync_to_async
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 
 from fintech.models import Asset, Price
-from fintech.models_helper.asset_class import AssetClass
+from fintech.apis.services.freshness import TIER_HELD, TIER_OTHER, TIER_WATCHED, FreshnessPolicy
 from fintech.apis.services.provider_manager import ProviderManager
+from fintech.apis.services.http_transport import AsyncHttpTransport
+from fintech.apis.services.lease_lock import LeaseLock, LeaseOutcome, LeaseTimeout
+
+CONCURRENCY = 100   # gleichzeitige Assets; das adaptive Limit pro Host setzt der AsyncHttpTransport
+BATCH_SIZE = 100    # Kurse pro Schreib-Batch
+FLUSH_SECONDS = 2.0 # spätestens dann wird ein angefangener Batch geschrieben
+LOCK_WAIT = 900     # so lange auf einen laufenden update_prices-Lauf warten
+LOCK_NAME = "update_prices"
+SELECT_CHUNK = 500  # Assets pro Auswahl-Query (Keyset-Paginierung)
+
+
+@dataclass
+class StageStats:
+    """Timings and queue depth of one pipeline stage."""
+    name:       str
+    items:      int = 0
+    busy:       float = 0.0   # Summe der Arbeitszeit (bei N Workern > Wandzeit)
+    blocked:    float = 0.0   # Wartezeit auf Platz in der nächsten Warteschlange
+    finished:   float = 0.0   # Wandzeit seit Start bis Stufenende
+    max_depth:  int = 0       # höchster Füllstand der Ausgangs-Warteschlange
 
-PRICE_MAX_AGE = timedelta(hours=1)
-CONCURRENCY = 10
+    async def put(self, queue: asyncio.Queue, item) -> None:
+        started = time.perf_counter()
+        await queue.put(item)
+        self.blocked += time.perf_counter() - started
+        self.max_depth = max(self.max_depth, queue.qsize())
 
 
 class Command(BaseCommand):
-    help = "Aktualisiert Kurse für alle Assets die fehlen oder älter als 1h sind."
+    help = "Aktualisiert Kurse aller fälligen Assets (TTL pro Asset-Klasse, gehaltene zuerst)."
+    stealth_options = ("progress",)
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -40,108 +94,369 @@ class Command(BaseCommand):
             type=str,
             help="Nur ein bestimmtes Asset aktualisieren.",
         )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=CONCURRENCY,
+            help=f"Maximale Anzahl gleichzeitig bearbeiteter Assets (Default {CONCURRENCY}).",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            help="Höchstens so viele Assets aktualisieren (die wichtigsten/ältesten zuerst).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help=f"Kurse pro Schreib-Batch (Default {BATCH_SIZE}).",
+        )
+        parser.add_argument(
+            "--flush-seconds",
+            type=float,
+            default=FLUSH_SECONDS,
+            help=f"Angefangenen Batch spätestens nach so vielen Sekunden schreiben (Default {FLUSH_SECONDS}).",
+        )
+        parser.add_argument(
+            "--lock-wait",
+            type=float,
+            default=LOCK_WAIT,
+            help=f"Sekunden, die auf einen bereits laufenden Lauf gewartet wird (Default {LOCK_WAIT}).",
+        )
 
     def handle(self, *args, **options):
         async_to_sync(self.handle_async)(*args, **options)
 
     async def handle_async(self, *args, **options):
-        dry_run = options["dry_run"]
-        isin_filter = options.get("isin")
+        self.progress = options.get("progress")
+        if options["dry_run"]:
+            await self._update(options)   # liest nur, braucht keine Sperre
+            return
+
+        # Nur ein Lauf gleichzeitig (über alle Prozesse); ein zweiter Aufruf wartet und
+        # übernimmt das Ergebnis. Mit --isin/--limit passt ein fremdes Ergebnis nicht → selbst laufen
+        lock = LeaseLock.from_settings(LOCK_NAME)
+        piggyback = not (options.get("isin") or options.get("limit"))
+        try:
+            outcome = await lock.aacquire_or_wait(options["lock_wait"], piggyback=piggyback)
+        except LeaseTimeout as exc:
+            raise CommandError(f"update_prices läuft bereits: {exc}")
 
+        if not outcome.acquired:
+            self._adopt(outcome)
+            return
+        if outcome.waited:
+            self.stdout.write(
+                f"Sperre nach {outcome.waited:.1f}s übernommen (Lauf von {outcome.holder} ohne Ergebnis beendet oder abgelaufen)."
+            )
+
+        # Sperre verloren (übernommen oder nicht verlängerbar) → Lauf sofort abbrechen,
+        # sonst schreiben zwei Läufe gleichzeitig
+        keep_alive = asyncio.create_task(lock.keep_alive())
+        update = asyncio.create_task(self._update(options))
+        result = None
+        try:
+            await asyncio.wait({update, keep_alive}, return_when=asyncio.FIRST_COMPLETED)
+            if not update.done():
+                update.cancel()
+                await asyncio.gather(update, return_exceptions=True)
+                raise CommandError(f"update_prices abgebrochen, Sperre verloren: {keep_alive.exception()}")
+            result = update.result()
+        finally:
+            update.cancel()
+            keep_alive.cancel()
+            await lock.arelease(result)
+        stats = await sync_to_async(lock.stats)()
+        self.stdout.write(
+            f"Sperre {LOCK_NAME}: {stats['acquisitions']} Läufe, {stats['contentions']} Konflikt(e), "
+            f"Wartezeit gesamt {stats['wait_seconds_total']:.1f}s (max {stats['wait_seconds_max']:.1f}s)."
+        )
+
+    async def _update(self, options) -> Optional[dict]:
+        """One refresh run; returns the result handed to callers that waited for it."""
         now = timezone.now()
-        cutoff = now - PRICE_MAX_AGE
+        self.policy = FreshnessPolicy.from_settings()
+        isin_filter, limit = options.get("isin"), options.get("limit")
+        # Nur zählen (ein COUNT pro Tier) — die Assets selbst liest die Auswahl-Stufe seitenweise
+        held, watched, total = self._limit_counts(await self._count_due(isin_filter, now), limit)
 
-        assets_to_update = await self._get_assets_to_update(isin_filter, cutoff)
+        closed = self.policy.closed_markets(now)
+        if closed:
+            self.stdout.write(f"Börsen geschlossen: {', '.join(closed)} — dort nur Schlusskurs-Abruf.")
 
-        if not assets_to_update:
-            self.stdout.write(self.style.SUCCESS("Alle Kurse sind aktuell — nichts zu tun."))
-            return
+        if not total:
+            summary = "Alle Kurse sind aktuell — nichts zu tun."
+            self.stdout.write(self.style.SUCCESS(summary))
+            return {"total": 0, "ok": 0, "skip": 0, "error": 0, "summary": summary}
 
-        self.stdout.write(f"{len(assets_to_update)} Asset(s) werden aktualisiert...")
+        self.stdout.write(
+            f"{total} Asset(s) werden aktualisiert ({held} im Bestand, {watched} nur Watchlist; "
+            f"TTL {self.policy.describe()})..."
+        )
 
-        if dry_run:
-            for asset in assets_to_update:
+        if options["dry_run"]:
+            async for asset in self._select_assets(isin_filter, now, limit):
                 self.stdout.write(f"DRY {asset.isin} ({asset.asset_class}) würde aktualisiert")
             self.stdout.write(f"\nFertig: 0 aktualisiert, 0 übersprungen, 0 Fehler.")
             return
 
-        semaphore = asyncio.Semaphore(CONCURRENCY)
-        tasks = [
-            self._process_asset(asset, now, semaphore)
-            for asset in assets_to_update
-        ]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        concurrency = max(1, options["concurrency"])
+        batch_size = max(1, options["batch_size"])
+        self.counts = {"ok": 0, "skip": 0, "error": 0}
+        self.total = total
+        self._notify_progress()
+        self.stages = {
+            "select": StageStats("Auswahl"),
+            "fetch": StageStats("Abruf"),
+            "write": StageStats("Speichern"),
+        }
+        self.flushes = 0
+        fetch_queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=batch_size * 4)
 
-        ok = errors = skipped = 0
+        self.started = time.perf_counter()
+        # Ein Manager pro Lauf: gemeinsamer Seiten-Cache, ein FX-Snapshot, ein Verbindungspool
+        self.provider_manager = ProviderManager(async_transport=AsyncHttpTransport.from_settings())
+        try:
+            # FX-Kurse einmal vor dem Lauf laden statt im ersten Fremdwährungs-Asset
+            await self.provider_manager.ex_proxy.aensure_fresh()
+        except Exception as exc:
+            self.stdout.write(self.style.WARNING(f"FX-Kurse nicht verfügbar: {exc}"))
 
-        for asset, result in zip(assets_to_update, results):
-            if isinstance(result, Exception):
-                self.stdout.write(self.style.ERROR(f"ERR {asset.isin} — {result}"))
-                errors += 1
-                continue
-
-            status, message = result
+        async with self.provider_manager:
+            writer = asyncio.create_task(
+                self._write_stage(write_queue, now, batch_size, options["flush_seconds"])
+            )
+            workers = [
+                asyncio.create_task(self._fetch_stage(fetch_queue, write_queue))
+                for _ in range(concurrency)
+            ]
+            try:
+                await self._select_stage(fetch_queue, isin_filter, now, limit, concurrency)
+                await asyncio.gather(*workers)
+                self.stages["fetch"].finished = self._elapsed()
+                await write_queue.put(None)
+                await writer
+            finally:
+                for task in (*workers, writer):
+                    task.cancel()
+        elapsed = self._elapsed()
 
-            if status == "ok":
-                self.stdout.write(self.style.SUCCESS(message))
-                ok += 1
-            elif status == "skip":
-                self.stdout.write(self.style.WARNING(message))
-                skipped += 1
-            else:
-                self.stdout.write(self.style.ERROR(message))
-                errors += 1
+        total = self.stages["select"].items
+        summary = (
+            f"Fertig: {self.counts['ok']} aktualisiert, {self.counts['skip']} übersprungen, "
+            f"{self.counts['error']} Fehler."
+        )
+        self.stdout.write("\n" + summary)
+        self.stdout.write(
+            f"Durchsatz: {total / elapsed:.1f} ISINs/s "
+            f"({total} in {elapsed:.1f}s)"
+        )
+        self._write_stage_report(concurrency, fetch_queue.maxsize, write_queue.maxsize)
+        stats = self.provider_manager.stats()
+        self.stdout.write(
+            f"Cache: {stats['cache_hits']} Treffer, {stats['cache_misses']} Fehlzugriffe, "
+            f"{stats['quote_hits']} Quote-Treffer, {stats['shared_hits']} aus geteiltem Cache, "
+            f"{stats['cache_evictions']} verdrängt, {stats['fx_fetches']} FX-Abruf(e), "
+            f"{stats['coalesced']} zusammengelegt, {stats['negative_hits']} bekannte Fehltreffer übersprungen."
+        )
+        for host, limits in self.provider_manager.async_transport.host_limits().items():
+            self.stdout.write(
+                f"Host {host}: {limits['limit']} parallel (max {limits['peak_limit']}), "
+                f"{limits['rate']} req/s, {limits['throttled']}× gebremst."
+            )
+        fx = self.provider_manager.ex_proxy.snapshot()
+        if fx["fallbacks"]:
+            self.stdout.write(self.style.WARNING(
+                f"FX-API nicht erreichbar: letzte bekannte Kurse vom {fx['as_of']} verwendet."
+            ))
+        if stats["hedges"]:
+            self.stdout.write(
+                f"Hedging: {stats['hedges']} Zweitanfrage(n), {stats['hedge_wins']} davon schneller."
+            )
+        if stats["open_circuits"]:
+            self.stdout.write(self.style.WARNING(
+                f"Provider gesperrt (Circuit offen): {', '.join(stats['open_circuits'])}"
+            ))
+        return {"total": total, **self.counts, "summary": summary}
 
+    def _adopt(self, outcome: LeaseOutcome) -> None:
+        """Report the result of the run this call waited for instead of running again."""
+        result = outcome.result or {}
         self.stdout.write(
-            f"\nFertig: {ok} aktualisiert, {skipped} übersprungen, {errors} Fehler."
+            f"update_prices lief bereits ({outcome.holder}) — nach {outcome.waited:.1f}s dessen Ergebnis übernommen."
         )
+        self.stdout.write(result.get("summary", ""))
+        if self.progress is not None:
+            self.counts = {key: result.get(key, 0) for key in ("ok", "skip", "error")}
+            self.total = result.get("total", 0)
+            self._notify_progress()
+
+    # ------------------------------------------------------------------
+    # Pipeline-Stufen
+    # ------------------------------------------------------------------
+
+    async def _select_stage(self, fetch_queue: asyncio.Queue, isin_filter, now, limit, workers: int) -> None:
+        stage = self.stages["select"]
+        started = time.perf_counter()
+        async for asset in self._select_assets(isin_filter, now, limit):
+            stage.items += 1
+            await stage.put(fetch_queue, asset)
+        stage.busy += time.perf_counter() - started - stage.blocked
+        stage.finished = self._elapsed()
+        for _ in range(workers):
+            await fetch_queue.put(None)   # ein Stop-Signal pro Worker
+
+    async def _fetch_stage(self, fetch_queue: asyncio.Queue, write_queue: asyncio.Queue) -> None:
+        stage = self.stages["fetch"]
+        while True:
+            asset = await fetch_queue.get()
+            if asset is None:
+                return
+            started = time.perf_counter()
+            outcome = await self._process_asset(asset)
+            stage.busy += time.perf_counter() - started
+            stage.items += 1
+            await stage.put(write_queue, (asset, outcome))
 
-    async def _process_asset(self, asset: Asset, timestamp, semaphore: asyncio.Semaphore):
-        price = None
-        async with semaphore:
+    async def _write_stage(self, write_queue: asyncio.Queue, timestamp, batch_size: int, flush_seconds: float) -> None:
+        """Single writer: buffer found prices, flush by size or age of the oldest entry."""
+        loop = asyncio.get_running_loop()
+        batch: list = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
             try:
-                price = await asyncio.to_thread(
-                    self._fetch_price,
-                    asset.isin,
-                    asset.asset_class,
-                )
+                item = await asyncio.wait_for(write_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                await self._flush(batch, timestamp)
+                batch, deadline = [], None
+                continue
+            if item is None:
+                await self._flush(batch, timestamp)
+                self.stages["write"].finished = self._elapsed()
+                return
+
+            asset, (status, message, price) = item
+            if status != "ok":
+                self._report(status, message)
+                continue
+            batch.append((asset, message, price))
+            if deadline is None:
+                deadline = loop.time() + flush_seconds
+            if len(batch) >= batch_size:
+                await self._flush(batch, timestamp)
+                batch, deadline = [], None
+
+    async def _flush(self, batch: list, timestamp) -> None:
+        if not batch:
+            return
+        stage = self.stages["write"]
+        started = time.perf_counter()
+        prices = [Price(asset=asset, current_price=price, timestamp=timestamp) for asset, _, price in batch]
+        try:
+            await self._save_prices(prices)
+        except Exception as exc:
+            for asset, _, _ in batch:
+                self._report("error", f"ERR {asset.isin} — Speichern fehlgeschlagen: {exc}")
+        else:
+            for _, message, _ in batch:
+                self._report("ok", message)
+        stage.busy += time.perf_counter() - started
+        stage.items += len(batch)
+        self.flushes += 1
+
+    # ------------------------------------------------------------------
+    # Hilfsfunktionen
+    # ------------------------------------------------------------------
+
+    async def _process_asset(self, asset: Asset):
+        try:
+            price = await self._fetch_price(asset.isin, asset.asset_class)
+
+            if price is None:
+                return ("skip", f"MISS {asset.isin} — Provider lieferte keinen Preis", None)
 
-                if price is None:
-                    return ("skip", f"MISS {asset.isin} — Provider lieferte keinen Preis")
+            return ("ok", f"OK {asset.isin} — {price:.4f} EUR", price)
 
-                await self._save_price(asset, price, timestamp)
-                return ("ok", f"OK {asset.isin} — {price:.4f} EUR")
+        except Exception as exc:
+            return ("error", f"ERR {asset.isin} — {exc}", None)
 
-            except Exception as exc:
-                return ("error", f"ERR {asset.isin} — {exc}")
+    async def _fetch_price(self, isin: str, asset_class: str) -> Optional[Decimal]:
+        return await self.provider_manager.aisin2price(isin, asset_class)
 
-    def _fetch_price(self, isin: str, asset_class: str) -> Optional[Decimal]:
-        pm = ProviderManager()
-        return pm.isin2price(isin, asset_class)
+    def _report(self, status: str, message: str) -> None:
+        self.counts[status] += 1
+        self._notify_progress()
+        if status == "ok":
+            self.stdout.write(self.style.SUCCESS(message))
+        elif status == "skip":
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.ERROR(message))
+
+    def _notify_progress(self) -> None:
+        if self.progress is None:
+            return
+        try:
+            self.progress(sum(self.counts.values()), self.total, dict(self.counts))
+        except Exception as exc:
+            # Fortschrittsanzeige darf den Lauf nicht abbrechen
+            self.stderr.write(f"Fortschritt-Callback fehlgeschlagen: {exc}")
+
+    def _write_stage_report(self, workers: int, fetch_capacity: int, write_capacity: int) -> None:
+        select, fetch, write = self.stages["select"], self.stages["fetch"], self.stages["write"]
+        self.stdout.write(
+            f"Stufe {select.name}: {select.items} Asset(s), {select.busy:.2f}s Arbeit, "
+            f"fertig nach {select.finished:.1f}s, {select.blocked:.1f}s gebremst, "
+            f"Warteschlange max {select.max_depth}/{fetch_capacity}."
+        )
+        self.stdout.write(
+            f"Stufe {fetch.name}: {fetch.items} Asset(s), Ø {fetch.busy / max(fetch.items, 1):.2f}s pro Asset "
+            f"({workers} Worker), fertig nach {fetch.finished:.1f}s, {fetch.blocked:.1f}s gebremst, "
+            f"Warteschlange max {fetch.max_depth}/{write_capacity}."
+        )
+        self.stdout.write(
+            f"Stufe {write.name}: {write.items} Kurs(e) in {self.flushes} Batch(es), "
+            f"{write.busy:.2f}s Arbeit, fertig nach {write.finished:.1f}s."
+        )
+
+    def _elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    async def _select_assets(self, isin_filter, now, limit: int = None):
+        """Yield due assets in priority order, one keyset-paginated query per SELECT_CHUNK."""
+        after, remaining = None, limit
+        while remaining is None or remaining > 0:
+            size = SELECT_CHUNK if remaining is None else min(SELECT_CHUNK, remaining)
+            page = await self._get_assets_to_update(isin_filter, now, after, size)
+            for asset in page:
+                yield asset
+            if len(page) < size:
+                return
+            after = self.policy.page_key(page[-1])
+            if remaining is not None:
+                remaining -= len(page)
 
     @sync_to_async
-    def _get_assets_to_update(self, isin_filter, cutoff):
-        qs = Asset.objects.all()
-        if isin_filter:
-            qs = qs.filter(isin=isin_filter.upper())
-
-        return [
-            asset for asset in qs
-            if self._needs_update(asset, cutoff)
-            and AssetClass.is_valid(asset.asset_class)
-        ]
-
-    def _needs_update(self, asset: Asset, cutoff) -> bool:
-        if asset.current_price is None:
-            return True
-        if asset.current_price_timestamp is None:
-            return True
-        return asset.current_price_timestamp < cutoff
+    def _get_assets_to_update(self, isin_filter, now, after, size: int) -> list[Asset]:
+        """One page of due assets — selected in SQL, only the needed columns."""
+        return self.policy.due_page(now, after=after, size=size, isin=isin_filter)
 
     @sync_to_async
-    def _save_price(self, asset: Asset, price: Decimal, timestamp) -> None:
-        Price.objects.create(
-            asset=asset,
-            current_price=price,
-            timestamp=timestamp,
-        )
+    def _count_due(self, isin_filter, now) -> dict:
+        return self.policy.due_counts(now, isin=isin_filter)
+
+    @staticmethod
+    def _limit_counts(counts: dict, limit: int = None) -> tuple[int, int, int]:
+        """(held, watched, total) of the assets this run will select — tiers are taken in order."""
+        held, watched, other = counts[TIER_HELD], counts[TIER_WATCHED], counts[TIER_OTHER]
+        if limit:
+            held = min(held, limit)
+            watched = min(watched, limit - held)
+            other = min(other, limit - held - watched)
+        return held, watched, held + watched + other
+
+    @sync_to_async
+    def _save_prices(self, prices: list[Price]):
+        return Price.objects.ingest(prices)
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.26 on 2026-10-18 11:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fintech', '0007_alter_asset_asset_class'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderMiss',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(help_text='Provider-ID (z.B. com_stock, alle, just_etf)', max_length=30)),
+                ('isin', models.CharField(max_length=12, verbose_name='ISIN')),
+                ('kind', models.CharField(choices=[('absent', 'Definitiv unbekannt'), ('transient', 'Vorübergehend nicht gefunden')], default='absent', max_length=10)),
+                ('reason', models.CharField(blank=True, help_text='Letzte Fehlermeldung des Providers', max_length=200)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('expires_at', models.DateTimeField(db_index=True, help_text='Danach wird der Provider wieder gefragt')),
+            ],
+            options={
+                'verbose_name': 'Provider-Fehltreffer',
+                'verbose_name_plural': 'Provider-Fehltreffer',
+                'ordering': ['provider', 'isin'],
+                'unique_together': {('provider', 'isin')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.26 on 2026-10-18 11:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fintech', '0008_providermiss'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Handelstag der EZB-Veröffentlichung')),
+                ('currency', models.CharField(help_text='ISO-Code (USD, CHF, GBP, ...); GBp wird aus GBP abgeleitet', max_length=3)),
+                ('rate', models.DecimalField(decimal_places=8, help_text='Einheiten der Währung pro 1 EUR', max_digits=18)),
+            ],
+            options={
+                'verbose_name': 'Wechselkurs',
+                'verbose_name_plural': 'Wechselkurse',
+                'ordering': ['-date', 'currency'],
+                'indexes': [models.Index(fields=['currency', 'date'], name='fintech_exc_currenc_23fd1c_idx')],
+                'unique_together': {('date', 'currency')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.26 on 2026-10-18 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fintech', '0009_exchangerate'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['current_price_timestamp'], name='fintech_ass_current_e782bb_idx'),
+        ),
+    ]
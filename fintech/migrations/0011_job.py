@@ -0,0 +1,43 @@
+# Generated by Django 4.2.26 on 2026-10-18 11:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fintech', '0010_asset_current_price_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_type', models.CharField(help_text='Registrierter Job-Typ (z.B. update_prices, import_transactions)', max_length=50)),
+                ('payload', models.JSONField(blank=True, default=dict, help_text='Argumente für den Handler')),
+                ('dedupe_key', models.CharField(blank=True, help_text='Solange ein Job mit diesem Schlüssel offen ist, wird kein zweiter angelegt', max_length=100, null=True)),
+                ('status', models.CharField(choices=[('queued', 'Wartend'), ('running', 'Läuft'), ('done', 'Erledigt'), ('failed', 'Fehlgeschlagen')], default='queued', max_length=10)),
+                ('priority', models.SmallIntegerField(default=0, help_text='Kleinere Werte zuerst')),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, help_text='Frühester Start (Backoff nach Fehlversuch)')),
+                ('locked_by', models.CharField(blank=True, help_text='Worker, der den Job gerade ausführt', max_length=100)),
+                ('heartbeat_at', models.DateTimeField(blank=True, help_text='Letztes Lebenszeichen des Workers; veraltet → Job wird neu eingeplant', null=True)),
+                ('progress', models.JSONField(blank=True, null=True)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Job',
+                'verbose_name_plural': 'Jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='fintech_job_status_2cfa27_idx'), models.Index(fields=['job_type', 'status'], name='fintech_job_job_typ_e3e06b_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('dedupe_key__isnull', False), ('status__in', ['queued', 'running'])), fields=('dedupe_key',), name='fintech_job_open_dedupe_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.26 on 2026-10-18 11:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fintech', '0011_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lease',
+            fields=[
+                ('name', models.CharField(help_text='Name der Sperre, z.B. update_prices', max_length=100, primary_key=True, serialize=False)),
+                ('holder', models.CharField(blank=True, help_text='Aktueller Inhaber (Host:PID:Lauf); leer = frei', max_length=100)),
+                ('generation', models.PositiveIntegerField(default=0, help_text='Zählt jede Übernahme der Sperre')),
+                ('acquired_at', models.DateTimeField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField(blank=True, help_text='Ohne Heartbeat bis dahin gilt die Sperre als verwaist', null=True)),
+                ('released_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_generation', models.PositiveIntegerField(default=0, help_text='Generation des letzten erfolgreich beendeten Laufs')),
+                ('last_result', models.JSONField(blank=True, help_text='Ergebnis des letzten Laufs — wartende Aufrufer übernehmen es', null=True)),
+                ('acquisitions', models.PositiveIntegerField(default=0)),
+                ('contentions', models.PositiveIntegerField(default=0, help_text='Aufrufe, die auf einen laufenden Inhaber treffen')),
+                ('wait_seconds_total', models.FloatField(default=0)),
+                ('wait_seconds_max', models.FloatField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Sperre',
+                'verbose_name_plural': 'Sperren',
+            },
+        ),
+    ]
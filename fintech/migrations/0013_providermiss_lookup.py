@@ -0,0 +1,36 @@
+# Generated by Django 4.2.26 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+def clear_misses(apps, schema_editor):
+    # Bisherige Einträge sagen nicht, ob Kurs oder WKN fehlte → verwerfen, Provider wird neu gefragt
+    apps.get_model('fintech', 'ProviderMiss').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fintech', '0012_lease'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_misses, migrations.RunPython.noop),
+        migrations.AlterModelOptions(
+            name='providermiss',
+            options={'ordering': ['provider', 'lookup', 'isin'], 'verbose_name': 'Provider-Fehltreffer', 'verbose_name_plural': 'Provider-Fehltreffer'},
+        ),
+        migrations.AlterUniqueTogether(
+            name='providermiss',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='providermiss',
+            name='lookup',
+            field=models.CharField(choices=[('price', 'Kurs'), ('wkn', 'WKN')], default='price', help_text='Abgefragtes Feld — ein fehlender Kurs sperrt nicht die WKN-Abfrage', max_length=10),
+        ),
+        migrations.AlterUniqueTogether(
+            name='providermiss',
+            unique_together={('provider', 'lookup', 'isin')},
+        ),
+    ]
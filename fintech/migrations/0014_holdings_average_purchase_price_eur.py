@@ -0,0 +1,20 @@
+# Generated by Django 4.2.26 on 2026-10-18 12:04
+
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fintech', '0013_providermiss_lookup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='holdings',
+            name='average_purchase_price_eur',
+            field=models.DecimalField(blank=True, decimal_places=4, help_text='Durchschnittlicher Einkaufspreis in EUR zum Kurs der Kauftage (CSV-Import)', max_digits=12, null=True, validators=[django.core.validators.MinValueValidator(Decimal('0.00'))]),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.26 on 2026-10-18 12:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fintech', '0014_holdings_average_purchase_price_eur'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Dateiname beim Hochladen', max_length=255)),
+                ('content', models.TextField(help_text='Dekodierter Inhalt der CSV-Datei')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Import-Datei',
+                'verbose_name_plural': 'Import-Dateien',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
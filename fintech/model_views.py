@@ -1,4 +1,4 @@
-from django.db.models import F, Sum, ExpressionWrapper, DecimalField, Value
+from django.db.models import Case, F, Q, Sum, ExpressionWrapper, DecimalField, Value, When
 from django.db.models.functions import Coalesce, NullIf
 from django.db import models
 from decimal import Decimal
@@ -10,16 +10,27 @@ D = DecimalField(max_digits=20, decimal_places=4)  # shorthand
 class PortfolioSummaryQuerySet(models.QuerySet):
 
     def summary(self):
+        # current_price (update_prices) ist in EUR. Einstand in EUR zum Kurs der Kauftage
+        # (CSV-Import, siehe csv_import); ohne diesen Wert unumgerechnet in Asset-Währung —
+        # nie zum heutigen Kurs, der Kauf fand zum damaligen statt
+        purchase_price_eur = Case(
+            When(
+                Q(currency='EUR') | Q(holdings__average_purchase_price_eur__isnull=True),
+                then=F('holdings__average_purchase_price'),
+            ),
+            default=F('holdings__average_purchase_price_eur'),
+            output_field=D,
+        )
         # effective_price: current_price wenn vorhanden, sonst average_purchase_price
         # Coalesce löst das Aggregat-in-Aggregat Problem sauber auf SQL-Ebene
         effective_price = Coalesce(
             F('current_price'),
-            F('holdings__average_purchase_price'),
+            purchase_price_eur,
             output_field=D,
         )
 
         cost_basis = ExpressionWrapper(
-            F('holdings__quantity') * F('holdings__average_purchase_price'),
+            F('holdings__quantity') * purchase_price_eur,
             output_field=D,
         )
         market_value = ExpressionWrapper(
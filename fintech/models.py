@@ -1,4 +1,6 @@
-from django.db import models
+from dataclasses import dataclass
+from django.db import IntegrityError, models, transaction
+from django.db.models import OuterRef, Q, Subquery
 from decimal import Decimal
 import re
 from django.core.validators import MinValueValidator
@@ -94,6 +96,7 @@ class Asset(models.Model):
         indexes = [
             models.Index(fields=['asset_class']),
             models.Index(fields=['symbol']),
+            models.Index(fields=['current_price_timestamp']),  # Auswahl fälliger Assets (update_prices)
         ]
 
     def __str__(self):
@@ -126,6 +129,15 @@ class Holdings(models.Model):
         validators=[MinValueValidator(Decimal('0.00'))],
         help_text="Durchschnittlicher Einkaufspreis"
     )
+
+    average_purchase_price_eur = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(Decimal('0.00'))],
+        help_text="Durchschnittlicher Einkaufspreis in EUR zum Kurs der Kauftage (CSV-Import)"
+    )
     
     category = models.IntegerField(
         choices=CategoryClass.choices,
@@ -177,6 +189,65 @@ class Holdings(models.Model):
             return market_value - invested
         return None
 
+
+@dataclass
+class IngestResult:
+    created: int = 0
+    duplicates: int = 0        # (asset, timestamp) schon vorhanden oder doppelt im Batch
+    assets_updated: int = 0
+
+
+class PriceQuerySet(models.QuerySet):
+
+    INGEST_BATCH_SIZE = 500
+
+    def ingest(self, prices) -> IngestResult:
+        """Store many unsaved Price objects with a fixed number of statements.
+
+        Rows whose (asset, timestamp) already exists are skipped. Afterwards
+        Asset.current_price/current_price_timestamp of all touched assets are moved
+        to their newest price in one UPDATE — the set-based version of Price.save().
+        """
+        result = IngestResult()
+        prices = list(prices)
+        unique = {(price.asset_id, price.timestamp): price for price in prices}   # letzter gewinnt
+        result.duplicates = len(prices) - len(unique)
+        if not unique:
+            return result
+
+        asset_ids = {asset_id for asset_id, _ in unique}
+        for attempt in range(2):
+            existing = set(
+                self.filter(asset_id__in=asset_ids, timestamp__in={ts for _, ts in unique})
+                .values_list("asset_id", "timestamp")
+            )
+            new = [price for key, price in unique.items() if key not in existing]
+            try:
+                with transaction.atomic():
+                    self.bulk_create(new, batch_size=self.INGEST_BATCH_SIZE)
+                    result.assets_updated = self._refresh_current_prices(asset_ids)
+                break
+            except IntegrityError:
+                # Paralleler Lauf hat dazwischen dieselben Zeitpunkte gespeichert → neu abgleichen
+                if attempt:
+                    raise
+        result.created = len(new)
+        result.duplicates += len(unique) - len(new)
+        return result
+
+    def _refresh_current_prices(self, asset_ids) -> int:
+        latest = Price.objects.filter(asset=OuterRef("pk")).order_by("-timestamp")
+        latest_timestamp = Subquery(latest.values("timestamp")[:1])
+        return (
+            Asset.objects
+            .filter(pk__in=asset_ids)
+            .filter(Q(current_price_timestamp__isnull=True) | Q(current_price_timestamp__lte=latest_timestamp))
+            .update(
+                current_price=Subquery(latest.values("current_price")[:1]),
+                current_price_timestamp=latest_timestamp,
+            )
+        )
+
     
 class Price(models.Model):
     """
@@ -197,7 +268,10 @@ class Price(models.Model):
         help_text="Kurs in Währung des Assets zum Zeitpunkt ..."
     )
 
+    objects = PriceQuerySet.as_manager()
+
     def save(self, *args, **kwargs):
+        # Einzelner Kurs; für viele Kurse Price.objects.ingest() (ohne Rundreisen pro Zeile)
         super().save(*args, **kwargs)
         # Prüfen, ob dies der neueste Kurs ist
         latest_price = self.asset.prices.first() # Dank ordering='-timestamp' ist das der neueste
@@ -223,6 +297,246 @@ class Price(models.Model):
     def __str__(self):
         return f"{self.asset.symbol}: {self.current_price} ({self.timestamp:%Y-%m-%d %H:%M})"
 
+class ProviderMiss(models.Model):
+    """
+    Negativ-Cache: ISIN, die ein Provider nicht kennt (überlebt Neustarts)
+    """
+    KIND_ABSENT = "absent"
+    KIND_TRANSIENT = "transient"
+    KIND_CHOICES = [
+        (KIND_ABSENT, "Definitiv unbekannt"),
+        (KIND_TRANSIENT, "Vorübergehend nicht gefunden"),
+    ]
+    LOOKUP_PRICE = "price"
+    LOOKUP_WKN = "wkn"
+    LOOKUP_CHOICES = [
+        (LOOKUP_PRICE, "Kurs"),
+        (LOOKUP_WKN, "WKN"),
+    ]
+
+    provider = models.CharField(
+        max_length=30,
+        help_text="Provider-ID (z.B. com_stock, alle, just_etf)"
+    )
+    lookup = models.CharField(
+        max_length=10,
+        choices=LOOKUP_CHOICES,
+        default=LOOKUP_PRICE,
+        help_text="Abgefragtes Feld — ein fehlender Kurs sperrt nicht die WKN-Abfrage"
+    )
+    isin = models.CharField(
+        max_length=12,
+        verbose_name="ISIN",
+    )
+    kind = models.CharField(
+        max_length=10,
+        choices=KIND_CHOICES,
+        default=KIND_ABSENT,
+    )
+    reason = models.CharField(
+        max_length=200,
+        blank=True,
+        help_text="Letzte Fehlermeldung des Providers"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(
+        db_index=True,
+        help_text="Danach wird der Provider wieder gefragt"
+    )
+
+    class Meta:
+        verbose_name = "Provider-Fehltreffer"
+        verbose_name_plural = "Provider-Fehltreffer"
+        unique_together = ['provider', 'lookup', 'isin']
+        ordering = ['provider', 'lookup', 'isin']
+
+    def __str__(self):
+        return f"{self.provider}/{self.lookup}: {self.isin} ({self.kind} bis {self.expires_at:%Y-%m-%d %H:%M})"
+
+
+class ExchangeRate(models.Model):
+    """
+    Historischer EZB-Referenzkurs (Frankfurter): 1 EUR = rate Einheiten der Währung
+    """
+    date = models.DateField(
+        help_text="Handelstag der EZB-Veröffentlichung"
+    )
+    currency = models.CharField(
+        max_length=3,
+        help_text="ISO-Code (USD, CHF, GBP, ...); GBp wird aus GBP abgeleitet"
+    )
+    rate = models.DecimalField(
+        max_digits=18,
+        decimal_places=8,
+        help_text="Einheiten der Währung pro 1 EUR"
+    )
+
+    class Meta:
+        verbose_name = "Wechselkurs"
+        verbose_name_plural = "Wechselkurse"
+        unique_together = ['date', 'currency']
+        ordering = ['-date', 'currency']
+        indexes = [
+            models.Index(fields=['currency', 'date']),  # Zeitreihe einer Währung
+        ]
+
+    def __str__(self):
+        return f"{self.date:%Y-%m-%d} EUR/{self.currency} = {self.rate}"
+
+
+class Job(models.Model):
+    """
+    Hintergrund-Job für den run_worker-Prozess (die DB ist die Queue, kein Broker)
+    """
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Wartend"),
+        (STATUS_RUNNING, "Läuft"),
+        (STATUS_DONE, "Erledigt"),
+        (STATUS_FAILED, "Fehlgeschlagen"),
+    ]
+    OPEN_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+    job_type = models.CharField(
+        max_length=50,
+        help_text="Registrierter Job-Typ (z.B. update_prices, import_transactions)"
+    )
+    payload = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Argumente für den Handler"
+    )
+    dedupe_key = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        help_text="Solange ein Job mit diesem Schlüssel offen ist, wird kein zweiter angelegt"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_QUEUED,
+    )
+    priority = models.SmallIntegerField(
+        default=0,
+        help_text="Kleinere Werte zuerst"
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        help_text="Frühester Start (Backoff nach Fehlversuch)"
+    )
+    locked_by = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Worker, der den Job gerade ausführt"
+    )
+    heartbeat_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Letztes Lebenszeichen des Workers; veraltet → Job wird neu eingeplant"
+    )
+    progress = models.JSONField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Job"
+        verbose_name_plural = "Jobs"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),    # Claim: fällige wartende Jobs
+            models.Index(fields=['job_type', 'status']),     # Limit pro Job-Typ
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=Q(dedupe_key__isnull=False, status__in=['queued', 'running']),
+                name='fintech_job_open_dedupe_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.job_type} #{self.pk} ({self.status})"
+
+
+class ImportUpload(models.Model):
+    """
+    Hochgeladene CSV-Datei für einen import_transactions-Job (der Job-Payload enthält nur die ID)
+    """
+    name = models.CharField(
+        max_length=255,
+        help_text="Dateiname beim Hochladen"
+    )
+    content = models.TextField(help_text="Dekodierter Inhalt der CSV-Datei")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Import-Datei"
+        verbose_name_plural = "Import-Dateien"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}"
+
+
+class Lease(models.Model):
+    """
+    Prozessübergreifende Sperre mit Ablaufzeit (z.B. für update_prices)
+    """
+    name = models.CharField(
+        max_length=100,
+        primary_key=True,
+        help_text="Name der Sperre, z.B. update_prices"
+    )
+    holder = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Aktueller Inhaber (Host:PID:Lauf); leer = frei"
+    )
+    generation = models.PositiveIntegerField(
+        default=0,
+        help_text="Zählt jede Übernahme der Sperre"
+    )
+    acquired_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Ohne Heartbeat bis dahin gilt die Sperre als verwaist"
+    )
+    released_at = models.DateTimeField(null=True, blank=True)
+    finished_generation = models.PositiveIntegerField(
+        default=0,
+        help_text="Generation des letzten erfolgreich beendeten Laufs"
+    )
+    last_result = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Ergebnis des letzten Laufs — wartende Aufrufer übernehmen es"
+    )
+    acquisitions = models.PositiveIntegerField(default=0)
+    contentions = models.PositiveIntegerField(
+        default=0,
+        help_text="Aufrufe, die auf einen laufenden Inhaber treffen"
+    )
+    wait_seconds_total = models.FloatField(default=0)
+    wait_seconds_max = models.FloatField(default=0)
+
+    class Meta:
+        verbose_name = "Sperre"
+        verbose_name_plural = "Sperren"
+
+    def __str__(self):
+        return f"{self.name}: {self.holder or 'frei'}"
+
+
 class Watchlist(models.Model):
     """
     Benutzer-Watchlist für Assets
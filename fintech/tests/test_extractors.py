@@ -0,0 +1,114 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+from django.http import Http404
+from django.test import SimpleTestCase
+
+from fintech.apis.services.alleaktien import AlleaktienRequest
+from fintech.apis.services.comdirect import ComdirectRequest
+from fintech.apis.services.http_transport import _PrefixBuffer
+from fintech.apis.services.justetf import JustEtfRequest
+from fintech.apis.services.page_cache import PageCache, QuoteCache
+from fintech.apis.services.request_lib import KeyNotFoundError, KeyNotFoundWarning, meta_content
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def fixture(name: str) -> bytes:
+    return (FIXTURES / name).read_bytes()
+
+
+class FixtureTransport:
+    """Serves one saved page for every URL and records what was requested."""
+
+    def __init__(self, body: bytes, status_code: int = 200):
+        self.body = body
+        self.status_code = status_code
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append(("get", url))
+        return self._response(self.body, complete=True)
+
+    def get_prefix(self, url, until=None, max_bytes=1024 * 1024):
+        self.calls.append(("prefix", url))
+        buffer = _PrefixBuffer(until, max_bytes)
+        buffer.feed(self.body)
+        return self._response(bytes(buffer.data), complete=not buffer.stopped_early)
+
+    def _response(self, content: bytes, complete: bool):
+        return SimpleNamespace(
+            status_code=self.status_code, content=content, complete=complete, raise_for_status=lambda: None
+        )
+
+
+def provider(cls, page: str, status_code: int = 200):
+    transport = FixtureTransport(fixture(page), status_code)
+    request = cls(
+        "https://provider.test/{isin}", PageCache(), cls.__name__,
+        transport=transport, async_transport=object(), quotes=QuoteCache(),
+    )
+    return request, transport
+
+
+class ComdirectExtractorTests(SimpleTestCase):
+
+    def test_price_and_wkn_come_from_the_head(self):
+        request, transport = provider(ComdirectRequest, "comdirect_stock.html")
+        self.assertEqual(request.isin2price("DE0007236101"), ("228,35", "EUR"))
+        self.assertEqual(request.isin2wkn("DE0007236101"), "723610")
+        # Ein Präfix-Abruf bis </head> reicht, der Rest kommt aus dem QuoteCache
+        self.assertEqual(transport.calls, [("prefix", "https://provider.test/DE0007236101")])
+
+    def test_wkn_missing_in_head_loads_the_full_page(self):
+        request, transport = provider(ComdirectRequest, "comdirect_wkn_in_body.html")
+        self.assertEqual(request.isin2price("US0378331005"), ("201,5", "USD"))
+        self.assertEqual(request.isin2wkn("US0378331005"), "865985")
+        self.assertEqual([kind for kind, _ in transport.calls], ["prefix", "get"])
+
+    def test_not_found_page_raises_http404(self):
+        request, _ = provider(ComdirectRequest, "comdirect_not_found.html")
+        with self.assertRaises(Http404):
+            request.isin2price("DE0000000000")
+
+    def test_error_page_raises_key_not_found_error(self):
+        request, _ = provider(ComdirectRequest, "comdirect_error.html")
+        with self.assertRaises(KeyNotFoundError):
+            request.isin2price("DE0000000000")
+
+    def test_provider_404_is_a_fallback_warning(self):
+        request, _ = provider(ComdirectRequest, "comdirect_not_found.html", status_code=404)
+        with self.assertRaises(KeyNotFoundWarning):
+            request.isin2price("DE0000000000")
+
+
+class AlleaktienExtractorTests(SimpleTestCase):
+
+    def test_get_infos(self):
+        request, _ = provider(AlleaktienRequest, "alleaktien_stock.html")
+        self.assertEqual(request.get_infos("DE0007236101"), ("723610", "228,35", "€", "SIE"))
+
+    def test_page_without_quote_raises_warning(self):
+        request, _ = provider(AlleaktienRequest, "alleaktien_no_quote.html")
+        with self.assertRaises(KeyNotFoundWarning):
+            request.isin2price("DE0000000000")
+
+
+class JustEtfExtractorTests(SimpleTestCase):
+
+    def test_wkn(self):
+        request, _ = provider(JustEtfRequest, "justetf_etf.html")
+        self.assertEqual(request.isin2wkn("IE00B4L5Y983"), "A0RPWH")
+
+    def test_page_without_wkn_raises_warning(self):
+        request, _ = provider(JustEtfRequest, "alleaktien_no_quote.html")
+        with self.assertRaises(KeyNotFoundWarning):
+            request.isin2wkn("IE0000000000")
+
+
+class MetaContentTests(SimpleTestCase):
+
+    def test_attribute_order_and_quotes_are_free(self):
+        text = """<meta content='a &amp; b' name="twitter:title"><meta name="other" content="x">"""
+        self.assertEqual(meta_content(text, "name", "twitter:title"), "a & b")
+        self.assertIsNone(meta_content(text, "name", "missing"))
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone as tz
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from fintech.apis.services.freshness import TIER_HELD, TIER_OTHER, TIER_WATCHED, FreshnessPolicy
+from fintech.models import Asset, Holdings, Watchlist, WatchlistEntry
+
+NOW = datetime(2026, 10, 16, 12, 0, tzinfo=tz.utc)
+
+
+class FreshnessPaginationTests(TestCase):
+    """Keyset pages over (tier, current_price_timestamp NULLS FIRST, isin), without a calendar."""
+
+    def setUp(self):
+        self.policy = FreshnessPolicy(ttl_minutes={"CRYPTO": 5}, default_ttl_minutes=60)
+        watchlist = Watchlist.objects.create(name="Beobachten", user=User.objects.create(username="anna"))
+        stale = NOW - timedelta(hours=3)
+        older = NOW - timedelta(hours=5)
+        # Pro Tier: NULL-Zeitstempel, gleiche Zeitstempel (ISIN entscheidet) und ältere Kurse
+        layout = {
+            TIER_HELD: [None, None, stale, stale, older],
+            TIER_WATCHED: [None, stale, stale],
+            TIER_OTHER: [stale, None, older, stale],
+        }
+        for tier, timestamps in layout.items():
+            for n, timestamp in enumerate(timestamps):
+                asset = Asset.objects.create(
+                    isin=f"DE{tier}{n:09d}", name=f"Asset {tier}/{n}", asset_class="STOCK",
+                    current_price=Decimal("10") if timestamp else None, current_price_timestamp=timestamp,
+                )
+                if tier == TIER_HELD:
+                    Holdings.objects.create(asset=asset, quantity=Decimal("1"))
+                elif tier == TIER_WATCHED:
+                    WatchlistEntry.objects.create(watchlist=watchlist, asset=asset, price_at_add=Decimal("10"))
+        # Nicht fällig: frischer Kurs
+        Asset.objects.create(isin="DE9000000001", name="Fresh", asset_class="STOCK",
+                             current_price=Decimal("1"), current_price_timestamp=NOW - timedelta(minutes=5))
+        # Bestand mit Menge 0 zählt nicht als "gehalten"
+        sold = Asset.objects.create(isin="DE9000000002", name="Sold", asset_class="STOCK",
+                                    current_price=Decimal("1"), current_price_timestamp=stale)
+        Holdings.objects.create(asset=sold, quantity=Decimal("0"))
+        self.expected = [asset.isin for asset in self.policy.due_assets(NOW)]
+
+    def walk(self, size: int) -> list[str]:
+        seen, after = [], None
+        while True:
+            page = self.policy.due_page(NOW, after=after, size=size)
+            if not page:
+                return seen
+            seen += [asset.isin for asset in page]
+            after = FreshnessPolicy.page_key(page[-1])
+
+    def test_order_is_tier_then_stalest_then_isin(self):
+        keys = [FreshnessPolicy.page_key(asset) for asset in self.policy.due_assets(NOW)]
+        self.assertEqual(len(keys), 13)
+        self.assertEqual([tier for tier, _, _ in keys], [0] * 5 + [1] * 3 + [2] * 5)
+        held = keys[:5]
+        self.assertEqual([timestamp for _, timestamp, _ in held[:2]], [None, None])
+        self.assertEqual(held[2][1], NOW - timedelta(hours=5))
+
+    def test_pages_cover_every_due_asset_once_in_order(self):
+        for size in (1, 2, 3, 5, 50):
+            with self.subTest(size=size):
+                self.assertEqual(self.walk(size), self.expected)
+
+    def test_due_counts_per_tier(self):
+        self.assertEqual(self.policy.due_counts(NOW), {TIER_HELD: 5, TIER_WATCHED: 3, TIER_OTHER: 5})
+
+    def test_ttl_per_asset_class(self):
+        coin = Asset.objects.create(isin="XC0000000001", name="Coin", asset_class="CRYPTO",
+                                    current_price=Decimal("1"), current_price_timestamp=NOW - timedelta(minutes=10))
+        self.assertTrue(self.policy.is_due(coin, NOW))
+        self.assertIn(coin.isin, [asset.isin for asset in self.policy.due_assets(NOW)])
+        self.assertNotIn("DE9000000001", self.expected)
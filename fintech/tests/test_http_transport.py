@@ -0,0 +1,112 @@
+import asyncio
+
+import httpx
+from django.test import SimpleTestCase
+
+from fintech.apis.services.http_transport import AsyncHttpTransport, HttpTransport, _PrefixBuffer
+from fintech.apis.services.request_lib import HEAD_END_RE
+
+PAGE = b"<html><head><title>x</title></head><body>" + b"x" * 1000 + b"</body></html>"
+HEAD = b"<html><head><title>x</title></head>"
+
+
+def chunks(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class StreamedResponse:
+    """requests.Response stand-in: serves *body* in small chunks and counts what was read."""
+
+    def __init__(self, body: bytes, status_code: int = 200, chunk_size: int = 7):
+        self.body = body
+        self.status_code = status_code
+        self.chunk_size = chunk_size
+        self.read = 0
+        self.closed = False
+
+    @property
+    def content(self) -> bytes:
+        return self.body
+
+    def iter_content(self, chunk_size=None):
+        for chunk in chunks(self.body, self.chunk_size):
+            self.read += len(chunk)
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+    def raise_for_status(self):
+        pass
+
+
+class PrefixBufferTests(SimpleTestCase):
+
+    def test_stops_at_head_end_split_across_chunks(self):
+        buffer = _PrefixBuffer(HEAD_END_RE, max_bytes=10_000)
+        stopped = False
+        for chunk in [PAGE[:30], PAGE[30:33], PAGE[33:]]:   # "…</" | "hea" | "d>…"
+            stopped = buffer.feed(chunk)
+            if stopped:
+                break
+        self.assertTrue(stopped)
+        self.assertTrue(buffer.stopped_early)
+        self.assertEqual(bytes(buffer.data), HEAD)
+
+    def test_head_end_is_case_insensitive_and_allows_whitespace(self):
+        buffer = _PrefixBuffer(HEAD_END_RE, max_bytes=10_000)
+        self.assertTrue(buffer.feed(b"<HTML><HEAD></HEAD ><BODY>"))
+        self.assertEqual(bytes(buffer.data), b"<HTML><HEAD></HEAD >")
+
+    def test_byte_budget_cuts_without_marker(self):
+        buffer = _PrefixBuffer(HEAD_END_RE, max_bytes=20)
+        self.assertFalse(buffer.feed(b"<html><head>"))
+        self.assertTrue(buffer.feed(b"x" * 50))
+        self.assertEqual(len(buffer.data), 20)
+        self.assertTrue(buffer.stopped_early)
+
+    def test_whole_body_without_marker_is_complete(self):
+        buffer = _PrefixBuffer(HEAD_END_RE, max_bytes=10_000)
+        self.assertFalse(buffer.feed(b"<html><body>no head</body></html>"))
+        self.assertFalse(buffer.stopped_early)
+
+
+class GetPrefixTests(SimpleTestCase):
+
+    def transport(self, response: StreamedResponse) -> HttpTransport:
+        transport = HttpTransport()
+        transport.session.get = lambda url, **kwargs: response
+        return transport
+
+    def test_reads_only_up_to_head_end_and_closes(self):
+        response = StreamedResponse(PAGE)
+        prefix = self.transport(response).get_prefix("https://provider.test/x", until=HEAD_END_RE)
+        self.assertEqual(prefix.content, HEAD)
+        self.assertFalse(prefix.complete)
+        self.assertLess(response.read, len(PAGE))
+        self.assertTrue(response.closed)
+
+    def test_error_status_returns_the_full_body(self):
+        response = StreamedResponse(b"not found", status_code=404)
+        prefix = self.transport(response).get_prefix("https://provider.test/x", until=HEAD_END_RE)
+        self.assertEqual((prefix.status_code, prefix.content, prefix.complete), (404, b"not found", True))
+
+    def test_async_reads_only_up_to_head_end(self):
+        async def body():
+            for chunk in chunks(PAGE, 7):
+                yield chunk
+
+        transport = AsyncHttpTransport()
+        transport._client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body()))
+        )
+
+        async def fetch():
+            try:
+                return await transport.get_prefix("https://provider.test/x", until=HEAD_END_RE)
+            finally:
+                await transport.aclose()
+
+        prefix = asyncio.run(fetch())
+        self.assertEqual(prefix.content, HEAD)
+        self.assertFalse(prefix.complete)
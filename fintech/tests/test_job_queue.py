@@ -0,0 +1,154 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from fintech.apis.services import job_queue
+from fintech.apis.services.job_queue import (
+    JobContext, claim, enqueue, execute, heartbeat, job_type, purge_finished, reclaim_expired,
+)
+from fintech.models import ImportUpload, Job
+
+
+def _ok(ctx, value=None):
+    ctx.progress(done=1)
+    return {"value": value}
+
+
+def _boom(ctx):
+    raise RuntimeError("kaputt")
+
+
+@override_settings(FINTECH_JOB_BACKOFF_SECONDS=10, FINTECH_JOB_MAX_BACKOFF_SECONDS=15)
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        job_type("test_ok", concurrency=1)(_ok)
+        job_type("test_parallel", concurrency=2)(_ok)
+        job_type("test_fail", max_attempts=3)(_boom)
+        self.addCleanup(lambda: [job_queue._registry.pop(name) for name in ("test_ok", "test_parallel", "test_fail")])
+
+    def claim_test_job(self, worker="w1"):
+        return claim(worker, job_types=["test_ok", "test_parallel", "test_fail"])
+
+    def test_enqueue_unknown_type(self):
+        with self.assertRaises(ValueError):
+            enqueue("no_such_job")
+
+    def test_enqueue_dedupes_open_jobs(self):
+        first = enqueue("test_ok", dedupe_key="k")
+        self.assertEqual(enqueue("test_ok", dedupe_key="k").pk, first.pk)
+        Job.objects.filter(pk=first.pk).update(status=Job.STATUS_DONE)
+        self.assertNotEqual(enqueue("test_ok", dedupe_key="k").pk, first.pk)
+
+    def test_claim_and_execute(self):
+        job = enqueue("test_ok", {"value": 42})
+        claimed = self.claim_test_job()
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts, claimed.locked_by),
+                         (job.pk, Job.STATUS_RUNNING, 1, "w1"))
+        execute(claimed)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.progress, job.locked_by), (Job.STATUS_DONE, {"value": 42}, {"done": 1}, ""))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_claim_respects_concurrency_per_type(self):
+        enqueue("test_ok"), enqueue("test_ok")
+        self.assertIsNotNone(self.claim_test_job("w1"))
+        self.assertIsNone(self.claim_test_job("w2"))
+        enqueue("test_parallel"), enqueue("test_parallel"), enqueue("test_parallel")
+        self.assertEqual(self.claim_test_job("w2").job_type, "test_parallel")
+        self.assertEqual(self.claim_test_job("w3").job_type, "test_parallel")
+        self.assertIsNone(self.claim_test_job("w4"))
+
+    def test_claim_order_and_run_after(self):
+        enqueue("test_ok", {"value": "later"}, delay_seconds=60)
+        low = enqueue("test_parallel", {"value": "low"}, priority=5)
+        high = enqueue("test_parallel", {"value": "high"}, priority=-1)
+        self.assertEqual(self.claim_test_job().pk, high.pk)
+        self.assertEqual(self.claim_test_job().pk, low.pk)
+        self.assertIsNone(self.claim_test_job())
+
+    def test_failure_backs_off_then_fails(self):
+        job = enqueue("test_fail")
+        expected_delays = [10, 15]   # 10 · 2^(n-1), gedeckelt bei 15
+        for attempt in range(1, 4):
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            claimed = self.claim_test_job()
+            before = timezone.now()
+            execute(claimed)
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, attempt)
+            self.assertIn("RuntimeError: kaputt", job.error)
+            if attempt < 3:
+                self.assertEqual(job.status, Job.STATUS_QUEUED)
+                delay = (job.run_after - before).total_seconds()
+                self.assertAlmostEqual(delay, expected_delays[attempt - 1], delta=1)
+                self.assertIsNone(self.claim_test_job())    # Backoff noch nicht abgelaufen
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_heartbeat_renews_lease_and_stores_progress(self):
+        enqueue("test_ok")
+        claimed = self.claim_test_job()
+        Job.objects.filter(pk=claimed.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        context = JobContext(claimed)
+        context.progress(done=3, total=10)
+        self.assertEqual(heartbeat([context], "w1"), 1)
+        self.assertEqual(heartbeat([context], "someone-else"), 0)
+        job = Job.objects.get(pk=claimed.pk)
+        self.assertEqual(job.progress, {"done": 3, "total": 10})
+        self.assertEqual(reclaim_expired(lease_seconds=60), 0)
+
+    def test_reclaim_expired_requeues_and_discards_late_result(self):
+        enqueue("test_ok")
+        claimed = self.claim_test_job("dead-worker")
+        Job.objects.filter(pk=claimed.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=10))
+        self.assertEqual(reclaim_expired(lease_seconds=60), 1)
+        job = Job.objects.get(pk=claimed.pk)
+        self.assertEqual((job.status, job.locked_by), (Job.STATUS_QUEUED, ""))
+        self.assertIn("Lease abgelaufen", job.error)
+
+        # Der totgeglaubte Worker meldet sich doch noch: sein Ergebnis zählt nicht mehr
+        execute(claimed)
+        self.assertEqual(Job.objects.get(pk=claimed.pk).status, Job.STATUS_QUEUED)
+
+    def test_reclaim_expired_fails_job_without_attempts_left(self):
+        job = enqueue("test_ok", max_attempts=1)
+        self.claim_test_job()
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=10))
+        reclaim_expired(lease_seconds=60)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.STATUS_FAILED)
+
+    def test_purge_finished_removes_old_jobs_and_uploads(self):
+        old = timezone.now() - timedelta(days=40)
+        finished = enqueue("test_ok")
+        recent = enqueue("test_ok")
+        open_job = enqueue("test_ok")
+        Job.objects.filter(pk=finished.pk).update(status=Job.STATUS_DONE, finished_at=old)
+        Job.objects.filter(pk=recent.pk).update(status=Job.STATUS_DONE, finished_at=timezone.now())
+        stale_upload = ImportUpload.objects.create(name="alt.csv", content="x")
+        ImportUpload.objects.filter(pk=stale_upload.pk).update(created_at=old)
+        ImportUpload.objects.create(name="neu.csv", content="x")
+
+        self.assertEqual(purge_finished(days=30), 1)
+        self.assertEqual(set(Job.objects.values_list("pk", flat=True)), {recent.pk, open_job.pk})
+        self.assertEqual(list(ImportUpload.objects.values_list("name", flat=True)), ["neu.csv"])
+
+
+class ImportTransactionsJobTests(TestCase):
+
+    def test_upload_is_deleted_after_the_import(self):
+        upload = ImportUpload.objects.create(name="leer.csv", content="")
+        job = enqueue("import_transactions", {"upload_id": upload.pk, "dry_run": True})
+        execute(claim("w1", job_types=["import_transactions"]))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_DONE)
+        self.assertTrue(job.result["dry_run"])
+        self.assertFalse(ImportUpload.objects.exists())
+
+    def test_missing_upload_fails_the_job(self):
+        job = enqueue("import_transactions", {"upload_id": 999})
+        execute(claim("w1", job_types=["import_transactions"]))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertIn("nicht gefunden", job.error)
@@ -0,0 +1,129 @@
+import asyncio
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from fintech.apis.services.lease_lock import LeaseLock, LeaseLost, LeaseTimeout
+from fintech.models import Lease
+
+NAME = "update_prices"
+
+
+class LeaseLockTests(TestCase):
+
+    def lock(self, **kwargs) -> LeaseLock:
+        return LeaseLock(NAME, ttl_seconds=60, poll_seconds=0, **kwargs)
+
+    def while_waiting(self, action):
+        """Patch the poll sleep of acquire_or_wait: *action* runs once, as if another process acted meanwhile."""
+        calls = []
+
+        def sleep(seconds):
+            if not calls:
+                action()
+            calls.append(seconds)
+
+        return mock.patch("fintech.apis.services.lease_lock.time.sleep", side_effect=sleep)
+
+    def test_only_one_holder(self):
+        first, second = self.lock(), self.lock()
+        self.assertTrue(first.try_acquire())
+        self.assertFalse(second.try_acquire())
+        first.release()
+        self.assertTrue(second.try_acquire())
+        self.assertEqual((first.generation, second.generation), (1, 2))
+        self.assertEqual(Lease.objects.get().acquisitions, 2)
+
+    def test_expired_lease_is_taken_over_and_renew_reports_the_loss(self):
+        first, second = self.lock(), self.lock()
+        first.try_acquire()
+        Lease.objects.filter(name=NAME).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertTrue(second.try_acquire())
+        self.assertFalse(first.renew())
+        self.assertTrue(second.renew())
+
+    def test_renew_extends_the_lease(self):
+        lock = self.lock()
+        lock.try_acquire()
+        Lease.objects.filter(name=NAME).update(expires_at=timezone.now() + timedelta(seconds=5))
+        self.assertTrue(lock.renew())
+        remaining = Lease.objects.get().expires_at - timezone.now()
+        self.assertGreater(remaining, timedelta(seconds=55))
+
+    def test_waiter_piggybacks_on_the_holders_result(self):
+        holder, waiter = self.lock(), self.lock()
+        holder.try_acquire()
+        with self.while_waiting(lambda: holder.release({"summary": "Fertig: 3 aktualisiert"})):
+            outcome = waiter.acquire_or_wait(timeout=60)
+        self.assertFalse(outcome.acquired)
+        self.assertEqual(outcome.result, {"summary": "Fertig: 3 aktualisiert"})
+        self.assertEqual(outcome.holder, holder.holder)
+        stats = waiter.stats()
+        self.assertEqual((stats["contentions"], stats["holder"]), (1, ""))
+
+    def test_waiter_takes_over_when_holder_fails(self):
+        holder, waiter = self.lock(), self.lock()
+        holder.try_acquire()
+        with self.while_waiting(lambda: holder.release()):   # ohne Ergebnis: Lauf fehlgeschlagen
+            outcome = waiter.acquire_or_wait(timeout=60)
+        self.assertTrue(outcome.acquired)
+        self.assertEqual(Lease.objects.get().holder, waiter.holder)
+
+    def test_old_result_does_not_satisfy_a_new_wait(self):
+        earlier = self.lock()
+        earlier.try_acquire()
+        earlier.release({"summary": "alt"})
+        holder, waiter = self.lock(), self.lock()
+        holder.try_acquire()
+        with self.while_waiting(lambda: holder.release({"summary": "neu"})):
+            outcome = waiter.acquire_or_wait(timeout=60)
+        self.assertEqual(outcome.result, {"summary": "neu"})
+
+    def test_without_piggyback_the_waiter_runs_itself(self):
+        holder, waiter = self.lock(), self.lock()
+        holder.try_acquire()
+        with self.while_waiting(lambda: holder.release({"summary": "x"})):
+            outcome = waiter.acquire_or_wait(timeout=60, piggyback=False)
+        self.assertTrue(outcome.acquired)
+
+    def test_timeout(self):
+        holder, waiter = self.lock(), self.lock()
+        holder.try_acquire()
+        with self.while_waiting(lambda: None):
+            with self.assertRaises(LeaseTimeout):
+                waiter.acquire_or_wait(timeout=0)
+        self.assertEqual(waiter.stats()["contentions"], 1)
+        self.assertEqual(waiter.stats()["holder"], holder.holder)
+
+
+class KeepAliveTests(TestCase):
+
+    def keep_alive(self, renew_results) -> None:
+        lock = LeaseLock(NAME, ttl_seconds=0.03)
+        results = iter(renew_results)
+
+        def renew():
+            result = next(results)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        async def run():
+            with mock.patch.object(lock, "renew", side_effect=renew):
+                await asyncio.wait_for(lock.keep_alive(), timeout=5)
+
+        asyncio.run(run())
+
+    def test_lost_lease_raises(self):
+        with self.assertRaisesRegex(LeaseLost, "taken over"):
+            self.keep_alive([True, True, False])
+
+    def test_two_failed_renewals_in_a_row_raise(self):
+        with self.assertRaisesRegex(LeaseLost, "could not be renewed"):
+            self.keep_alive([True, RuntimeError("db down"), RuntimeError("db down")])
+
+    def test_single_failure_is_tolerated(self):
+        with self.assertRaisesRegex(LeaseLost, "taken over"):
+            self.keep_alive([RuntimeError("db down"), True, RuntimeError("db down"), True, False])
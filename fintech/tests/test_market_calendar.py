@@ -0,0 +1,112 @@
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.test import SimpleTestCase, TestCase
+
+from fintech.apis.services.market_calendar import MarketCalendar, easter_sunday, nyse_holidays, xetra_holidays
+from fintech.models import Asset
+
+BERLIN = ZoneInfo("Europe/Berlin")
+
+
+class HolidayRuleTests(SimpleTestCase):
+
+    def test_easter_sunday(self):
+        self.assertEqual(easter_sunday(2024), date(2024, 3, 31))
+        self.assertEqual(easter_sunday(2025), date(2025, 4, 20))
+        self.assertEqual(easter_sunday(2026), date(2026, 4, 5))
+
+    def test_xetra_2026(self):
+        holidays = xetra_holidays(2026)
+        self.assertIn(date(2026, 4, 3), holidays)    # Karfreitag
+        self.assertIn(date(2026, 4, 6), holidays)    # Ostermontag
+        self.assertIn(date(2026, 12, 31), holidays)
+        self.assertNotIn(date(2026, 10, 3), holidays)
+
+    def test_nyse_2026(self):
+        self.assertEqual(sorted(nyse_holidays(2026)), [
+            date(2026, 1, 1), date(2026, 1, 19), date(2026, 2, 16), date(2026, 4, 3), date(2026, 5, 25),
+            date(2026, 6, 19), date(2026, 7, 3), date(2026, 9, 7), date(2026, 11, 26), date(2026, 12, 25),
+        ])
+
+    def test_nyse_new_year_observance(self):
+        self.assertIn(date(2023, 1, 2), nyse_holidays(2023))         # Sonntag → Montag
+        self.assertNotIn(date(2021, 12, 31), nyse_holidays(2022))    # Samstag: kein Ersatztag
+        self.assertNotIn(date(2022, 1, 1), nyse_holidays(2022))
+
+
+class MarketTests(SimpleTestCase):
+
+    def setUp(self):
+        self.calendar = MarketCalendar(extra_holidays={"XETRA": ["2026-12-30"]})
+        self.xetra = self.calendar.markets["XETRA"]
+        self.nyse = self.calendar.markets["NYSE"]
+
+    def test_is_open(self):
+        self.assertTrue(self.xetra.is_open(datetime(2026, 10, 16, 12, 0, tzinfo=BERLIN)))     # Freitag
+        self.assertFalse(self.xetra.is_open(datetime(2026, 10, 17, 12, 0, tzinfo=BERLIN)))    # Samstag
+        self.assertFalse(self.xetra.is_open(datetime(2026, 4, 3, 12, 0, tzinfo=BERLIN)))      # Karfreitag
+        self.assertFalse(self.xetra.is_open(datetime(2026, 10, 16, 17, 30, tzinfo=BERLIN)))   # Schluss exklusiv
+        self.assertFalse(self.xetra.is_open(datetime(2026, 12, 30, 12, 0, tzinfo=BERLIN)))    # extra_holidays
+
+    def test_is_open_uses_the_market_time_zone(self):
+        # 15:45 Berlin = 09:45 New York (beide Sommerzeit)
+        at = datetime(2026, 10, 16, 15, 45, tzinfo=BERLIN)
+        self.assertTrue(self.nyse.is_open(at))
+        self.assertFalse(self.nyse.is_open(at - timedelta(minutes=30)))
+        # Zwischen den Zeitumstellungen (EU schon Winterzeit, USA noch nicht): 14:45 Berlin = 09:45 NY
+        self.assertTrue(self.nyse.is_open(datetime(2026, 10, 26, 14, 45, tzinfo=BERLIN)))
+
+    def test_last_close_skips_weekend_and_holidays(self):
+        monday_morning = datetime(2026, 10, 19, 8, 0, tzinfo=BERLIN)
+        self.assertEqual(self.xetra.last_close(monday_morning), datetime(2026, 10, 16, 17, 30, tzinfo=BERLIN))
+        after_easter = datetime(2026, 4, 7, 8, 0, tzinfo=BERLIN)
+        self.assertEqual(self.xetra.last_close(after_easter), datetime(2026, 4, 2, 17, 30, tzinfo=BERLIN))
+        self.assertIsNone(self.calendar.markets["CRYPTO"].last_close(monday_morning))
+
+    def test_post_close_cutoff_waits_for_the_closing_auction(self):
+        within_grace = datetime(2026, 10, 16, 17, 35, tzinfo=BERLIN)
+        self.assertEqual(self.calendar.post_close_cutoff(self.xetra, within_grace),
+                         datetime(2026, 10, 15, 17, 45, tzinfo=BERLIN))
+        later = datetime(2026, 10, 16, 18, 0, tzinfo=BERLIN)
+        self.assertEqual(self.calendar.post_close_cutoff(self.xetra, later),
+                         datetime(2026, 10, 16, 17, 45, tzinfo=BERLIN))
+
+    def test_unknown_default_market(self):
+        with self.assertRaises(ValueError):
+            MarketCalendar(default_market="LSE")
+
+
+class MarketGroupingTests(TestCase):
+
+    def setUp(self):
+        self.calendar = MarketCalendar()
+        cases = [
+            ("DE0000000001", "STOCK", "XETRA"),
+            ("DE0000000002", "STOCK", " nasdaq "),   # Leerzeichen und Kleinschreibung
+            ("DE0000000003", "STOCK", None),          # ohne Börse: DE → Default-Markt
+            ("US0000000001", "STOCK", None),          # ohne Börse: US → NYSE
+            ("US0000000002", "STOCK", ""),
+            ("US0000000003", "STOCK", "Frankfurt"),
+            ("US0000000004", "STOCK", "LSE"),         # unbekannte Börse: ISIN-Land
+            ("XC0000000001", "CRYPTO", "NYSE"),       # Krypto schlägt Börse
+            ("IE0000000001", "ETF", "NGS"),
+        ]
+        for isin, asset_class, exchange in cases:
+            Asset.objects.create(isin=isin, name=isin, asset_class=asset_class, exchange=exchange)
+
+    def test_market_for(self):
+        markets = {asset.isin: self.calendar.market_for(asset).name for asset in Asset.objects.all()}
+        self.assertEqual(markets, {
+            "DE0000000001": "XETRA", "DE0000000002": "NASDAQ", "DE0000000003": "XETRA",
+            "US0000000001": "NYSE", "US0000000002": "NYSE", "US0000000003": "XETRA",
+            "US0000000004": "NYSE", "XC0000000001": "CRYPTO", "IE0000000001": "NASDAQ",
+        })
+
+    def test_groups_partition_assets_like_market_for(self):
+        groups = {}
+        for market, q in self.calendar.groups():
+            for isin in Asset.objects.filter(q).values_list("isin", flat=True):
+                groups.setdefault(isin, []).append(market.name)
+        for asset in Asset.objects.all():
+            self.assertEqual(groups.get(asset.isin), [self.calendar.market_for(asset).name], asset.isin)
@@ -0,0 +1,74 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from fintech.apis.services.negative_cache import ABSENT, PRICE, TRANSIENT, WKN, NegativeCache
+from fintech.models import ProviderMiss
+
+ISIN = "DE0007236101"
+
+
+class NegativeCacheTests(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        patcher = mock.patch("fintech.apis.services.negative_cache.timezone.now", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = NegativeCache(absent_ttl_hours=24, transient_ttl_hours=1)
+
+    def test_ttl_depends_on_kind(self):
+        self.cache.record("com", PRICE, ISIN, ABSENT, "404")
+        self.cache.record("alle", PRICE, ISIN, TRANSIENT, "no price on page")
+        self.assertTrue(self.cache.is_miss("com", PRICE, ISIN))
+        self.assertTrue(self.cache.is_miss("alle", PRICE, ISIN))
+
+        self.now += timedelta(hours=2)
+        self.assertTrue(self.cache.is_miss("com", PRICE, ISIN))
+        self.assertFalse(self.cache.is_miss("alle", PRICE, ISIN))
+
+        self.now += timedelta(hours=23)
+        self.assertFalse(self.cache.is_miss("com", PRICE, ISIN))
+
+    def test_lookups_are_independent(self):
+        self.cache.record("com", PRICE, ISIN, TRANSIENT)
+        self.assertTrue(self.cache.is_miss("com", PRICE, ISIN))
+        self.assertFalse(self.cache.is_miss("com", WKN, ISIN))
+        self.assertFalse(self.cache.is_miss("alle", PRICE, ISIN))
+
+    def test_entries_are_persisted_and_reloaded(self):
+        self.cache.record("com", PRICE, ISIN, ABSENT, "404")
+        self.cache.record("alle", WKN, ISIN, TRANSIENT)
+        row = ProviderMiss.objects.get(provider="com", lookup=PRICE, isin=ISIN)
+        self.assertEqual((row.kind, row.reason, row.expires_at), (ABSENT, "404", self.now + timedelta(hours=24)))
+
+        self.now += timedelta(hours=2)
+        other = NegativeCache(absent_ttl_hours=24, transient_ttl_hours=1)
+        other.refresh()
+        self.assertTrue(other.is_miss("com", PRICE, ISIN))
+        self.assertFalse(other.is_miss("alle", WKN, ISIN))   # abgelaufen, nicht geladen
+
+    def test_record_again_replaces_the_row(self):
+        self.cache.record("com", PRICE, ISIN, TRANSIENT)
+        self.cache.record("com", PRICE, ISIN, ABSENT, "x" * 300)
+        row = ProviderMiss.objects.get()
+        self.assertEqual(row.kind, ABSENT)
+        self.assertEqual(len(row.reason), 200)
+
+    def test_forget_drops_memory_and_row(self):
+        self.cache.record("com", PRICE, ISIN, ABSENT)
+        self.cache.forget("com", PRICE, ISIN)
+        self.assertFalse(self.cache.is_miss("com", PRICE, ISIN))
+        self.assertFalse(ProviderMiss.objects.exists())
+
+    def test_refresh_reloads_only_after_reload_seconds(self):
+        cache = NegativeCache(reload_seconds=3600)
+        cache.refresh()
+        self.cache.record("com", PRICE, ISIN, ABSENT)
+        cache.refresh()
+        self.assertFalse(cache.is_miss("com", PRICE, ISIN))
+        cache.reload_seconds = 0
+        cache.refresh()
+        self.assertTrue(cache.is_miss("com", PRICE, ISIN))
@@ -0,0 +1,93 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from fintech.apis.services.page_cache import PageCache
+
+
+def single_shard(**kwargs) -> PageCache:
+    # Ein Shard: Entry- und Byte-Budget gelten für den ganzen Cache
+    return PageCache(shards=1, **kwargs)
+
+
+class PageCacheTests(SimpleTestCase):
+
+    def test_get_returns_stored_value(self):
+        cache = single_shard()
+        cache.put(("DE0001", "com", "url"), "page", nbytes=10)
+        self.assertEqual(cache.get(("DE0001", "com", "url")), "page")
+        self.assertIsNone(cache.get(("DE0002", "com", "url")))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["bytes"]), (1, 1, 10))
+
+    def test_lru_entry_limit_evicts_least_recently_used(self):
+        cache = single_shard(max_entries=2)
+        cache.put(("A", "p"), "a", nbytes=1)
+        cache.put(("B", "p"), "b", nbytes=1)
+        cache.get(("A", "p"))                  # A ist jetzt jünger als B
+        cache.put(("C", "p"), "c", nbytes=1)
+        self.assertIsNone(cache.get(("B", "p")))
+        self.assertEqual(cache.get(("A", "p")), "a")
+        self.assertEqual(cache.get(("C", "p")), "c")
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_byte_budget_evicts_until_it_fits(self):
+        cache = single_shard(max_entries=100, max_bytes=100)
+        cache.put(("A", "p"), "a", nbytes=40)
+        cache.put(("B", "p"), "b", nbytes=40)
+        cache.put(("C", "p"), "c", nbytes=50)
+        self.assertIsNone(cache.get(("A", "p")))
+        self.assertEqual(cache.stats()["bytes"], 90)
+
+    def test_value_larger_than_shard_budget_is_not_stored(self):
+        cache = PageCache(max_bytes=800, shards=8)   # 100 Bytes pro Shard
+        cache.put(("A", "p"), "a", nbytes=101)
+        self.assertIsNone(cache.get(("A", "p")))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_replacing_a_key_does_not_double_count_bytes(self):
+        cache = single_shard()
+        cache.put(("A", "p"), "old", nbytes=30)
+        cache.put(("A", "p"), "new", nbytes=20)
+        self.assertEqual(cache.get(("A", "p")), "new")
+        self.assertEqual(cache.stats()["bytes"], 20)
+
+    def test_budget_is_split_across_shards(self):
+        cache = PageCache(max_entries=16, max_bytes=1600, shards=4)
+        for key in [(f"ISIN{i}", "p") for i in range(200)]:
+            cache.put(key, "x", nbytes=10)
+        stats = cache.stats()
+        self.assertLessEqual(stats["entries"], 16)
+        self.assertLessEqual(stats["bytes"], 1600)
+
+    @mock.patch("fintech.apis.services.page_cache.time.monotonic")
+    def test_expired_entry_is_a_miss(self, monotonic):
+        monotonic.return_value = 1000.0
+        cache = single_shard(max_age_minutes=1)
+        cache.put(("A", "p"), "a", nbytes=1)
+        monotonic.return_value = 1059.0
+        self.assertEqual(cache.get(("A", "p")), "a")
+        monotonic.return_value = 1061.0
+        self.assertIsNone(cache.get(("A", "p")))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    @mock.patch("fintech.apis.services.page_cache.time.monotonic")
+    def test_age_shortens_remaining_lifetime(self, monotonic):
+        monotonic.return_value = 1000.0
+        cache = single_shard(max_age_minutes=1)
+        cache.put(("A", "p"), "a", nbytes=1, age=50)
+        monotonic.return_value = 1011.0
+        self.assertIsNone(cache.get(("A", "p")))
+
+    @mock.patch("fintech.apis.services.page_cache.time.monotonic")
+    def test_sweep_drops_only_expired_entries(self, monotonic):
+        monotonic.return_value = 1000.0
+        cache = PageCache(max_age_minutes=1, sweep_interval_seconds=3600)
+        cache.put(("A", "p"), "a", nbytes=5)
+        monotonic.return_value = 1030.0
+        cache.put(("B", "p"), "b", nbytes=5)
+        monotonic.return_value = 1070.0
+        self.assertEqual(cache.sweep(), 1)
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertEqual(cache.stats()["bytes"], 5)
+        self.assertEqual(cache.get(("B", "p")), "b")
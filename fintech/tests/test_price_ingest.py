@@ -0,0 +1,83 @@
+from datetime import datetime, timezone as tz
+from decimal import Decimal
+from unittest import mock
+
+from django.db import IntegrityError
+from django.test import TestCase
+
+from fintech.models import Asset, Price, PriceQuerySet
+
+T1 = datetime(2026, 10, 14, 17, 30, tzinfo=tz.utc)
+T2 = datetime(2026, 10, 15, 17, 30, tzinfo=tz.utc)
+T3 = datetime(2026, 10, 16, 17, 30, tzinfo=tz.utc)
+
+
+class PriceIngestTests(TestCase):
+
+    def setUp(self):
+        self.siemens = Asset.objects.create(isin="DE0007236101", name="Siemens", asset_class="STOCK")
+        self.apple = Asset.objects.create(isin="US0378331005", name="Apple", asset_class="STOCK")
+
+    def price(self, asset, timestamp, value) -> Price:
+        return Price(asset=asset, timestamp=timestamp, current_price=Decimal(value))
+
+    def test_creates_prices_and_moves_current_price_to_newest(self):
+        result = Price.objects.ingest([
+            self.price(self.siemens, T1, "200"),
+            self.price(self.siemens, T2, "210"),
+            self.price(self.apple, T1, "180"),
+        ])
+        self.assertEqual((result.created, result.duplicates, result.assets_updated), (3, 0, 2))
+        self.siemens.refresh_from_db()
+        self.assertEqual((self.siemens.current_price, self.siemens.current_price_timestamp), (Decimal("210"), T2))
+
+    def test_duplicates_in_batch_keep_the_last(self):
+        result = Price.objects.ingest([
+            self.price(self.siemens, T1, "200"),
+            self.price(self.siemens, T1, "201"),
+        ])
+        self.assertEqual((result.created, result.duplicates), (1, 1))
+        self.assertEqual(Price.objects.get().current_price, Decimal("201"))
+
+    def test_existing_rows_are_skipped_not_updated(self):
+        Price.objects.ingest([self.price(self.siemens, T1, "200")])
+        result = Price.objects.ingest([
+            self.price(self.siemens, T1, "999"),
+            self.price(self.siemens, T2, "210"),
+        ])
+        self.assertEqual((result.created, result.duplicates), (1, 1))
+        self.assertEqual(Price.objects.get(timestamp=T1).current_price, Decimal("200"))
+
+    def test_older_prices_do_not_replace_a_newer_current_price(self):
+        Price.objects.ingest([self.price(self.siemens, T3, "220")])
+        result = Price.objects.ingest([self.price(self.siemens, T1, "200")])
+        self.assertEqual(result.created, 1)
+        self.siemens.refresh_from_db()
+        self.assertEqual((self.siemens.current_price, self.siemens.current_price_timestamp), (Decimal("220"), T3))
+
+    def test_empty_batch(self):
+        result = Price.objects.ingest([])
+        self.assertEqual((result.created, result.duplicates, result.assets_updated), (0, 0, 0))
+
+    def test_integrity_error_is_retried_once(self):
+        real_bulk_create = PriceQuerySet.bulk_create
+        calls = []
+
+        def conflict_once(queryset, objs, *args, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 1:
+                raise IntegrityError("UNIQUE constraint failed")   # paralleler Lauf war schneller
+            return real_bulk_create(queryset, objs, *args, **kwargs)
+
+        with mock.patch.object(PriceQuerySet, "bulk_create", conflict_once):
+            result = Price.objects.ingest([self.price(self.siemens, T1, "200")])
+        self.assertEqual(calls, [1, 1])
+        self.assertEqual(result.created, 1)
+        self.assertEqual(Price.objects.count(), 1)
+
+    def test_second_integrity_error_propagates(self):
+        with mock.patch.object(PriceQuerySet, "bulk_create", side_effect=IntegrityError("conflict")) as bulk_create:
+            with self.assertRaises(IntegrityError):
+                Price.objects.ingest([self.price(self.siemens, T1, "200")])
+        self.assertEqual(bulk_create.call_count, 2)
+        self.assertFalse(Price.objects.exists())
@@ -0,0 +1,109 @@
+import asyncio
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from fintech.apis.services.rate_limit import AdaptiveHostLimiter, retry_after_seconds
+
+
+class AdaptiveHostLimiterTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch("fintech.apis.services.rate_limit.time.monotonic", return_value=1000.0)
+        self.clock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def finish(self, limiter, **outcome):
+        # Ein Request: Slot belegen und mit *outcome* zurückgeben
+        limiter.in_flight += 1
+        limiter.release(**outcome)
+
+    def test_starts_at_a_quarter_and_grows_by_one_per_window(self):
+        limiter = AdaptiveHostLimiter("host", max_concurrency=20)
+        self.assertEqual(limiter.limit, 5)
+        for _ in range(5):
+            self.finish(limiter, status=200, latency=0.1)
+        self.assertEqual(int(limiter.limit), 5)    # 5 Antworten ≈ +1, knapp darunter
+        for _ in range(2):
+            self.finish(limiter, status=200, latency=0.1)
+        self.assertEqual(int(limiter.limit), 6)
+        self.assertGreater(limiter.rate, 10.0)
+
+    def test_increase_stops_at_max_concurrency_and_max_rate(self):
+        limiter = AdaptiveHostLimiter("host", max_concurrency=4, rate=10, max_rate=12)
+        for _ in range(500):
+            self.finish(limiter, status=200, latency=0.1)
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.rate, 12)
+        self.assertEqual(limiter.snapshot()["peak_limit"], 4)
+
+    def test_server_error_halves_limit_but_not_rate(self):
+        limiter = AdaptiveHostLimiter("host", max_concurrency=32)
+        self.finish(limiter, status=503, latency=0.1)
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.rate, 10)
+        self.assertEqual(limiter.throttled, 1)
+
+    def test_429_halves_limit_and_rate_and_honours_retry_after(self):
+        limiter = AdaptiveHostLimiter("host", max_concurrency=32)
+        self.finish(limiter, status=429, latency=0.1, retry_after=30)
+        self.assertEqual((limiter.limit, limiter.rate), (4, 5))
+        self.assertEqual(limiter._pause_until, 1030.0)
+
+    def test_transport_failure_decreases(self):
+        limiter = AdaptiveHostLimiter("host", max_concurrency=32)
+        self.finish(limiter, failed=True)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_one_decrease_per_latency_period(self):
+        limiter = AdaptiveHostLimiter("host", max_concurrency=32)
+        for _ in range(5):
+            self.finish(limiter, status=503)
+        self.assertEqual((limiter.limit, limiter.throttled), (4, 1))
+        self.clock.return_value = 1001.0
+        self.finish(limiter, status=503)
+        self.assertEqual((limiter.limit, limiter.throttled), (2, 2))
+
+    def test_decrease_stops_at_min_concurrency(self):
+        limiter = AdaptiveHostLimiter("host", max_concurrency=8, min_concurrency=2)
+        for step in range(10):
+            self.clock.return_value = 1000.0 + step
+            self.finish(limiter, status=500)
+        self.assertEqual(limiter.limit, 2)
+
+    def test_rising_latency_decreases(self):
+        limiter = AdaptiveHostLimiter("host", max_concurrency=32)
+        for _ in range(20):
+            self.finish(limiter, status=200, latency=0.1)
+        before = limiter.limit
+        for _ in range(5):
+            self.finish(limiter, status=200, latency=2.0)
+        self.assertLess(limiter.limit, before)
+        self.assertEqual(limiter.throttled, 1)
+
+    def test_no_verdict_only_returns_the_slot(self):
+        limiter = AdaptiveHostLimiter("host", max_concurrency=20)
+        self.finish(limiter)
+        self.assertEqual((limiter.limit, limiter.in_flight, limiter.throttled), (5, 0, 0))
+
+    def test_acquire_waits_for_a_free_slot(self):
+        async def scenario():
+            limiter = AdaptiveHostLimiter("host", max_concurrency=4)   # Start-Limit 1
+            await limiter.acquire()
+            waiting = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            blocked = not waiting.done()
+            limiter.release(status=200, latency=0.1)
+            await asyncio.wait_for(waiting, 1)
+            return blocked, limiter.in_flight
+
+        self.assertEqual(asyncio.run(scenario()), (True, 1))
+
+
+class RetryAfterTests(SimpleTestCase):
+
+    def test_numeric_only(self):
+        self.assertEqual(retry_after_seconds({"Retry-After": "12"}), 12.0)
+        self.assertIsNone(retry_after_seconds({"Retry-After": "Wed, 21 Oct 2026 07:28:00 GMT"}))
+        self.assertIsNone(retry_after_seconds({}))
+        self.assertIsNone(retry_after_seconds(None))
@@ -9,4 +9,5 @@ urlpatterns = [
     path('api/', include('fintech.apis.urls')),
     path("export", views.portfolio_export, name="portfolio-export"),
     path("import", views.portfolio_import, name="portfolio-import"),
+    path("refresh-status", views.portfolio_refresh_status, name="portfolio-refresh-status"),
 ]
\ No newline at end of file
@@ -1,11 +1,15 @@
 from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render, redirect
+from django.http import JsonResponse
+from django.template.loader import render_to_string
 from .model_views import PortfolioSummary
 import json
 from decimal import Decimal
-from .apis.services.csv_import import import_transactions
+from django.db import transaction
+from .models import ImportUpload, Job
+from .apis.services.job_queue import enqueue
 from django.contrib import messages
-from django.core.management import call_command
+from .apis.services.portfolio_refresh import STATE_DONE, get_portfolio_refresh
 from django.views.decorators.cache import never_cache
 
 import logging
@@ -27,7 +31,7 @@ def portfolio_export(request):
 @never_cache
 @staff_member_required
 def portfolio_import(request):
-    call_command("update_prices")  # Preise vor Import aktualisieren, damit sie in der UI direkt sichtbar sind
+    # Kein Kurs-Refresh beim Seitenaufruf: der Import-Job stößt update_prices selbst an
     if request.method == "POST":
         csv_file = request.FILES.get("csv_file")
         dry_run  = request.POST.get("dry_run") == "on"
@@ -40,25 +44,49 @@ def portfolio_import(request):
             request.session["import_error"] = "Nur CSV-Dateien werden unterstützt."
             return redirect("fintech:portfolio-import")
 
+        raw = csv_file.read()
         try:
-            content = csv_file.read().decode("utf-8")
+            content = raw.decode("utf-8")
         except UnicodeDecodeError:
-            content = csv_file.read().decode("latin-1")
+            content = raw.decode("latin-1")
 
-        result = import_transactions(content, dry_run=dry_run)
-
-        request.session["import_result"] = {
-            "total":    result.total,
-            "imported": result.imported,
-            "skipped":  result.skipped,
-            "errors":   result.errors,
-            "dry_run":  result.dry_run,
-        }
+        # Import läuft im Worker (run_worker); die Seite zeigt das Ergebnis, sobald er fertig ist.
+        # Die Datei liegt in einer eigenen Zeile, der Job-Payload enthält nur ihre ID.
+        with transaction.atomic():
+            upload = ImportUpload.objects.create(name=csv_file.name, content=content)
+            job = enqueue("import_transactions", {"upload_id": upload.pk, "dry_run": dry_run})
+        request.session["import_job"] = job.pk
         return redirect("fintech:portfolio-import")
 
-    result_data = request.session.pop("import_result", None)
+    result_data = None
+    pending     = None
     error       = request.session.pop("import_error", None)
+    job_id      = request.session.get("import_job")
+    job         = Job.objects.filter(pk=job_id).first() if job_id else None
+    if job is not None and job.status in Job.OPEN_STATUSES:
+        pending = job
+    elif job is not None:
+        request.session.pop("import_job", None)
+        if job.status == Job.STATUS_DONE:
+            result_data = job.result
+        else:
+            error = f"Import fehlgeschlagen: {job.error}"
     return render(request, "fintech/portfolio_import.html", {
-        "result": result_data,
-        "error":  error,
+        "result":  result_data,
+        "pending": pending,
+        "error":   error,
     })
+
+
+@never_cache
+@staff_member_required
+def portfolio_refresh_status(request):
+    """Status of the background price refresh; with ?rows=1 and a finished run also the new table rows."""
+    status = get_portfolio_refresh().status()
+    if request.GET.get("rows") and status.get("state") == STATE_DONE:
+        status["rows_html"] = render_to_string(
+            "admin/fintech/portfolio_summary_rows.html",
+            {"portfolio": list(PortfolioSummary.objects.portfolio())},
+            request=request,
+        )
+    return JsonResponse(status)
@@ -22,7 +22,11 @@ python manage.py collectstatic --noinput --clear || {
     echo "⚠️ Collectstatic failed!" | tee -a $LOGFILE
 }
 
-# 4. Gunicorn Starten
+# 4. Job-Worker starten (Preis-Updates, CSV-Importe, Bereinigung aus der Tabelle Job)
+echo "⚙️ Starting job worker..." | tee -a $LOGFILE
+python manage.py run_worker &
+
+# 5. Gunicorn Starten
 echo "🚀 Starting Gunicorn..." | tee -a $LOGFILE
 
 # WICHTIG: